@@ -20,7 +20,7 @@ def analyze_data_sources(twbx_file):
     
     # Detect data sources
     detector = DataSourceDetector()
-    sources = detector.detect_data_sources(workbook)
+    sources = detector.detect_data_sources(workbook, twbx_file)
     
     print(f"📊 Dashboard: {twbx_file}")
     print(f"📈 Worksheets: {len(workbook.worksheets)}")
@@ -97,7 +97,7 @@ def show_connection_strategies():
         "Excel Files": {
             "description": "Excel workbooks",
             "approach": "Read with pandas",
-            "libraries": ["pandas", "openpyxl"],
+            "libraries": ["pandas", "python-calamine"],
             "pros": ["Simple", "Portable"],
             "cons": ["Limited size", "Static data"]
         },
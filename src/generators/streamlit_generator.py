@@ -2,48 +2,31 @@
 Streamlit App Generator - Creates production-ready Streamlit applications
 """
 import os
+import re
 import json
 import logging
-from typing import Dict, List, Any, Optional
+from typing import IO, Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass
+from types import MappingProxyType
 from pathlib import Path
 import zipfile
 import io
-from jinja2 import Environment, FileSystemLoader, BaseLoader, Template
+from jinja2 import Environment, DictLoader, FileSystemBytecodeCache, Template
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
 
-@dataclass
-class GeneratedApp:
-    """Represents a generated Streamlit application"""
-    name: str
-    main_file: str
-    supporting_files: Dict[str, str]
-    requirements: List[str]
-    deployment_config: Dict[str, Any]
-    documentation: str
-
-
-class StreamlitGenerator:
-    """Generates complete Streamlit applications from Tableau workbooks"""
-    
-    def __init__(self):
-        self.templates = self._load_templates()
-        
-    def _load_templates(self) -> Dict[str, Template]:
-        """Load Jinja2 templates"""
-        templates = {}
-        
-        # Main app template
-        main_template = """
+_MAIN_APP_TEMPLATE = """
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime
+import io
 import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pacsv
 from utils.data_loader import DataLoader
 from utils.calculations import CalculationEngine
 from utils.filters import FilterManager
@@ -84,6 +67,25 @@ def initialize_components():
     filter_manager = FilterManager()
     return data_loader, calc_engine, filter_manager
 
+def render_key_metrics(metric_values):
+    st.divider()
+    st.header("📈 Metrics")
+    
+    {% for metric in key_metrics %}
+    {{ metric.name }}_value = metric_values.get('{{ metric.name }}', 0)
+    try:
+        formatted_value = f"{{ metric.format }}".format({{ metric.name }}_value)
+    except (ValueError, TypeError):
+        formatted_value = str({{ metric.name }}_value)
+    st.metric("{{ metric.display_name }}", formatted_value)
+    {% endfor %}
+
+def to_csv_bytes(data):
+    # Deferred download payload: Arrow formats the CSV in C, and only on click
+    csv_buffer = io.BytesIO()
+    pacsv.write_csv(pa.Table.from_pandas(data, preserve_index=False), csv_buffer)
+    return csv_buffer.getvalue()
+
 def main():
     # Header
     st.markdown('<div class="dashboard-header"><h1>{{ dashboard_title }}</h1><p>{{ dashboard_description }}</p></div>', 
@@ -92,31 +94,20 @@ def main():
     # Initialize
     data_loader, calc_engine, filter_manager = initialize_components()
     
-    # Load data
-    with st.spinner("Loading data..."):
-        data = data_loader.load_data()
-    
     # Sidebar filters
     with st.sidebar:
         st.header("📊 Filters")
-        filters = filter_manager.render_filters(data)
+        filters = filter_manager.render_filters(data_loader.load_filter_options())
+        
+        # Load only the selected rows, filtered in the database
+        column_filters = filter_manager.get_column_filters(filters)
+        filtered_data = data_loader.load_data(column_filters)
         
-        st.divider()
-        st.header("📈 Metrics")
+        # Compute all metrics once per filter selection
+        metric_values = calc_engine.calculate_all_metrics(column_filters, filtered_data)
         
         # Key metrics
-        {% for metric in key_metrics %}
-        filtered_data = filter_manager.apply_filters(data, filters)
-        {{ metric.name }}_value = calc_engine.calculate_{{ metric.name }}(filtered_data)
-        try:
-            formatted_value = f"{{ metric.format }}".format({{ metric.name }}_value)
-        except (ValueError, TypeError):
-            formatted_value = str({{ metric.name }}_value)
-        st.metric("{{ metric.display_name }}", formatted_value)
-        {% endfor %}
-    
-    # Apply filters
-    filtered_data = filter_manager.apply_filters(data, filters)
+        render_key_metrics(metric_values)
     
     # Dashboard layout
     {{ dashboard_layout }}
@@ -128,69 +119,174 @@ def main():
 if __name__ == "__main__":
     main()
 """
-        
-        templates['main_app'] = Template(main_template)
-        
-        # Data loader template
-        data_loader_template = """
+
+
+_DATA_LOADER_TEMPLATE = """
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import snowflake.connector
-from snowflake.sqlalchemy import URL
-from sqlalchemy import create_engine
 import streamlit as st
 import os
+import time
+import hashlib
+from pathlib import Path
 from dotenv import load_dotenv
 from datetime import datetime
 
 load_dotenv()
 
+# How long loaded data is reused, in memory and on disk
+DATA_TTL = 3600  # seconds
+
+# Local Parquet snapshots let cold starts skip the Snowflake round trip. Each
+# app gets its own directory, and snapshots expire with the in-memory cache.
+SNAPSHOT_DIR = Path(os.getenv('SNAPSHOT_DIR', Path.home() / '.cache' / 'tab2app')) / '{{ app_slug }}'
+SNAPSHOT_MAX_AGE = DATA_TTL
+# Part of every snapshot key, so the same query against another account,
+# database, schema or role never reads this connection's rows
+CONNECTION_IDENTITY = tuple(
+    os.getenv(name, '') for name in
+    ('SNOWFLAKE_ACCOUNT', 'SNOWFLAKE_DATABASE', 'SNOWFLAKE_SCHEMA', 'SNOWFLAKE_ROLE')
+)
+
+CATEGORICAL_COLUMNS = {{ categorical_columns }}
+
+DATA_SINCE = '2020-01-01'
+
+DATA_QUERY = '''
+{{ data_query }}
+'''
+
+FILTER_OPTIONS_QUERY = '''
+{{ filter_options_query }}
+'''
+
+@st.cache_resource
+def _get_connection():
+    # One Snowflake session per Streamlit process, shared across sessions and reruns
+    return snowflake.connector.connect(
+        account=os.getenv('SNOWFLAKE_ACCOUNT'),
+        user=os.getenv('SNOWFLAKE_USER'),
+        password=os.getenv('SNOWFLAKE_PASSWORD'),
+        warehouse=os.getenv('SNOWFLAKE_WAREHOUSE'),
+        database=os.getenv('SNOWFLAKE_DATABASE'),
+        schema=os.getenv('SNOWFLAKE_SCHEMA'),
+        role=os.getenv('SNOWFLAKE_ROLE')
+    )
+
+def _to_frame(table):
+    # Dictionary-encoded dimensions become pandas categoricals, the rest stays Arrow-backed
+    return table.to_pandas(
+        types_mapper=lambda arrow_type: None if pa.types.is_dictionary(arrow_type) else pd.ArrowDtype(arrow_type)
+    )
+
 class DataLoader:
     def __init__(self):
-        self.engine = None
+        self.conn = None
         self.last_refresh = None
         self._connect()
     
     def _connect(self):
         try:
-            self.engine = create_engine(URL(
-                account=os.getenv('SNOWFLAKE_ACCOUNT'),
-                user=os.getenv('SNOWFLAKE_USER'),
-                password=os.getenv('SNOWFLAKE_PASSWORD'),
-                warehouse=os.getenv('SNOWFLAKE_WAREHOUSE'),
-                database=os.getenv('SNOWFLAKE_DATABASE'),
-                schema=os.getenv('SNOWFLAKE_SCHEMA'),
-                role=os.getenv('SNOWFLAKE_ROLE')
-            ))
+            self.conn = _get_connection()
         except Exception as e:
             st.error(f"Database connection failed: {e}")
     
-    @st.cache_data(ttl=3600)  # Cache for 1 hour
-    def load_data(_self):
+    def _query_table(self, sql, params=None):
+        # Snowflake ships results as Arrow batches; keep them columnar end to end
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(sql, params)
+            table = cursor.fetch_arrow_all()
+        finally:
+            cursor.close()
+        
+        return table if table is not None else pa.table({})  # None means no rows
+    
+    def _query(self, sql, params=None):
+        return _to_frame(self._query_table(sql, params))
+    
+    @st.cache_data(ttl='1h', max_entries=1)
+    def load_filter_options(_self):
         try:
-            query = '''
-            {{ data_query }}
-            '''
+            return _self._query(FILTER_OPTIONS_QUERY)
+        except Exception as e:
+            st.error(f"Filter options loading failed: {e}")
+            return pd.DataFrame()
+    
+    def load_data(self, column_filters=()):
+        return _to_frame(self._load_table(column_filters))
+    
+    # The cache holds Arrow tables: columnar buffers pickle without per-object
+    # overhead, and dictionary-encoded dimensions stay compact in memory.
+    # Bounded per filter selection so a few large result sets live in memory at once
+    @st.cache_data(ttl=DATA_TTL, max_entries=8, show_spinner='Loading Snowflake data...')
+    def _load_table(_self, column_filters=()):
+        try:
+            # Push filter selections into the WHERE clause as bound parameters
+            params = {'since': DATA_SINCE}
+            clauses = []
+            for i, (column, values) in enumerate(column_filters):
+                names = [f"f{i}_{j}" for j in range(len(values))]
+                params.update(zip(names, values))
+                placeholders = ', '.join(f"%({name})s" for name in names)
+                clauses.append(f'AND "{column}" IN ({placeholders})')
+            query = DATA_QUERY.format(filter_clause=' '.join(clauses))
+            
+            snapshot_key = repr((CONNECTION_IDENTITY, query, sorted(params.items()))).encode()
+            snapshot = SNAPSHOT_DIR / f"{hashlib.sha256(snapshot_key).hexdigest()[:16]}.parquet"
+            if snapshot.exists() and time.time() - snapshot.stat().st_mtime < SNAPSHOT_MAX_AGE:
+                table = pq.read_table(snapshot)
+            else:
+                table = _self._query_table(query, params)
+                
+                # Low-cardinality dimensions filter and group fastest as categoricals
+                for col in CATEGORICAL_COLUMNS:
+                    idx = table.schema.get_field_index(col)
+                    if idx >= 0 and not pa.types.is_dictionary(table.schema.field(idx).type):
+                        table = table.set_column(idx, col, table.column(idx).dictionary_encode())
+                
+                _self._write_snapshot(table, snapshot)
             
-            df = pd.read_sql(query, _self.engine)
             _self.last_refresh = datetime.now()
-            return df
+            return table
             
         except Exception as e:
             st.error(f"Data loading failed: {e}")
-            return pd.DataFrame()
+            return pa.table({})
+    
+    def _write_snapshot(self, table, snapshot):
+        try:
+            SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+            pq.write_table(table, snapshot)
+        except Exception as e:
+            # Snapshots are only an optimization; a failed write just means a cold fetch next time
+            st.warning(f"Could not write data snapshot: {e}")
     
     def refresh_data(self):
         st.cache_data.clear()
+        # Only this app's snapshots; other apps share the parent directory
+        for snapshot in SNAPSHOT_DIR.glob('*.parquet'):
+            snapshot.unlink(missing_ok=True)
         return self.load_data()
 """
-        
-        templates['data_loader'] = Template(data_loader_template)
-        
-        # Calculations template
-        calculations_template = """
+
+
+_CALCULATIONS_TEMPLATE = """
+import streamlit as st
 import pandas as pd
 import numpy as np
 from datetime import datetime
+{% if calculations | selectattr('kernel_code') | list %}
+import numba
+
+# JIT kernels are compiled on first use and cached on disk for later launches
+{% for calc in calculations if calc.kernel_code %}
+
+{{ calc.kernel_code }}
+{% endfor %}
+{% endif %}
 
 class CalculationEngine:
     def __init__(self):
@@ -211,24 +307,50 @@ class CalculationEngine:
             return 0  # Default value on error
     {% endfor %}
     
-    def calculate_all_metrics(self, data):
+    # Reruns triggered by unrelated widgets reuse the previous results. The rows
+    # are fully determined by the filter selections, so those are the cache key
+    # and the frame itself is left unhashed.
+    @st.cache_data(ttl=600, max_entries=32, show_spinner=False)
+    def calculate_all_metrics(_self, column_filters, _data):
         \"\"\"Calculate all metrics at once\"\"\"
+        data = _data
         results = {}
+        {% if reductions %}
+        
+        # Plain column aggregates are computed together, one agg() per reducer
+        try:
+            reduced = {
+                {% for op, columns in reductions.items() %}
+                '{{ op }}': data[{{ columns }}].agg('{{ op }}'),
+                {% endfor %}
+            }
+        except Exception:
+            reduced = None  # Fall back to the per-calculation methods
+        {% endif %}
         
         {% for calc in calculations %}
-        results['{{ calc.name }}'] = self.calculate_{{ calc.name }}(data)
+        {% if calc.reducer %}
+        if reduced is not None:
+            results['{{ calc.name }}'] = reduced['{{ calc.reducer[1] }}']['{{ calc.reducer[0] }}']
+        else:
+            results['{{ calc.name }}'] = _self.calculate_{{ calc.name }}(data)
+        {% else %}
+        results['{{ calc.name }}'] = _self.calculate_{{ calc.name }}(data)
+        {% endif %}
         {% endfor %}
         
         return results
 """
-        
-        templates['calculations'] = Template(calculations_template)
-        
-        # Filter manager template
-        filter_template = """
+
+
+_FILTERS_TEMPLATE = """
 import streamlit as st
 import pandas as pd
 
+@st.cache_data
+def _unique_sorted(df, col):
+    return sorted(df[col].dropna().unique())
+
 class FilterManager:
     def __init__(self):
         self.filters = {}
@@ -239,7 +361,7 @@ class FilterManager:
         {% for filter in filters %}
         # {{ filter.name }} filter
         if '{{ filter.column }}' in data.columns:
-            unique_values = sorted(data['{{ filter.column }}'].unique())
+            unique_values = _unique_sorted(data, '{{ filter.column }}')
             filters['{{ filter.name }}'] = st.multiselect(
                 "{{ filter.display_name }}",
                 options=unique_values,
@@ -250,20 +372,135 @@ class FilterManager:
         
         return filters
     
-    def apply_filters(self, data, filters):
-        filtered_data = data.copy()
+    def get_column_filters(self, filters):
+        # Hashable (column, values) pairs for the active selections
+        column_filters = []
         
         {% for filter in filters %}
-        if '{{ filter.name }}' in filters and filters['{{ filter.name }}']:
-            filtered_data = filtered_data[filtered_data['{{ filter.column }}'].isin(filters['{{ filter.name }}'])]
+        if filters.get('{{ filter.name }}'):
+            column_filters.append(('{{ filter.column }}', tuple(filters['{{ filter.name }}'])))
         {% endfor %}
         
-        return filtered_data
+        return tuple(column_filters)
 """
+
+# Leading blank lines would only become literal output chunks
+_TEMPLATE_SOURCES = {
+    name: source.lstrip('\n')
+    for name, source in {
+        'main_app': _MAIN_APP_TEMPLATE,
+        'data_loader': _DATA_LOADER_TEMPLATE,
+        'calculations': _CALCULATIONS_TEMPLATE,
+        'filters': _FILTERS_TEMPLATE,
+    }.items()
+}
+
+# Shared environment: compiled templates stay in-process (unbounded cache) and
+# their bytecode is persisted to disk so later launches skip the compile step.
+# Output is Python source, never HTML, so autoescaping stays off.
+_JINJA_ENV = Environment(
+    loader=DictLoader(_TEMPLATE_SOURCES),
+    auto_reload=False,
+    cache_size=-1,
+    bytecode_cache=FileSystemBytecodeCache(),
+    trim_blocks=True,
+    lstrip_blocks=True,
+    keep_trailing_newline=False,
+    autoescape=False,
+    optimized=True,
+)
+
+_ENV_TEMPLATE = """
+# Environment Variables Template
+SNOWFLAKE_ACCOUNT=your_account_here
+SNOWFLAKE_USER=your_user_here
+SNOWFLAKE_PASSWORD=your_password_here
+SNOWFLAKE_WAREHOUSE=your_warehouse_here
+SNOWFLAKE_DATABASE=your_database_here
+SNOWFLAKE_SCHEMA=your_schema_here
+SNOWFLAKE_ROLE=your_role_here
+"""
+# Identical in every package, so it is encoded once
+_ENV_TEMPLATE_BYTES = _ENV_TEMPLATE.encode('utf-8')
+# Package entries smaller than this many bytes are stored uncompressed
+_STORE_THRESHOLD = 1024
+
+# Runs of characters not allowed in a generated app's snapshot directory name
+_APP_SLUG_RE = re.compile(r'[^a-z0-9]+')
+# Whole-formula aggregate call, e.g. "SUM([Sales])", and its pandas method
+_AGG_CALL_RE = re.compile(r'^\s*(SUM|AVG|AVERAGE|COUNT|MAX|MIN)\s*\(\s*(.+?)\s*\)\s*$', re.IGNORECASE)
+# Plain binary arithmetic between two fields, e.g. "[Profit] / [Sales]"
+_FIELD_ARITHMETIC_RE = re.compile(r'^\s*\[([^\]]+)\]\s*([-+*/])\s*\[([^\]]+)\]\s*$')
+_AGG_METHODS = {
+    'SUM': 'sum',
+    'AVG': 'mean',
+    'AVERAGE': 'mean',
+    'COUNT': 'count',
+    'MAX': 'max',
+    'MIN': 'min',
+}
+
+# Static template context shared by every generated app. Read-only views,
+# so one generation can't leak edits into the next.
+_DEFAULT_FILTERS = (
+    MappingProxyType({'name': 'region', 'display_name': 'Region', 'column': 'Region'}),
+    MappingProxyType({'name': 'segment', 'display_name': 'Segment', 'column': 'Segment'}),
+    MappingProxyType({'name': 'category', 'display_name': 'Category', 'column': 'Category'}),
+)
+_DEFAULT_KEY_METRICS = (
+    MappingProxyType({'name': 'total_sales', 'display_name': 'Total Sales', 'format': '${:,.0f}'}),
+    MappingProxyType({'name': 'total_profit', 'display_name': 'Total Profit', 'format': '${:,.0f}'}),
+    MappingProxyType({'name': 'profit_margin', 'display_name': 'Profit Margin', 'format': '{:.1%}'}),
+    MappingProxyType({'name': 'order_count', 'display_name': 'Orders', 'format': '{:,.0f}'}),
+)
+
+# SuperStore ORDERS columns in SELECT order
+_SOURCE_COLUMNS = (
+    'Order Date', 'Ship Date', 'Customer Name', 'Segment', 'Country', 'City',
+    'State', 'Region', 'Product Name', 'Category', 'Sub-Category',
+    'Sales', 'Quantity', 'Discount', 'Profit',
+)
+# Low-cardinality SuperStore dimensions the generated loader dictionary-encodes
+_CATEGORICAL_COLUMNS = ('Region', 'Segment', 'Category', 'Sub-Category', 'Country', 'State')
+
+
+def _quote_identifier(name: str) -> str:
+    """Quote a Snowflake identifier, doubling any embedded double quotes"""
+    return '"' + name.replace('"', '""') + '"'
+
+
+# Quoted and joined once at import. Every column is selected: the Raw Data tab
+# and the CSV download show the whole frame, not just what the charts use.
+_SOURCE_SELECT_LIST = ',\n            '.join(_quote_identifier(column) for column in _SOURCE_COLUMNS)
+
+
+@dataclass(slots=True)
+class GeneratedApp:
+    """Represents a generated Streamlit application"""
+    name: str
+    main_file: str
+    supporting_files: Dict[str, str]
+    requirements: List[str]
+    deployment_config: Dict[str, Any]
+    documentation: str
+
+
+class StreamlitGenerator:
+    """Generates complete Streamlit applications from Tableau workbooks"""
+    
+    # Compiled templates, shared by every generator instance in the process. Built
+    # at import, which loads marshalled bytecode from the on-disk cache on warm starts.
+    _template_cache: Dict[str, Template] = {
+        name: _JINJA_ENV.get_template(name) for name in _TEMPLATE_SOURCES
+    }
+    
+    def __init__(self):
+        self.env = _JINJA_ENV
+        self.templates = self._load_templates()
         
-        templates['filters'] = Template(filter_template)
-        
-        return templates
+    def _load_templates(self) -> Dict[str, Template]:
+        """Load Jinja2 templates from the shared environment, compiled once per process"""
+        return type(self)._template_cache
     
     def generate_app(self, 
                     workbook_structure: Any,
@@ -285,7 +522,10 @@ class FilterManager:
         supporting_files = self._generate_supporting_files(workbook_structure, dashboard_info)
         
         # Generate requirements
-        requirements = self._generate_requirements(chart_library)
+        requirements = self._generate_requirements(
+            chart_library,
+            uses_numba=any(calc['kernel_code'] for calc in dashboard_info['calculations'])
+        )
         
         # Generate deployment config
         deployment_config = self._generate_deployment_config(dashboard_info)
@@ -320,6 +560,17 @@ class FilterManager:
         # Extract calculations
         calculations = []
         for calc_name, calc in workbook_structure.calculations.items():
+            # Use field mapper for proper naming if available
+            if field_mapper:
+                python_name = field_mapper.get_python_name_for_field(calc_name)
+                display_name = field_mapper.get_display_label_for_field(calc_name)
+            else:
+                python_name = calc_name.replace(' ', '_').replace('-', '_').lower()
+                display_name = calc_name
+            
+            kernel_code = None
+            reducer = None
+            
             # Get translated formula if available
             if translated_formulas and calc_name in translated_formulas and translated_formulas[calc_name]:
                 translation = translated_formulas[calc_name]
@@ -332,16 +583,13 @@ class FilterManager:
                 else:
                     python_code = f"result = {python_code}"
             else:
-                # Fallback to a basic implementation
-                python_code = self._generate_fallback_calculation(calc, field_mapper)
-            
-            # Use field mapper for proper naming if available
-            if field_mapper:
-                python_name = field_mapper.get_python_name_for_field(calc_name)
-                display_name = field_mapper.get_display_label_for_field(calc_name)
-            else:
-                python_name = calc_name.replace(' ', '_').replace('-', '_').lower()
-                display_name = calc_name
+                # Row-wise field arithmetic gets a JIT kernel, the rest a basic implementation
+                kernel = self._generate_numeric_kernel(calc, python_name, field_mapper)
+                if kernel:
+                    kernel_code, python_code = kernel
+                else:
+                    python_code = self._generate_fallback_calculation(calc, field_mapper)
+                    reducer = self._match_column_reduction(calc, field_mapper)
             
             calculations.append({
                 'name': python_name,
@@ -349,15 +597,13 @@ class FilterManager:
                 'original_formula': calc.formula,
                 'description': f"Calculation for {display_name}",
                 'python_code': python_code,
+                'kernel_code': kernel_code,
+                'reducer': reducer,
                 'dependencies': calc.dependencies
             })
         
         # Extract filters (basic implementation)
-        filters = [
-            {'name': 'region', 'display_name': 'Region', 'column': 'Region'},
-            {'name': 'segment', 'display_name': 'Segment', 'column': 'Segment'},
-            {'name': 'category', 'display_name': 'Category', 'column': 'Category'},
-        ]
+        filters = _DEFAULT_FILTERS
         
         # Key metrics - dynamically generate from calculations
         key_metrics = []
@@ -383,13 +629,7 @@ class FilterManager:
         
         # If we have fewer than 4 calculations, add some default metrics
         if metric_count < 4:
-            default_metrics = [
-                {'name': 'total_sales', 'display_name': 'Total Sales', 'format': '${:,.0f}'},
-                {'name': 'total_profit', 'display_name': 'Total Profit', 'format': '${:,.0f}'},
-                {'name': 'profit_margin', 'display_name': 'Profit Margin', 'format': '{:.1%}'},
-                {'name': 'order_count', 'display_name': 'Orders', 'format': '{:,.0f}'},
-            ]
-            key_metrics.extend(default_metrics[metric_count:4])
+            key_metrics.extend(_DEFAULT_KEY_METRICS[metric_count:4])
         
         return {
             'name': dashboard_name,
@@ -399,42 +639,22 @@ class FilterManager:
             'calculations': calculations,
             'filters': filters,
             'key_metrics': key_metrics,
-            'data_query': self._generate_data_query(workbook_structure)
+            'data_query': self._generate_data_query(workbook_structure),
+            'filter_options_query': self._generate_filter_options_query(filters)
         }
     
     def _generate_fallback_calculation(self, calc: Any, field_mapper: Optional[Any] = None) -> str:
         """Generate fallback calculation when translation is not available"""
-        # Try to generate a basic Python implementation based on common patterns
-        formula = calc.formula.upper()
-        
         def get_column_name(field_name: str) -> str:
             """Get proper column name, using field mapper if available"""
-            clean_field = field_name.strip('[]"')
-            if field_mapper:
-                return field_mapper.get_python_name_for_field(clean_field)
-            return clean_field
-        
-        if 'SUM(' in formula:
-            field = calc.formula[calc.formula.find('(')+1:calc.formula.rfind(')')].strip('[]"')
-            col_name = get_column_name(field)
-            return f"result = data['{col_name}'].sum()"
-        elif 'AVG(' in formula or 'AVERAGE(' in formula:
-            field = calc.formula[calc.formula.find('(')+1:calc.formula.rfind(')')].strip('[]"')
-            col_name = get_column_name(field)
-            return f"result = data['{col_name}'].mean()"
-        elif 'COUNT(' in formula:
-            field = calc.formula[calc.formula.find('(')+1:calc.formula.rfind(')')].strip('[]"')
-            col_name = get_column_name(field)
-            return f"result = data['{col_name}'].count()"
-        elif 'MAX(' in formula:
-            field = calc.formula[calc.formula.find('(')+1:calc.formula.rfind(')')].strip('[]"')
-            col_name = get_column_name(field)
-            return f"result = data['{col_name}'].max()"
-        elif 'MIN(' in formula:
-            field = calc.formula[calc.formula.find('(')+1:calc.formula.rfind(')')].strip('[]"')
-            col_name = get_column_name(field)
-            return f"result = data['{col_name}'].min()"
-        elif '/' in formula and calc.calculation_type == 'basic':
+            return self._resolve_column_name(field_name, field_mapper)
+        
+        # Try to generate a basic Python implementation based on common patterns
+        reduction = self._match_column_reduction(calc, field_mapper)
+        if reduction:
+            col_name, op = reduction
+            return f"result = data['{col_name}'].{op}()"
+        elif '/' in calc.formula and calc.calculation_type == 'basic':
             # Handle simple division like profit margin
             parts = calc.formula.split('/')
             if len(parts) == 2:
@@ -447,6 +667,51 @@ class FilterManager:
             # Default implementation
             return f"# TODO: Implement calculation for: {calc.formula}\n        result = 0"
     
+    def _resolve_column_name(self, field_name: str, field_mapper: Optional[Any] = None) -> str:
+        """Get proper column name, using field mapper if available"""
+        clean_field = field_name.strip('[]"')
+        if field_mapper:
+            return field_mapper.get_python_name_for_field(clean_field)
+        return clean_field
+    
+    def _match_column_reduction(self, calc: Any, field_mapper: Optional[Any] = None) -> Optional[Tuple[str, str]]:
+        """Return (column, pandas reducer) when the formula is a plain aggregate of one field"""
+        agg_match = _AGG_CALL_RE.match(calc.formula)
+        if not agg_match:
+            return None
+        return (self._resolve_column_name(agg_match.group(2), field_mapper),
+                _AGG_METHODS[agg_match.group(1).upper()])
+    
+    def _generate_numeric_kernel(self, calc: Any, python_name: str,
+                                 field_mapper: Optional[Any] = None) -> Optional[Tuple[str, str]]:
+        """Generate a Numba kernel and its call site for arithmetic between two fields"""
+        arithmetic_match = _FIELD_ARITHMETIC_RE.match(calc.formula)
+        if not arithmetic_match:
+            return None
+        
+        left, op, right = arithmetic_match.groups()
+        if field_mapper:
+            left = field_mapper.get_python_name_for_field(left)
+            right = field_mapper.get_python_name_for_field(right)
+        
+        kernel_name = f"_kernel_{python_name}"
+        # error_model='numpy' keeps pandas semantics for zero denominators (inf/nan, no raise).
+        # fastmath is left off: it assumes no NaNs, and missing values arrive as NaN here.
+        kernel_code = f"""@numba.njit(cache=True, error_model='numpy')
+def {kernel_name}(left, right):
+    out = np.empty(left.shape[0])
+    for i in range(left.shape[0]):
+        out[i] = left[i] {op} right[i]
+    return out"""
+        python_code = f"""result = pd.Series(
+    {kernel_name}(
+        data['{left}'].to_numpy(dtype=np.float64, na_value=np.nan),
+        data['{right}'].to_numpy(dtype=np.float64, na_value=np.nan),
+    ),
+    index=data.index,
+)"""
+        return kernel_code, python_code
+    
     def _generate_main_file(self, dashboard_info: Dict[str, Any], chart_library: str, theme: str) -> str:
         """Generate main Streamlit app file"""
         
@@ -487,29 +752,43 @@ class FilterManager:
         tabs_str = ', '.join(tab_contents)
         tab_names_str = ', '.join([f'"{name}"' for name in tab_names])
         
-        layout_code = f"""
+        layout_parts = [f"""
+    # Classify columns once per rerun; every tab reuses these lists
+    numeric_cols = filtered_data.select_dtypes(include='number').columns.tolist()
+    categorical_cols = filtered_data.select_dtypes(include=['object', 'string', 'category']).columns.tolist()
+    
+    # Streamlit runs every tab body on each rerun, so format the headline
+    # metrics once here instead of once per worksheet tab
+    headline_metrics = []
+    for metric_name, metric_value in list(metric_values.items())[:4]:
+        try:
+            formatted_value = f"{{float(metric_value):,.2f}}"
+        except (ValueError, TypeError):
+            formatted_value = str(metric_value)
+        headline_metrics.append((metric_name.replace('_', ' ').title(), formatted_value))
+    
+    # Every worksheet tab charts the same aggregate; group the frame once
+    chart_data = None
+    if categorical_cols and numeric_cols:
+        cat_col = categorical_cols[0]
+        num_col = numeric_cols[0]
+        chart_data = filtered_data.groupby(cat_col, observed=True, sort=False)[num_col].sum().reset_index()
+    
     # Main dashboard content
     {tabs_str} = st.tabs([{tab_names_str}])
-    """
+    """]
         
         # Generate content for each worksheet tab
         for i, worksheet in enumerate(worksheets[:5]):
-            layout_code += f"""
+            layout_parts.append(f"""
     with tab{i+1}:
         st.subheader("{worksheet}")
         
-        # Calculate metrics for this worksheet
-        worksheet_metrics = calc_engine.calculate_all_metrics(filtered_data)
-        
         # Display metrics
         metric_cols = st.columns(4)
-        for idx, (metric_name, metric_value) in enumerate(list(worksheet_metrics.items())[:4]):
+        for idx, (metric_label, formatted_value) in enumerate(headline_metrics):
             with metric_cols[idx % 4]:
-                try:
-                    formatted_value = f"{{float(metric_value):,.2f}}"
-                except (ValueError, TypeError):
-                    formatted_value = str(metric_value)
-                st.metric(metric_name.replace('_', ' ').title(), formatted_value)
+                st.metric(metric_label, formatted_value)
         
         # Create visualizations based on available data
         if filtered_data.shape[0] > 0:
@@ -517,13 +796,7 @@ class FilterManager:
             
             with col1:
                 # Dynamic chart based on data
-                numeric_cols = filtered_data.select_dtypes(include=['float64', 'int64']).columns.tolist()
-                categorical_cols = filtered_data.select_dtypes(include=['object']).columns.tolist()
-                
-                if len(categorical_cols) > 0 and len(numeric_cols) > 0:
-                    cat_col = categorical_cols[0]
-                    num_col = numeric_cols[0]
-                    chart_data = filtered_data.groupby(cat_col)[num_col].sum().reset_index()
+                if chart_data is not None:
                     fig = px.bar(chart_data, x=cat_col, y=num_col, title=f"{{num_col}} by {{cat_col}}")
                     st.plotly_chart(fig, use_container_width=True)
             
@@ -533,10 +806,10 @@ class FilterManager:
                     fig2 = px.scatter(filtered_data, x=numeric_cols[0], y=numeric_cols[1], 
                                      title=f"{{numeric_cols[0]}} vs {{numeric_cols[1]}}")
                     st.plotly_chart(fig2, use_container_width=True)
-    """
+    """)
         
         # Add details tab
-        layout_code += f"""
+        layout_parts.append(f"""
     with tab{len(worksheets)+1}:
         st.subheader("Detailed Data")
         
@@ -544,7 +817,7 @@ class FilterManager:
         with st.expander("📐 Calculated Fields"):
             calc_df = pd.DataFrame([
                 {{'Calculation': name, 'Value': value}} 
-                for name, value in calc_engine.calculate_all_metrics(filtered_data).items()
+                for name, value in metric_values.items()
             ])
             st.dataframe(calc_df, use_container_width=True)
         
@@ -552,21 +825,25 @@ class FilterManager:
         st.subheader("📊 Raw Data")
         st.dataframe(filtered_data, use_container_width=True, height=400)
         
-        # Download button
-        csv = filtered_data.to_csv(index=False)
+        # Download button; the CSV is only built when the user clicks it
         st.download_button(
             label="📥 Download Data as CSV",
-            data=csv,
+            data=lambda: to_csv_bytes(filtered_data),
             file_name=f"dashboard_data_{{datetime.now().strftime('%Y%m%d')}}.csv",
             mime="text/csv"
         )
-"""
+""")
         
-        return layout_code
+        return ''.join(layout_parts)
     
     def _generate_default_layout(self, chart_library: str) -> str:
         """Generate default layout when no worksheets are found"""
         return """
+    # Classify columns once per rerun; every tab reuses these lists
+    numeric_cols = filtered_data.select_dtypes(include='number').columns.tolist()
+    categorical_cols = filtered_data.select_dtypes(include=['object', 'string', 'category']).columns.tolist()
+    date_cols = filtered_data.select_dtypes(include=['datetime64']).columns.tolist()
+    
     # Main dashboard content
     tab1, tab2, tab3 = st.tabs(["📊 Overview", "📈 Analysis", "🔍 Details"])
     
@@ -575,9 +852,8 @@ class FilterManager:
         
         # Display key metrics
         metric_cols = st.columns(4)
-        metrics = calc_engine.calculate_all_metrics(filtered_data)
         
-        for idx, (metric_name, metric_value) in enumerate(list(metrics.items())[:4]):
+        for idx, (metric_name, metric_value) in enumerate(list(metric_values.items())[:4]):
             with metric_cols[idx]:
                 try:
                     formatted_value = f"{float(metric_value):,.2f}"
@@ -585,36 +861,38 @@ class FilterManager:
                     formatted_value = str(metric_value)
                 st.metric(metric_name.replace('_', ' ').title(), formatted_value)
         
-        # Overview charts
+        # Overview charts share one aggregation; the pie gets the grouped rows
+        # rather than the full frame, so only one slice per category is shipped
+        chart_data = None
+        if categorical_cols and numeric_cols:
+            chart_data = filtered_data.groupby(categorical_cols[0], observed=True, sort=False)[numeric_cols[0]].sum().reset_index()
+        
         col1, col2 = st.columns(2)
         
         with col1:
             # Dynamic chart based on available columns
-            numeric_cols = filtered_data.select_dtypes(include=['float64', 'int64']).columns.tolist()
-            categorical_cols = filtered_data.select_dtypes(include=['object']).columns.tolist()
-            
-            if categorical_cols and numeric_cols:
-                chart_data = filtered_data.groupby(categorical_cols[0])[numeric_cols[0]].sum().reset_index()
+            if chart_data is not None:
                 fig1 = px.bar(chart_data, x=categorical_cols[0], y=numeric_cols[0])
                 st.plotly_chart(fig1, use_container_width=True)
         
         with col2:
-            if len(categorical_cols) > 0 and len(numeric_cols) > 0:
-                fig2 = px.pie(filtered_data, values=numeric_cols[0], names=categorical_cols[0])
+            if chart_data is not None:
+                fig2 = px.pie(chart_data, values=numeric_cols[0], names=categorical_cols[0])
                 st.plotly_chart(fig2, use_container_width=True)
     
     with tab2:
         st.subheader("Analysis")
         
         # Time series analysis if date column exists
-        date_cols = filtered_data.select_dtypes(include=['datetime64']).columns.tolist()
         if date_cols:
-            numeric_cols = filtered_data.select_dtypes(include=['float64', 'int64']).columns.tolist()
             if numeric_cols:
-                monthly_data = filtered_data.groupby(
-                    filtered_data[date_cols[0]].dt.to_period('M')
-                )[numeric_cols[0]].sum().reset_index()
-                monthly_data[date_cols[0]] = monthly_data[date_cols[0]].astype(str)
+                # Month bins come from the int64 timestamps; no per-row string formatting
+                monthly_data = (
+                    filtered_data[numeric_cols[0]]
+                    .set_axis(pd.DatetimeIndex(filtered_data[date_cols[0]]))
+                    .resample('MS').sum()
+                    .reset_index()
+                )
                 
                 fig3 = px.line(monthly_data, x=date_cols[0], y=numeric_cols[0],
                               title=f"Monthly {numeric_cols[0]} Trend")
@@ -624,10 +902,9 @@ class FilterManager:
         st.subheader("Detailed Data")
         st.dataframe(filtered_data, use_container_width=True, height=400)
         
-        csv = filtered_data.to_csv(index=False)
         st.download_button(
             label="📥 Download Data as CSV",
-            data=csv,
+            data=lambda: to_csv_bytes(filtered_data),
             file_name=f"dashboard_data_{datetime.now().strftime('%Y%m%d')}.csv",
             mime="text/csv"
         )
@@ -640,12 +917,29 @@ class FilterManager:
         
         # Data loader
         files['utils/data_loader.py'] = self.templates['data_loader'].render(
-            data_query=dashboard_info['data_query']
+            app_slug=_APP_SLUG_RE.sub('-', dashboard_info['name'].lower()).strip('-') or 'app',
+            data_query=dashboard_info['data_query'],
+            filter_options_query=dashboard_info['filter_options_query'],
+            # Filter columns are isin/groupby keys too, so they are always encoded
+            categorical_columns=tuple(dict.fromkeys(
+                _CATEGORICAL_COLUMNS + tuple(filter_def['column'] for filter_def in dashboard_info['filters'])
+            ))
         )
         
         # Calculations
+        # Group plain aggregates by reducer so each one runs as a single
+        # multi-column agg() call instead of one pass per metric
+        reductions: Dict[str, List[str]] = {}
+        for calc in dashboard_info['calculations']:
+            if calc['reducer']:
+                column, op = calc['reducer']
+                columns = reductions.setdefault(op, [])
+                if column not in columns:
+                    columns.append(column)
+        
         files['utils/calculations.py'] = self.templates['calculations'].render(
-            calculations=dashboard_info['calculations']
+            calculations=dashboard_info['calculations'],
+            reductions=reductions
         )
         
         # Filters
@@ -662,41 +956,34 @@ class FilterManager:
         """Generate data query based on workbook structure"""
         
         # Basic query for SuperStore data
-        query = """
+        query = f"""
         SELECT 
-            "Order Date",
-            "Ship Date",
-            "Customer Name",
-            "Segment",
-            "Country",
-            "City",
-            "State",
-            "Region",
-            "Product Name",
-            "Category",
-            "Sub-Category",
-            "Sales",
-            "Quantity",
-            "Discount",
-            "Profit"
+            {_SOURCE_SELECT_LIST}
         FROM ORDERS
-        WHERE "Order Date" >= '2020-01-01'
+        WHERE "Order Date" >= %(since)s
+        {{filter_clause}}
         ORDER BY "Order Date" DESC
         """
         
         return query
     
-    def _generate_requirements(self, chart_library: str) -> List[str]:
+    def _generate_filter_options_query(self, filters: List[Dict[str, str]]) -> str:
+        """Generate the query that lists the distinct values offered by each filter"""
+        
+        columns = ', '.join(_quote_identifier(filter_def['column']) for filter_def in filters)
+        return f"SELECT DISTINCT {columns} FROM ORDERS"
+
+    
+    def _generate_requirements(self, chart_library: str, uses_numba: bool = False) -> List[str]:
         """Generate requirements.txt content"""
         
         base_requirements = [
-            "streamlit>=1.28.0",
+            "streamlit>=1.52.0",  # download_button with deferred (callable) data
             "pandas>=2.0.0",
             "numpy>=1.24.0",
-            "snowflake-connector-python>=3.5.0",
-            "snowflake-sqlalchemy>=1.5.0",
-            "python-dotenv>=1.0.0",
-            "sqlalchemy>=2.0.0"
+            "pyarrow>=14.0",
+            "snowflake-connector-python[pandas]>=3.5.0",
+            "python-dotenv>=1.0.0"
         ]
         
         if chart_library == "plotly":
@@ -706,6 +993,9 @@ class FilterManager:
         elif chart_library == "matplotlib":
             base_requirements.extend(["matplotlib>=3.7.0", "seaborn>=0.12.0"])
         
+        if uses_numba:
+            base_requirements.append("numba>=0.59.0")
+        
         return base_requirements
     
     def _generate_deployment_config(self, dashboard_info: Dict[str, Any]) -> Dict[str, Any]:
@@ -728,7 +1018,7 @@ class FilterManager:
     def _generate_documentation(self, dashboard_info: Dict[str, Any]) -> str:
         """Generate documentation"""
         
-        docs = f"""
+        docs = [f"""
 # {dashboard_info['title']} - Generated Dashboard
 
 ## Overview
@@ -766,21 +1056,25 @@ vercel --prod
 
 ### Calculations
 {len(dashboard_info['calculations'])} calculated fields:
-"""
+"""]
         
-        for calc in dashboard_info['calculations']:
-            docs += f"- **{calc['display_name']}**: {calc['description']}\n"
+        docs.extend(
+            f"- **{calc['display_name']}**: {calc['description']}\n"
+            for calc in dashboard_info['calculations']
+        )
         
-        docs += f"""
+        docs.append(f"""
 
 ### Filters
 {len(dashboard_info['filters'])} interactive filters:
-"""
+""")
         
-        for filter_def in dashboard_info['filters']:
-            docs += f"- **{filter_def['display_name']}**: Filter by {filter_def['column']}\n"
+        docs.extend(
+            f"- **{filter_def['display_name']}**: Filter by {filter_def['column']}\n"
+            for filter_def in dashboard_info['filters']
+        )
         
-        docs += """
+        docs.append("""
 
 ## Customization
 - Edit `utils/calculations.py` to modify calculation logic
@@ -789,43 +1083,39 @@ vercel --prod
 
 ## Support
 Generated with Intelligent Tableau Converter
-"""
+""")
         
-        return docs
+        return ''.join(docs)
     
     def create_deployment_package(self, app: GeneratedApp) -> bytes:
         """Create deployment package as ZIP file"""
         
         zip_buffer = io.BytesIO()
-        
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            # Main app file
-            zip_file.writestr('app.py', app.main_file)
-            
-            # Supporting files
-            for file_path, content in app.supporting_files.items():
-                zip_file.writestr(file_path, content)
-            
-            # Requirements
-            zip_file.writestr('requirements.txt', '\n'.join(app.requirements))
-            
-            # Documentation
-            zip_file.writestr('README.md', app.documentation)
-            
-            # Environment template
-            zip_file.writestr('.env.template', """
-# Environment Variables Template
-SNOWFLAKE_ACCOUNT=your_account_here
-SNOWFLAKE_USER=your_user_here
-SNOWFLAKE_PASSWORD=your_password_here
-SNOWFLAKE_WAREHOUSE=your_warehouse_here
-SNOWFLAKE_DATABASE=your_database_here
-SNOWFLAKE_SCHEMA=your_schema_here
-SNOWFLAKE_ROLE=your_role_here
-""")
-            
-            # Deployment configs
-            zip_file.writestr('vercel.json', json.dumps(app.deployment_config['vercel'], indent=2))
-        
-        zip_buffer.seek(0)
-        return zip_buffer.getvalue()
\ No newline at end of file
+        self.write_deployment_package(app, zip_buffer)
+        return zip_buffer.getvalue()
+    
+    def write_deployment_package(self, app: GeneratedApp, out: IO[bytes]) -> None:
+        """Stream deployment package as ZIP into a writable binary file object"""
+        
+        files = [('app.py', app.main_file)]
+        files.extend(app.supporting_files.items())
+        files.extend([
+            ('requirements.txt', '\n'.join(app.requirements)),
+            ('README.md', app.documentation),
+            ('vercel.json', json.dumps(app.deployment_config['vercel'], indent=2)),
+        ])
+        
+        # Encode every payload up front and stamp all entries with one timestamp
+        payloads = [(name, content.encode('utf-8')) for name, content in files]
+        payloads.insert(-1, ('.env.template', _ENV_TEMPLATE_BYTES))
+        date_time = datetime.now().timetuple()[:6]
+        
+        # Payloads are a few KB of text downloaded once; fastest deflate level
+        # keeps packaging cheap while still shrinking the archive. Entries below
+        # _STORE_THRESHOLD are stored as-is, where deflate setup costs more than it saves.
+        with zipfile.ZipFile(out, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as zip_file:
+            for name, data in payloads:
+                info = zipfile.ZipInfo(name, date_time=date_time)
+                info.external_attr = 0o644 << 16  # rw-r--r-- when unpacked
+                compress_type = zipfile.ZIP_STORED if len(data) < _STORE_THRESHOLD else zipfile.ZIP_DEFLATED
+                zip_file.writestr(info, data, compress_type=compress_type, compresslevel=1)
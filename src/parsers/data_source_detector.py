@@ -2,15 +2,142 @@
 Data Source Detector - Identifies actual data sources used in Tableau workbooks
 """
 import logging
+import sys
 import zipfile
 from typing import Dict, List, Tuple, Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 
+from .twbx_parser import locate_embedded
+
 logger = logging.getLogger(__name__)
 
+# Connection class preference, most specific first: databases > hyper > excel > federated
+_CONNECTION_PRIORITY = {'snowflake': 0, 'hyper': 1, 'excel-direct': 2, 'federated': 3}
+_UNRANKED = len(_CONNECTION_PRIORITY)
+
+# Connection classes that query a live database rather than a file or extract
+_LIVE_CONNECTION_TYPES = frozenset({'snowflake', 'postgres', 'mysql'})
+
+
+# Connection snippets emitted for each source type; filled with str.format_map
+_HYPER_CONNECTION_TEMPLATE = '''
+# Connect to Tableau Hyper Extract
+import pandas as pd
+from tableauhyperapi import HyperProcess, Telemetry, Connection, TableName
+
+# Path to embedded hyper file
+HYPER_FILE = "{embedded_file}"
+
+def load_data_from_hyper():
+    """Load data from Tableau Hyper extract"""
+    
+    # hyperd and the connection close on exit, so reruns don't leak the
+    # process or keep the extract file locked
+    with HyperProcess(telemetry=Telemetry.SEND_USAGE_DATA_TO_TABLEAU) as hyper:
+        with Connection(endpoint=hyper.endpoint, database=HYPER_FILE) as connection:
+            # Get table names
+            table_names = connection.catalog.get_table_names(schema_name="Extract")
+            
+            # Load main table (usually first one)
+            if table_names:
+                table_name = table_names[0]
+                query = f"SELECT * FROM {{table_name}}"
+                columns = [col.name for col in connection.catalog.get_table_definition(table_name).columns]
+                
+                # Build the DataFrame straight from the result stream, no intermediate row list
+                with connection.execute_query(query) as result:
+                    return pd.DataFrame.from_records(iter(result), columns=columns)
+    
+    return pd.DataFrame()  # Empty fallback
+
+# Load the data
+df = load_data_from_hyper()
+'''
+
+_SNOWFLAKE_CONNECTION_TEMPLATE = '''
+# Connect to Snowflake
+import pandas as pd
+import snowflake.connector
+import os
 
-@dataclass
+def load_data_from_snowflake():
+    """Load data from Snowflake"""
+    
+    # Connection parameters
+    connection_params = {{
+        'account': os.getenv('SNOWFLAKE_ACCOUNT'),
+        'user': os.getenv('SNOWFLAKE_USER'),
+        'password': os.getenv('SNOWFLAKE_PASSWORD'),
+        'warehouse': os.getenv('SNOWFLAKE_WAREHOUSE'),
+        'database': '{database}',
+        'schema': '{schema}',
+        'role': os.getenv('SNOWFLAKE_ROLE')
+    }}
+    
+    # Query data (adjust table name as needed)
+    query = """
+    SELECT * FROM YOUR_TABLE_NAME
+    LIMIT 10000
+    """
+    
+    # Pull the Arrow result batches and keep them Arrow-backed in pandas,
+    # skipping both pd.read_sql's row tuples and a copy into NumPy dtypes
+    with snowflake.connector.connect(**connection_params) as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(query)
+            table = cursor.fetch_arrow_all()
+    
+    if table is None:  # Query returned no rows
+        return pd.DataFrame()
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+# Load the data
+df = load_data_from_snowflake()
+'''
+
+_EXCEL_CONNECTION_TEMPLATE = '''
+# Connect to Excel file
+import pandas as pd
+
+def load_data_from_excel():
+    """Load data from Excel file"""
+    
+    # Note: Excel file path from Tableau may need adjustment
+    excel_file = "{excel_file}"
+    
+    # Read Excel file with the Rust-backed calamine reader instead of openpyxl
+    # requires: pip install python-calamine
+    df = pd.read_excel(excel_file, engine='calamine')
+    
+    return df
+
+# Load the data
+df = load_data_from_excel()
+'''
+
+_GENERIC_CONNECTION_TEMPLATE = '''
+# Generic data connection for {connection_type}
+import pandas as pd
+
+def load_data():
+    """Load data from {caption}"""
+    
+    # TODO: Implement connection to {connection_type}
+    # Connection details: {connection_details}
+    
+    # For now, return sample data
+    return pd.DataFrame({{
+        'Sample_Field': ['A', 'B', 'C'],
+        'Sample_Value': [1, 2, 3]
+    }})
+
+# Load the data
+df = load_data()
+'''
+
+
+@dataclass(slots=True)
 class DataSourceInfo:
     """Information about a detected data source"""
     name: str
@@ -19,11 +146,7 @@ class DataSourceInfo:
     connection_details: Dict[str, str]
     embedded_file: Optional[str] = None
     is_primary: bool = False
-    worksheets_using: List[str] = None
-    
-    def __post_init__(self):
-        if self.worksheets_using is None:
-            self.worksheets_using = []
+    worksheets_using: List[str] = field(default_factory=list)
 
 
 class DataSourceDetector:
@@ -31,9 +154,19 @@ class DataSourceDetector:
     
     def __init__(self):
         self.detected_sources = []
+        self._primary = None
+    
+    @property
+    def primary_source(self) -> Optional[DataSourceInfo]:
+        """The source flagged as primary by the last detection, if any"""
+        return self._primary
+        
+    def detect_data_sources(self, workbook_structure,
+                            twbx_path: Optional[str] = None) -> List[DataSourceInfo]:
+        """Detect all data sources and their usage patterns
         
-    def detect_data_sources(self, workbook_structure) -> List[DataSourceInfo]:
-        """Detect all data sources and their usage patterns"""
+        With twbx_path, embedded files are resolved to their path inside the archive.
+        """
         
         logger.info("Detecting data sources in workbook...")
         
@@ -47,26 +180,31 @@ class DataSourceDetector:
             if source_info:
                 detected_sources.append(source_info)
         
+        if twbx_path:
+            self._resolve_embedded_files(detected_sources, twbx_path)
+        
         # Identify primary data source
         primary_source = self._identify_primary_source(detected_sources)
         if primary_source:
             primary_source.is_primary = True
         
         # Map worksheets to data sources
-        self._map_worksheets_to_sources(detected_sources, workbook_structure.worksheets)
+        self._map_worksheets_to_sources(primary_source, workbook_structure.worksheets)
         
         self.detected_sources = detected_sources
+        self._primary = primary_source
         return detected_sources
     
     def _get_unique_sources(self, datasources: List[Dict]) -> List[Dict]:
         """Remove duplicate data source entries and filter out non-data sources"""
         
-        unique_sources = []
-        seen_names = set()
+        # Registered sources keyed by (name, caption); insertion order is workbook order
+        unique_sources: Dict[Tuple[str, str], Dict] = {}
         
         for ds in datasources:
             name = ds.get('name', '')
             caption = ds.get('caption', '')
+            connections = ds.get('connections')
             
             # Skip parameters
             if name == 'Parameters' or caption == 'Parameters':
@@ -79,19 +217,19 @@ class DataSourceDetector:
                 continue
                 
             # Skip if no connections (likely a reference, not actual datasource)
-            if not ds.get('connections'):
+            if not connections:
                 logger.debug(f"Skipping datasource without connections: {name}")
                 continue
             
             # Skip duplicates (same name/caption combo)
-            key = f"{name}_{caption}"
-            if key in seen_names:
+            key = (name, caption)
+            if key in unique_sources:
                 logger.debug(f"Skipping duplicate datasource: {name}")
                 continue
                 
             # Check if connections have meaningful content
             valid_connections = []
-            for conn in ds.get('connections', []):
+            for conn in connections:
                 conn_class = conn.get('class', '')
                 if conn_class and conn_class != 'genericodbc':  # Skip generic empty connections
                     valid_connections.append(conn)
@@ -99,13 +237,12 @@ class DataSourceDetector:
             if valid_connections:
                 # Update datasource with only valid connections
                 ds['connections'] = valid_connections
-                seen_names.add(key)
-                unique_sources.append(ds)
+                unique_sources[key] = ds
                 logger.info(f"Added unique datasource: {caption or name} ({len(valid_connections)} connections)")
             else:
                 logger.debug(f"Skipping datasource with no valid connections: {name}")
         
-        return unique_sources
+        return list(unique_sources.values())
     
     def _analyze_data_source(self, datasource: Dict) -> Optional[DataSourceInfo]:
         """Analyze a single data source"""
@@ -123,7 +260,7 @@ class DataSourceDetector:
         if not primary_connection:
             return None
         
-        connection_type = primary_connection.get('class', 'unknown')
+        connection_type = sys.intern(primary_connection.get('class', 'unknown'))
         
         # Extract connection details
         connection_details = {
@@ -148,19 +285,35 @@ class DataSourceDetector:
             embedded_file=embedded_file
         )
     
+    def _resolve_embedded_files(self, sources: List[DataSourceInfo], twbx_path: str):
+        """Point embedded_file at the matching member of the .twbx archive"""
+        
+        # One central-directory read serves every lookup
+        with zipfile.ZipFile(twbx_path, 'r') as zf:
+            for source in sources:
+                if not source.embedded_file:
+                    continue
+                info = locate_embedded(zf, source.embedded_file)
+                if info is not None:
+                    source.embedded_file = info.filename
+                else:
+                    logger.debug(f"Embedded file not found in archive: {source.embedded_file}")
+    
     def _find_primary_connection(self, connections: List[Dict]) -> Optional[Dict]:
         """Find the most specific/useful connection"""
         
-        # Priority order: specific databases > hyper > excel > federated
-        priority_order = ['snowflake', 'hyper', 'excel-direct', 'federated']
-        
-        for conn_type in priority_order:
-            for conn in connections:
-                if conn.get('class') == conn_type:
-                    return conn
-        
-        # Return first if no priority match
-        return connections[0] if connections else None
+        # Single scored pass: keep the first connection of the best rank seen.
+        # Unranked classes tie, so with no priority match the first connection wins.
+        best = None
+        best_rank = _UNRANKED + 1
+        for conn in connections:
+            rank = _CONNECTION_PRIORITY.get(conn.get('class'), _UNRANKED)
+            if rank < best_rank:
+                best, best_rank = conn, rank
+                if rank == 0:
+                    break
+        
+        return best
     
     def _identify_primary_source(self, sources: List[DataSourceInfo]) -> Optional[DataSourceInfo]:
         """Identify the primary data source"""
@@ -170,25 +323,23 @@ class DataSourceDetector:
         
         # Look for the most substantial data source
         # Priority: live connections > hyper extracts > excel files
-        
-        live_connections = [s for s in sources if s.connection_type in ['snowflake', 'postgres', 'mysql']]
-        if live_connections:
-            return live_connections[0]
-        
-        hyper_sources = [s for s in sources if s.connection_type == 'hyper']
-        if hyper_sources:
-            return hyper_sources[0]
+        # A single pass: the first live connection wins outright, the first
+        # hyper extract is remembered in case no live connection follows
+        first_hyper = None
+        for source in sources:
+            if source.connection_type in _LIVE_CONNECTION_TYPES:
+                return source
+            if first_hyper is None and source.connection_type == 'hyper':
+                first_hyper = source
         
         # Default to first source
-        return sources[0]
+        return first_hyper or sources[0]
     
-    def _map_worksheets_to_sources(self, sources: List[DataSourceInfo], worksheets: Dict):
+    def _map_worksheets_to_sources(self, primary_source: Optional[DataSourceInfo], worksheets: Dict):
         """Map worksheets to their data sources"""
         
         # For now, simple mapping - in real implementation would parse worksheet XML
         # to find actual data source references
-        primary_source = next((s for s in sources if s.is_primary), None)
-        
         if primary_source:
             primary_source.worksheets_using = list(worksheets.keys())
     
@@ -207,123 +358,31 @@ class DataSourceDetector:
     def _generate_hyper_connection(self, source: DataSourceInfo) -> str:
         """Generate code to connect to Hyper extract"""
         
-        return f'''
-# Connect to Tableau Hyper Extract
-import pandas as pd
-from tableauhyperapi import HyperProcess, Telemetry, Connection, TableName
-
-def load_data_from_hyper():
-    """Load data from Tableau Hyper extract"""
-    
-    # Path to embedded hyper file
-    hyper_file = "{source.embedded_file}"
-    
-    with HyperProcess(telemetry=Telemetry.SEND_USAGE_DATA_TO_TABLEAU) as hyper:
-        with Connection(endpoint=hyper.endpoint, database=hyper_file) as connection:
-            # Get table names
-            table_names = connection.catalog.get_table_names(schema_name="Extract")
-            
-            # Load main table (usually first one)
-            if table_names:
-                table_name = table_names[0]
-                query = f"SELECT * FROM {{table_name}}"
-                
-                # Execute query and return DataFrame
-                result = connection.execute_list_query(query)
-                columns = [col.name for col in connection.catalog.get_table_definition(table_name).columns]
-                
-                return pd.DataFrame(result, columns=columns)
-    
-    return pd.DataFrame()  # Empty fallback
-
-# Load the data
-df = load_data_from_hyper()
-'''
+        return _HYPER_CONNECTION_TEMPLATE.format_map({'embedded_file': source.embedded_file})
     
     def _generate_snowflake_connection(self, source: DataSourceInfo) -> str:
         """Generate code to connect to Snowflake"""
         
-        return f'''
-# Connect to Snowflake
-import pandas as pd
-import snowflake.connector
-from snowflake.sqlalchemy import URL
-from sqlalchemy import create_engine
-import os
-
-def load_data_from_snowflake():
-    """Load data from Snowflake"""
-    
-    # Connection parameters
-    connection_params = {{
-        'account': os.getenv('SNOWFLAKE_ACCOUNT'),
-        'user': os.getenv('SNOWFLAKE_USER'),
-        'password': os.getenv('SNOWFLAKE_PASSWORD'),
-        'warehouse': os.getenv('SNOWFLAKE_WAREHOUSE'),
-        'database': '{source.connection_details.get("database", "YOUR_DATABASE")}',
-        'schema': '{source.connection_details.get("schema", "YOUR_SCHEMA")}',
-        'role': os.getenv('SNOWFLAKE_ROLE')
-    }}
-    
-    # Create connection
-    engine = create_engine(URL(**connection_params))
-    
-    # Query data (adjust table name as needed)
-    query = """
-    SELECT * FROM YOUR_TABLE_NAME
-    LIMIT 10000
-    """
-    
-    return pd.read_sql(query, engine)
-
-# Load the data
-df = load_data_from_snowflake()
-'''
+        return _SNOWFLAKE_CONNECTION_TEMPLATE.format_map({
+            'database': source.connection_details.get('database', 'YOUR_DATABASE'),
+            'schema': source.connection_details.get('schema', 'YOUR_SCHEMA'),
+        })
     
     def _generate_excel_connection(self, source: DataSourceInfo) -> str:
         """Generate code to connect to Excel file"""
         
-        return f'''
-# Connect to Excel file
-import pandas as pd
-
-def load_data_from_excel():
-    """Load data from Excel file"""
-    
-    # Note: Excel file path from Tableau may need adjustment
-    excel_file = "{source.embedded_file or 'path/to/your/excel/file.xlsx'}"
-    
-    # Read Excel file
-    df = pd.read_excel(excel_file)
-    
-    return df
-
-# Load the data
-df = load_data_from_excel()
-'''
+        return _EXCEL_CONNECTION_TEMPLATE.format_map({
+            'excel_file': source.embedded_file or 'path/to/your/excel/file.xlsx',
+        })
     
     def _generate_generic_connection(self, source: DataSourceInfo) -> str:
         """Generate generic connection code"""
         
-        return f'''
-# Generic data connection for {source.connection_type}
-import pandas as pd
-
-def load_data():
-    """Load data from {source.caption}"""
-    
-    # TODO: Implement connection to {source.connection_type}
-    # Connection details: {source.connection_details}
-    
-    # For now, return sample data
-    return pd.DataFrame({{
-        'Sample_Field': ['A', 'B', 'C'],
-        'Sample_Value': [1, 2, 3]
-    }})
-
-# Load the data
-df = load_data()
-'''
+        return _GENERIC_CONNECTION_TEMPLATE.format_map({
+            'connection_type': source.connection_type,
+            'caption': source.caption,
+            'connection_details': source.connection_details,
+        })
     
     def create_data_source_report(self) -> str:
         """Create a comprehensive data source report"""
@@ -331,32 +390,31 @@ df = load_data()
         if not self.detected_sources:
             return "No data sources detected."
         
-        report = "# Data Source Analysis Report\n\n"
+        parts = ["# Data Source Analysis Report\n\n"]
         
         for i, source in enumerate(self.detected_sources, 1):
-            report += f"## {i}. {source.caption}\n\n"
-            report += f"- **Type**: {source.connection_type}\n"
-            report += f"- **Primary**: {'Yes' if source.is_primary else 'No'}\n"
-            report += f"- **Worksheets Using**: {len(source.worksheets_using)}\n"
+            parts.append(f"## {i}. {source.caption}\n\n")
+            parts.append(f"- **Type**: {source.connection_type}\n")
+            parts.append(f"- **Primary**: {'Yes' if source.is_primary else 'No'}\n")
+            parts.append(f"- **Worksheets Using**: {len(source.worksheets_using)}\n")
             
             if source.embedded_file:
-                report += f"- **Embedded File**: {source.embedded_file}\n"
+                parts.append(f"- **Embedded File**: {source.embedded_file}\n")
             
-            report += f"- **Connection Details**:\n"
+            parts.append(f"- **Connection Details**:\n")
             for key, value in source.connection_details.items():
                 if value:
-                    report += f"  - {key}: {value}\n"
+                    parts.append(f"  - {key}: {value}\n")
             
-            report += f"- **Worksheets**: {', '.join(source.worksheets_using[:5])}\n"
+            parts.append(f"- **Worksheets**: {', '.join(source.worksheets_using[:5])}\n")
             if len(source.worksheets_using) > 5:
-                report += f"  ... and {len(source.worksheets_using) - 5} more\n"
+                parts.append(f"  ... and {len(source.worksheets_using) - 5} more\n")
             
-            report += "\n"
+            parts.append("\n")
         
-        return report
+        return ''.join(parts)
     
     def get_recommended_connection(self) -> Optional[DataSourceInfo]:
         """Get the recommended data source for replication"""
         
-        primary = next((s for s in self.detected_sources if s.is_primary), None)
-        return primary or (self.detected_sources[0] if self.detected_sources else None)
\ No newline at end of file
+        return self._primary or (self.detected_sources[0] if self.detected_sources else None)
\ No newline at end of file
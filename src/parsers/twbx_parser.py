@@ -1,19 +1,77 @@
 """
 TWBX Parser - Extracts Tableau workbook components with focus on calculations
 """
+import re
+import sys
 import zipfile
-import xml.etree.ElementTree as ET
 import json
 import pandas as pd
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import IO, Dict, Iterator, List, Any, Optional, Tuple, Union
 from dataclasses import dataclass, asdict
 import logging
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+try:
+    from lxml import etree as ET  # C tree building and traversal, same API as ElementTree
+    _HAS_LXML = True
+except ImportError:
+    import xml.etree.ElementTree as ET
+    _HAS_LXML = False
 
 logger = logging.getLogger(__name__)
 
+# Workbooks are user uploads: never let lxml expand entities or touch the network,
+# and keep libxml2's default size and depth limits (no huge_tree).
+# Whitespace-only text between elements is dropped so every later walk has fewer nodes.
+# The stdlib parser doesn't fetch external entities and takes no such options.
+_ITERPARSE_OPTIONS = {
+    'resolve_entities': False,
+    'no_network': True,
+    'remove_blank_text': True,
+} if _HAS_LXML else {}
 
-@dataclass
+# Element tags the extractors start from, bucketed while the XML is parsed
+_INDEXED_TAGS = ('source', 'datasource', 'worksheet', 'dashboard', 'parameter')
+# Field reference in a formula, e.g. [Sales]
+_FIELD_REF_RE = re.compile(r'\[([^\]]+)\]')
+# Opening of a level-of-detail expression, e.g. "{FIXED [Region] : ...}"
+_LOD_RE = re.compile(r'\{\s*(FIXED|INCLUDE|EXCLUDE)\b', re.IGNORECASE)
+# Elements whose name attribute refers to a field
+_NAMED_REFERENCE_TAGS = frozenset({'column', 'field'})
+# Below this many worksheets, worker start-up costs more than the parallel scan saves
+_PARALLEL_WORKSHEET_MIN = 32
+# lxml serializes an element's tail text too, which would not re-parse as a document
+_TOSTRING_OPTIONS = {'with_tail': False} if _HAS_LXML else {}
+# Pseudo-datasource holding parameter columns; parameters come from _extract_parameters
+_PARAMETERS_DATASOURCE = 'Parameters'
+
+# Workbook root attributes copied into the metadata, with their defaults
+_METADATA_DEFAULTS = {'version': 'unknown', 'xmlns:user': ''}
+_METADATA_KEYS = frozenset(_METADATA_DEFAULTS)
+# Namespaced attribute name as the parsers report it, e.g. "{http://...}user"
+_NS_ATTR_RE = re.compile(r'\{([^}]*)\}(.+)')
+
+# A .twbx on disk, or an already open binary file object holding one
+TwbxSource = Union[str, Path, IO[bytes]]
+
+
+def locate_embedded(zf: zipfile.ZipFile, name: str) -> Optional[zipfile.ZipInfo]:
+    """Find an archive member by exact path or, failing that, by file name"""
+    # NameToInfo is the dict ZipFile fills while reading the central directory
+    info = zf.NameToInfo.get(name)
+    if info is not None:
+        return info
+    
+    # Connections often record the author's local path; fall back to the base name
+    base_name = name.replace('\\', '/').rsplit('/', 1)[-1]
+    return next((info for member, info in zf.NameToInfo.items()
+                 if member == base_name or member.endswith('/' + base_name)), None)
+
+
+@dataclass(slots=True, frozen=True)
 class TableauCalculation:
     """Represents a Tableau calculated field"""
     name: str
@@ -21,16 +79,12 @@ class TableauCalculation:
     calculation_type: str  # dimension, measure, etc.
     data_type: str  # string, integer, real, etc.
     aggregation: Optional[str] = None
-    dependencies: List[str] = None
+    dependencies: Tuple[str, ...] = ()
     is_lod: bool = False
     lod_type: Optional[str] = None  # FIXED, INCLUDE, EXCLUDE
-    
-    def __post_init__(self):
-        if self.dependencies is None:
-            self.dependencies = []
 
 
-@dataclass
+@dataclass(slots=True)
 class TableauWorksheet:
     """Represents a Tableau worksheet"""
     name: str
@@ -41,7 +95,7 @@ class TableauWorksheet:
     filters: List[Dict[str, Any]]
     
     
-@dataclass
+@dataclass(slots=True)
 class TableauDashboard:
     """Represents a Tableau dashboard"""
     name: str
@@ -65,28 +119,30 @@ class WorkbookStructure:
 class TWBXParser:
     """Parser for Tableau .twbx files with focus on calculation extraction"""
     
-    def __init__(self):
+    def __init__(self, max_workers: int = 0):
         self.namespaces = {
             'user': 'http://www.tableausoftware.com/xml/user'
         }
+        # Worker processes for scanning large workbooks' worksheets; 0 scans in-process.
+        # Off by default: the parser runs inside the Streamlit server, which shouldn't fork per upload.
+        self.max_workers = max_workers
         
-    def parse(self, twbx_path: str) -> WorkbookStructure:
+    def parse(self, twbx_path: TwbxSource) -> WorkbookStructure:
         """Parse a .twbx file and extract all components"""
         logger.info(f"Parsing TWBX file: {twbx_path}")
         
-        # Extract XML from TWBX
-        xml_content = self._extract_twb_xml(twbx_path)
+        # Parse the .twb straight from the archive; the parser decodes it
+        # incrementally instead of holding both the raw bytes and a str copy
+        with self._open_twb_stream(twbx_path) as twb_stream:
+            root, index = self._parse_and_index(twb_stream)
         
-        # Parse XML
-        root = ET.fromstring(xml_content)
-        
-        # Extract components
-        metadata = self._extract_metadata(root)
-        datasources = self._extract_datasources(root)
-        calculations = self._extract_all_calculations(root)
-        worksheets = self._extract_worksheets(root, calculations)
-        dashboards = self._extract_dashboards(root)
-        parameters = self._extract_parameters(root)
+        # Extract components; each starts from the index instead of walking the whole tree
+        metadata = self._extract_metadata(root, index)
+        datasources = self._extract_datasources(root, index)
+        calculations = self._extract_all_calculations(root, index)
+        worksheets = self._extract_worksheets(root, calculations, index)
+        dashboards = self._extract_dashboards(root, index)
+        parameters = self._extract_parameters(root, index)
         
         return WorkbookStructure(
             metadata=metadata,
@@ -97,44 +153,93 @@ class TWBXParser:
             parameters=parameters
         )
     
-    def _extract_twb_xml(self, twbx_path: str) -> str:
+    def _extract_twb_xml(self, twbx_path: TwbxSource) -> str:
         """Extract the .twb XML content from .twbx file"""
+        with self._open_twb_stream(twbx_path) as twb_stream:
+            return twb_stream.read().decode('utf-8')
+    
+    def _parse_and_index(self, twb_stream: IO[bytes]) -> Tuple[ET.Element, Dict[str, List[ET.Element]]]:
+        """Parse the workbook XML, collecting the extractors' start elements in the same sweep"""
+        index = {tag: [] for tag in _INDEXED_TAGS}
+        events = ET.iterparse(twb_stream, events=('start',), **_ITERPARSE_OPTIONS)
+        
+        # The first event is the root itself; like findall('.//tag') it is never indexed
+        _, root = next(events)
+        for _, elem in events:
+            bucket = index.get(elem.tag)
+            if bucket is not None:
+                bucket.append(elem)
+        
+        return root, index
+    
+    def _descendants(self, root: ET.Element, tag: str,
+                     index: Optional[Dict[str, List[ET.Element]]] = None) -> List[ET.Element]:
+        """All `tag` elements below root, taken from the parse-time index when available"""
+        if index is not None:
+            return index[tag]
+        return root.findall(f'.//{tag}')
+    
+    def find_embedded(self, twbx_path: TwbxSource, name: str) -> Optional[zipfile.ZipInfo]:
+        """Locate an embedded file (e.g. a .hyper extract) inside a .twbx"""
+        with zipfile.ZipFile(twbx_path, 'r') as zf:
+            return locate_embedded(zf, name)
+    
+    @contextmanager
+    def _open_twb_stream(self, twbx_path: TwbxSource) -> Iterator[IO[bytes]]:
+        """Open the .twb inside a .twbx (path or file object) as a binary stream"""
         with zipfile.ZipFile(twbx_path, 'r') as zf:
             # Find the .twb file
-            twb_files = [f for f in zf.namelist() if f.endswith('.twb')]
-            if not twb_files:
+            twb_name = next((f for f in zf.namelist() if f.endswith('.twb')), None)
+            if twb_name is None:
                 raise ValueError("No .twb file found in .twbx archive")
             
-            # Read the XML content
-            return zf.read(twb_files[0]).decode('utf-8')
+            with zf.open(twb_name, 'r') as twb_stream:
+                yield twb_stream
     
-    def _extract_metadata(self, root: ET.Element) -> Dict[str, Any]:
+    def _extract_metadata(self, root: ET.Element,
+                          index: Optional[Dict[str, List[ET.Element]]] = None) -> Dict[str, Any]:
         """Extract workbook metadata"""
-        metadata = {
-            'version': root.get('version', 'unknown'),
-            'xmlns:user': root.get('xmlns:user', ''),
-        }
+        metadata = dict(_METADATA_DEFAULTS)
+        prefixes = {uri: prefix for prefix, uri in self.namespaces.items()}
+        for key, value in root.attrib.items():
+            # Report namespaced attributes under their usual prefix, e.g. user:foo
+            match = _NS_ATTR_RE.match(key)
+            if match is not None and match.group(1) in prefixes:
+                key = f"{prefixes[match.group(1)]}:{match.group(2)}"
+            if key in _METADATA_KEYS:
+                metadata[key] = value
+        
+        # Namespace declarations aren't attributes; lxml exposes them as nsmap
+        for prefix, uri in (getattr(root, 'nsmap', None) or {}).items():
+            key = f"xmlns:{prefix}"
+            if key in _METADATA_KEYS:
+                metadata[key] = uri
         
         # Get workbook source information
-        source = root.find('.//source')
-        if source is not None:
+        sources = self._descendants(root, 'source', index)
+        if sources:
+            source = sources[0]
             metadata['source_platform'] = source.get('platform', '')
             metadata['source_version'] = source.get('version', '')
         
         return metadata
     
-    def _extract_datasources(self, root: ET.Element) -> List[Dict[str, Any]]:
+    def _extract_datasources(self, root: ET.Element,
+                             index: Optional[Dict[str, List[ET.Element]]] = None) -> List[Dict[str, Any]]:
         """Extract datasource information with basic deduplication"""
         datasources = []
         seen_datasources = set()
         
-        for ds in root.findall('.//datasource'):
+        for ds in self._descendants(root, 'datasource', index):
             name = ds.get('name', '')
+            if name == _PARAMETERS_DATASOURCE:
+                continue
             caption = ds.get('caption', '')
             inline = ds.get('inline', 'false') == 'true'
             
-            # Create unique key for this datasource
-            datasource_key = f"{name}_{caption}_{inline}"
+            # Create unique key for this datasource (a tuple: no string building, no
+            # ambiguity when names themselves contain underscores)
+            datasource_key = (name, caption, inline)
             
             # Skip if we've already seen this exact datasource
             if datasource_key in seen_datasources:
@@ -149,7 +254,7 @@ class TWBXParser:
             }
             
             # Extract connection information
-            for conn in ds.findall('.//connection'):
+            for conn in ds.iter('connection'):
                 connection = {
                     'class': conn.get('class', ''),
                     'dbname': conn.get('dbname', ''),
@@ -160,11 +265,12 @@ class TWBXParser:
                 datasource['connections'].append(connection)
             
             # Extract column metadata
-            for col in ds.findall('.//column'):
+            for col in ds.iter('column'):
                 column = {
                     'name': col.get('name', ''),
-                    'datatype': col.get('datatype', ''),
-                    'role': col.get('role', ''),
+                    # Small, heavily repeated vocabularies; share one str object per value
+                    'datatype': sys.intern(col.get('datatype', '')),
+                    'role': sys.intern(col.get('role', '')),
                     'type': col.get('type', ''),
                     'caption': col.get('caption', col.get('name', '')),
                 }
@@ -177,100 +283,113 @@ class TWBXParser:
         
         return datasources
     
-    def _extract_all_calculations(self, root: ET.Element) -> Dict[str, TableauCalculation]:
+    def _extract_all_calculations(self, root: ET.Element,
+                                  index: Optional[Dict[str, List[ET.Element]]] = None) -> Dict[str, TableauCalculation]:
         """Extract ALL calculated fields from the workbook"""
         calculations = {}
         
         # Find calculations in datasources
-        for datasource in root.findall('.//datasource'):
-            for calc in datasource.findall('.//column[@caption]'):
-                if calc.find('calculation') is not None:
-                    calc_elem = calc.find('calculation')
-                    name = calc.get('name', '')
-                    
-                    calculation = TableauCalculation(
-                        name=name,
-                        formula=calc_elem.get('formula', ''),
-                        calculation_type=calc.get('role', 'dimension'),
-                        data_type=calc.get('datatype', 'string'),
-                        aggregation=calc.get('aggregation', None)
-                    )
-                    
-                    # Check if it's an LOD expression
-                    formula = calculation.formula
-                    if '{FIXED' in formula or '{INCLUDE' in formula or '{EXCLUDE' in formula:
-                        calculation.is_lod = True
-                        if '{FIXED' in formula:
-                            calculation.lod_type = 'FIXED'
-                        elif '{INCLUDE' in formula:
-                            calculation.lod_type = 'INCLUDE'
-                        else:
-                            calculation.lod_type = 'EXCLUDE'
-                    
-                    # Extract dependencies (fields referenced in formula)
-                    calculation.dependencies = self._extract_formula_dependencies(formula)
-                    
-                    calculations[name] = calculation
-                    logger.info(f"Extracted calculation: {name} = {formula}")
+        for datasource in self._descendants(root, 'datasource', index):
+            if datasource.get('name') == _PARAMETERS_DATASOURCE:
+                continue
+            for calc in datasource.iter('column'):
+                if calc.get('caption') is None:
+                    continue
+                calc_elem = calc.find('calculation')
+                if calc_elem is None:
+                    continue
+                
+                calculation = self._build_calculation(calc, calc_elem)
+                calculations[calculation.name] = calculation
         
         return calculations
     
-    def _extract_formula_dependencies(self, formula: str) -> List[str]:
-        """Extract field dependencies from a Tableau formula"""
-        import re
+    def extract_calculations(self, twbx_path: TwbxSource) -> Dict[str, TableauCalculation]:
+        """Extract only the calculated fields, streaming the .twb instead of building its tree
+        
+        Same result as parse(twbx_path).calculations, but each <column> is
+        discarded once read, so memory stays flat however large the workbook.
+        """
+        calculations = {}
+        with self._open_twb_stream(twbx_path) as twb_stream:
+            for calc, calc_elem in self._iter_calculation_columns(twb_stream):
+                calculation = self._build_calculation(calc, calc_elem)
+                calculations[calculation.name] = calculation
+        return calculations
+    
+    def _iter_calculation_columns(self, twb_stream: IO[bytes]) -> Iterator[Tuple[ET.Element, ET.Element]]:
+        """(column, calculation) pairs of the captioned calculated columns under datasources"""
+        events = ET.iterparse(twb_stream, events=('start', 'end'), **_ITERPARSE_OPTIONS)
+        datasources = []  # Names of the open <datasource> elements
+        for event, elem in events:
+            tag = elem.tag
+            if tag == 'datasource':
+                if event == 'start':
+                    datasources.append(elem.get('name'))
+                else:
+                    datasources.pop()
+                    elem.clear()
+                continue
+            if tag != 'column' or event != 'end':
+                continue
+            
+            if datasources and _PARAMETERS_DATASOURCE not in datasources and elem.get('caption') is not None:
+                calc_elem = elem.find('calculation')
+                if calc_elem is not None:
+                    yield elem, calc_elem
+            
+            # The column is fully read; drop it and any siblings already handled
+            elem.clear()
+            if _HAS_LXML:
+                while elem.getprevious() is not None:
+                    del elem.getparent()[0]
+    
+    def _build_calculation(self, calc: ET.Element, calc_elem: ET.Element) -> TableauCalculation:
+        """TableauCalculation for a <column> and its <calculation> child"""
+        name = calc.get('name', '')
+        formula = calc_elem.get('formula', '')
         
-        # Pattern to match field references [FieldName]
-        pattern = r'\[([^\]]+)\]'
-        matches = re.findall(pattern, formula)
+        # Check if it's an LOD expression
+        lod_match = _LOD_RE.search(formula)
         
-        # Remove duplicates and return
-        return list(set(matches))
+        calculation = TableauCalculation(
+            name=name,
+            formula=formula,
+            calculation_type=sys.intern(calc.get('role', 'dimension')),
+            data_type=sys.intern(calc.get('datatype', 'string')),
+            aggregation=calc.get('aggregation', None),
+            # Extract dependencies (fields referenced in formula)
+            dependencies=self._extract_formula_dependencies(formula),
+            is_lod=lod_match is not None,
+            lod_type=sys.intern(lod_match.group(1).upper()) if lod_match else None
+        )
+        
+        logger.info(f"Extracted calculation: {name} = {formula}")
+        return calculation
+    
+    def _extract_formula_dependencies(self, formula: str) -> Tuple[str, ...]:
+        """Extract field dependencies from a Tableau formula"""
+        # Remove duplicates, keeping the order fields appear in the formula
+        return tuple(dict.fromkeys(_FIELD_REF_RE.findall(formula)))
     
-    def _extract_worksheets(self, root: ET.Element, calculations: Dict[str, TableauCalculation]) -> Dict[str, TableauWorksheet]:
+    def _extract_worksheets(self, root: ET.Element, calculations: Dict[str, TableauCalculation],
+                            index: Optional[Dict[str, List[ET.Element]]] = None) -> Dict[str, TableauWorksheet]:
         """Extract worksheet information with calculations"""
         worksheets = {}
         
-        for ws in root.findall('.//worksheet'):
-            name = ws.get('name', '')
-            
+        scans = self._scan_worksheets(self._descendants(root, 'worksheet', index))
+        for name, title, referenced_fields, marks, filters, datasources in scans:
             # Find calculations used in this worksheet
-            ws_calculations = []
-            for calc_name in calculations:
-                # Check if calculation is referenced in worksheet
-                if self._is_field_used_in_worksheet(ws, calc_name):
-                    ws_calculations.append(calculations[calc_name])
-            
-            # Extract marks (visualizations)
-            marks = []
-            for pane in ws.findall('.//pane'):
-                for mark in pane.findall('.//mark'):
-                    mark_info = {
-                        'class': mark.get('class', ''),
-                        'encodings': {}
-                    }
-                    
-                    # Extract encodings (columns, rows, color, size, etc.)
-                    for encoding in mark.findall('.//encoding'):
-                        attr = encoding.get('attr', '')
-                        field = encoding.get('field', '')
-                        mark_info['encodings'][attr] = field
-                    
-                    marks.append(mark_info)
-            
-            # Extract filters
-            filters = []
-            for filter_elem in ws.findall('.//filter'):
-                filter_info = {
-                    'class': filter_elem.get('class', ''),
-                    'column': filter_elem.get('column', ''),
-                }
-                filters.append(filter_info)
+            ws_calculations = [
+                calc for calc_name, calc in calculations.items()
+                if calc_name in referenced_fields
+            ]
             
             worksheet = TableauWorksheet(
                 name=name,
-                title=ws.get('formatted-name', name),
+                title=title,
                 calculations=ws_calculations,
-                datasource_dependencies=self._get_worksheet_datasources(ws),
+                datasource_dependencies=datasources,
                 marks=marks,
                 filters=filters
             )
@@ -280,39 +399,74 @@ class TWBXParser:
         
         return worksheets
     
-    def _is_field_used_in_worksheet(self, worksheet: ET.Element, field_name: str) -> bool:
-        """Check if a field is used in a worksheet"""
-        # Search in multiple places where fields can be referenced
-        search_locations = [
-            './/column[@name="{}"]',
-            './/field[@name="{}"]',
-            './/*[@field="{}"]',
-            './/*[@column="{}"]'
-        ]
-        
-        for location_pattern in search_locations:
-            if worksheet.find(location_pattern.format(field_name)) is not None:
-                return True
+    def _scan_worksheets(self, worksheet_elems: List[ET.Element]) -> List[Tuple]:
+        """Scan every worksheet, fanning out to worker processes for large workbooks if enabled"""
+        if self.max_workers < 2 or len(worksheet_elems) < _PARALLEL_WORKSHEET_MIN:
+            return [self._scan_worksheet(ws) for ws in worksheet_elems]
         
-        return False
+        # Subtrees cross the process boundary as bytes and are re-parsed by the workers
+        blobs = [ET.tostring(ws, **_TOSTRING_OPTIONS) for ws in worksheet_elems]
+        try:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+                return list(pool.map(_scan_worksheet_xml, blobs, chunksize=8))
+        except (OSError, BrokenProcessPool) as e:
+            logger.warning(f"Parallel worksheet scan unavailable, scanning serially: {e}")
+            return [self._scan_worksheet(ws) for ws in worksheet_elems]
     
-    def _get_worksheet_datasources(self, worksheet: ET.Element) -> List[str]:
-        """Get datasources used by a worksheet"""
+    def _scan_worksheet(self, ws: ET.Element) -> Tuple:
+        """Everything extracted from one worksheet that doesn't need the rest of the workbook"""
+        name = ws.get('name', '')
+        referenced_fields = set()
+        marks = []  # Chart configurations
+        filters = []
         datasources = set()
         
-        # Find all datasource dependencies
-        for dep in worksheet.findall('.//datasource-dependencies'):
-            ds_name = dep.get('datasource', '')
-            if ds_name:
-                datasources.add(ds_name)
+        # A single walk of the subtree; encodings attach to the most recent mark in the same pane
+        current_mark = None
+        elements = ws.iter()
+        next(elements)  # Skip the worksheet element itself
+        for elem in elements:
+            tag = elem.tag
+            if tag == 'pane':
+                current_mark = None
+            elif tag == 'mark':
+                current_mark = {'class': elem.get('class', ''), 'encodings': {}}
+                marks.append(current_mark)
+            elif tag == 'encoding':
+                if current_mark is not None:
+                    current_mark['encodings'][elem.get('attr', '')] = elem.get('field', '')
+            elif tag == 'filter':
+                filters.append({
+                    'class': elem.get('class', ''),
+                    'column': elem.get('column', ''),
+                })
+            elif tag == 'datasource-dependencies':
+                ds_name = elem.get('datasource', '')
+                if ds_name:
+                    datasources.add(ds_name)
+            
+            # Fields can be referenced as <column name=...>, <field name=...>,
+            # or through a field=/column= attribute on any element
+            if tag in _NAMED_REFERENCE_TAGS:
+                ref = elem.get('name')
+                if ref is not None:
+                    referenced_fields.add(ref)
+            field = elem.get('field')
+            if field is not None:
+                referenced_fields.add(field)
+            column = elem.get('column')
+            if column is not None:
+                referenced_fields.add(column)
         
-        return list(datasources)
+        return (name, ws.get('formatted-name', name), referenced_fields,
+                marks, filters, list(datasources))
     
-    def _extract_dashboards(self, root: ET.Element) -> Dict[str, TableauDashboard]:
+    def _extract_dashboards(self, root: ET.Element,
+                            index: Optional[Dict[str, List[ET.Element]]] = None) -> Dict[str, TableauDashboard]:
         """Extract dashboard information"""
         dashboards = {}
         
-        for dash in root.findall('.//dashboard'):
+        for dash in self._descendants(root, 'dashboard', index):
             name = dash.get('name', '')
             
             # Extract worksheet references
@@ -354,11 +508,12 @@ class TWBXParser:
         
         return dashboards
     
-    def _extract_parameters(self, root: ET.Element) -> List[Dict[str, Any]]:
+    def _extract_parameters(self, root: ET.Element,
+                            index: Optional[Dict[str, List[ET.Element]]] = None) -> List[Dict[str, Any]]:
         """Extract parameter definitions"""
         parameters = []
         
-        for param in root.findall('.//parameter'):
+        for param in self._descendants(root, 'parameter', index):
             param_info = {
                 'name': param.get('name', ''),
                 'caption': param.get('caption', ''),
@@ -368,4 +523,9 @@ class TWBXParser:
             }
             parameters.append(param_info)
         
-        return parameters
\ No newline at end of file
+        return parameters
+
+
+def _scan_worksheet_xml(blob: bytes) -> Tuple:
+    """Process-pool worker: scan one serialized <worksheet> subtree"""
+    return TWBXParser()._scan_worksheet(ET.fromstring(blob))
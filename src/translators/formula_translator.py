@@ -2,21 +2,322 @@
 Tableau Formula Translator - Converts Tableau calculations to Python/Pandas expressions
 """
 import re
+import sys
+import functools
 import logging
+import numpy as np
 import pandas as pd
-from typing import Dict, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, List, Optional, Set, Tuple, Union
 from dataclasses import dataclass
 
 logger = logging.getLogger(__name__)
 
+# Distinct cleaned formulas remembered per translator
+_TRANSLATION_CACHE_SIZE = 4096
+# Below this many distinct formulas, worker start-up costs more than it saves
+_PARALLEL_TRANSLATE_MIN = 32
+# Field reference in a formula, e.g. [Sales]
+_FIELD_REF_RE = re.compile(r'\[([^\]]+)\]')
+# Functions that make a formula an aggregate / a table calculation
+_AGGREGATE_FUNCTIONS = frozenset({'SUM', 'AVG', 'COUNT', 'COUNTD', 'MIN', 'MAX', 'MEDIAN', 'STDEV', 'VAR'})
+_WINDOW_FUNCTIONS = frozenset({'RANK', 'INDEX', 'FIRST', 'LAST'})
+_WINDOW_PREFIXES = ('RUNNING_', 'WINDOW_')
+# ...and the same check for formulas that don't tokenize
+_AGGREGATE_CALL_RE = re.compile(r'\b(?:SUM|AVG|COUNTD?|MIN|MAX|MEDIAN|STDEV|VAR)\s*\(', re.IGNORECASE)
+_WINDOW_CALL_RE = re.compile(r'\b(?:RUNNING_\w+|WINDOW_\w+|RANK|INDEX|FIRST|LAST)\s*\(', re.IGNORECASE)
+# One formula token; whitespace between tokens is skipped
+_TOKEN_RE = re.compile(r'''\s*(?:
+      (?P<field>\[[^\]]+\](?:\.\[[^\]]+\])*)
+    | (?P<string>"(?:[^"]|"")*"|'(?:[^']|'')*')
+    | (?P<date>\#[^#]*\#)
+    | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)
+    | (?P<name>[A-Za-z_]\w*)
+    | (?P<op><>|!=|<=|>=|==|[-+*/%^=<>(),{}:])
+)''', re.VERBOSE)
+# Binary operator binding strength, loosest first; == and != are read as = and <>
+_PRECEDENCE = {
+    'OR': 1, 'AND': 2,
+    '=': 3, '<>': 3, '<': 3, '<=': 3, '>': 3, '>=': 3,
+    '+': 4, '-': 4, '*': 5, '/': 5, '%': 5, '^': 6,
+}
+_OPERATOR_ALIASES = {'==': '=', '!=': '<>'}
+_LOD_KEYWORDS = frozenset({'FIXED', 'INCLUDE', 'EXCLUDE'})
+_KEYWORD_LITERALS = {'TRUE': 'boolean', 'FALSE': 'boolean', 'NULL': 'null'}
 
-@dataclass
+# Operator spelling per target, where it differs from Tableau's
+_PYTHON_OPERATORS = {'=': '==', '<>': '!=', 'AND': 'and', 'OR': 'or', '^': '**'}
+_PANDAS_OPERATORS = {'=': '==', '<>': '!=', 'AND': '&', 'OR': '|', '^': '**'}
+
+# Python-target function_map entries that are str/datetime methods or attributes
+_PYTHON_METHODS = frozenset({'lower', 'upper', 'strip', 'lstrip', 'rstrip',
+                             'startswith', 'endswith', 'replace', 'split'})
+_PYTHON_ATTRIBUTES = frozenset({'year', 'month', 'day', 'quarter', 'week'})
+# ...and the ones that are not builtins
+_PYTHON_FUNCTIONS = {
+    'mean': 'statistics.mean', 'median': 'statistics.median',
+    'std': 'statistics.stdev', 'var': 'statistics.variance', 'count': 'len',
+    'ceil': 'math.ceil', 'floor': 'math.floor', 'sqrt': 'math.sqrt',
+    'exp': 'math.exp', 'log': 'math.log', 'log10': 'math.log10',
+}
+# Pandas-target function_map entries that are NumPy ufuncs
+_NUMPY_FUNCTIONS = frozenset({'abs', 'round', 'ceil', 'floor', 'sqrt', 'exp', 'log', 'log10', 'power'})
+
+# Date part names accepted by DATEPART/DATETRUNC/DATEADD/DATEDIFF, and their pandas spellings
+_DATE_PART_ATTRIBUTES = {
+    'year': 'year', 'quarter': 'quarter', 'month': 'month', 'week': 'isocalendar().week',
+    'day': 'day', 'dayofyear': 'dayofyear', 'hour': 'hour', 'minute': 'minute', 'second': 'second',
+}
+_PERIOD_ALIASES = {'year': 'Y', 'quarter': 'Q', 'month': 'M', 'week': 'W', 'day': 'D'}
+_FLOOR_ALIASES = {'hour': 'h', 'minute': 'min', 'second': 's'}
+_DATE_OFFSET_UNITS = {
+    'year': 'years', 'month': 'months', 'week': 'weeks', 'day': 'days',
+    'hour': 'hours', 'minute': 'minutes', 'second': 'seconds',
+}
+
+
+class FormulaParseError(ValueError):
+    """Raised when a formula uses syntax the translator doesn't understand"""
+
+
+class Node:
+    """Base class of the parsed formula tree"""
+    __slots__ = ()
+
+
+@dataclass(slots=True)
+class Field(Node):
+    """Field reference; for [Source].[Field] only the field name is kept"""
+    name: str
+
+
+@dataclass(slots=True)
+class Literal(Node):
+    """Constant: kind is number, string, date, boolean or null"""
+    value: str
+    kind: str
+
+
+@dataclass(slots=True)
+class FuncCall(Node):
+    """Function call, name in upper case"""
+    name: str
+    args: List[Node]
+
+
+@dataclass(slots=True)
+class BinOp(Node):
+    """Binary operator, using Tableau's spelling (=, <>, AND, ...)"""
+    op: str
+    left: Node
+    right: Node
+
+
+@dataclass(slots=True)
+class UnaryOp(Node):
+    """Unary minus or NOT"""
+    op: str
+    operand: Node
+
+
+@dataclass(slots=True)
+class IfExpr(Node):
+    """IF/ELSEIF chain as (condition, value) branches"""
+    branches: List[Tuple[Node, Node]]
+    else_: Optional[Node]
+
+
+@dataclass(slots=True)
+class CaseExpr(Node):
+    """CASE subject WHEN ... THEN ... END"""
+    subject: Node
+    whens: List[Tuple[Node, Node]]
+    else_: Optional[Node]
+
+
+@dataclass(slots=True)
+class LODExpr(Node):
+    """Level of detail expression; a bare {...} is read as FIXED with no dimensions"""
+    kind: str
+    dimensions: List[Node]
+    expr: Node
+
+
+def _tokenize(formula: str) -> List[Tuple[str, str]]:
+    """Split a formula into (kind, text) tokens; names upper-cased, operator aliases resolved"""
+    tokens = []
+    pos = 0
+    while pos < len(formula):
+        match = _TOKEN_RE.match(formula, pos)
+        if match is None:
+            if formula[pos:].isspace():
+                break
+            raise FormulaParseError(f"Unexpected input at {pos}: {formula[pos:pos + 20]!r}")
+        kind, text = match.lastgroup, match.group(match.lastgroup)
+        if kind == 'name' and not text.isupper():
+            # Function names and keywords are case-insensitive; canonicalize them here,
+            # on name tokens only, so literals and field names keep their case
+            text = text.upper()
+        elif kind == 'op':
+            text = _OPERATOR_ALIASES.get(text, text)
+        tokens.append((kind, text))
+        pos = match.end()
+    return tokens
+
+
+def _dependency_tuple(names: Set[str]) -> Tuple[str, ...]:
+    """Sorted, interned field names, shared between formulas with the same set"""
+    return _shared_dependencies(tuple(sorted(map(sys.intern, names))))
+
+
+@functools.lru_cache(maxsize=1024)
+def _shared_dependencies(names: Tuple[str, ...]) -> Tuple[str, ...]:
+    # The cache hands back the first equal tuple it saw
+    return names
+
+
+class _FormulaParser:
+    """Recursive-descent parser from formula tokens to a Node tree"""
+    
+    def __init__(self, tokens: List[Tuple[str, str]]):
+        self.tokens = tokens
+        self.pos = 0
+    
+    def parse(self) -> Node:
+        node = self._expression()
+        if self.pos != len(self.tokens):
+            raise FormulaParseError(f"Unexpected {self.tokens[self.pos][1]!r}")
+        return node
+    
+    def _peek(self) -> Tuple[str, str]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else ('end', '')
+    
+    def _accept(self, text: str) -> bool:
+        kind, value = self._peek()
+        if kind in ('op', 'name') and value == text:
+            self.pos += 1
+            return True
+        return False
+    
+    def _expect(self, text: str):
+        if not self._accept(text):
+            raise FormulaParseError(f"Expected {text!r}, found {self._peek()[1]!r}")
+    
+    def _expression(self, min_precedence: int = 1) -> Node:
+        # Precedence climbing; every binary operator is left-associative
+        left = self._unary()
+        while True:
+            kind, op = self._peek()
+            precedence = _PRECEDENCE.get(op) if kind in ('op', 'name') else None
+            if precedence is None or precedence < min_precedence:
+                return left
+            self.pos += 1
+            left = BinOp(op, left, self._expression(precedence + 1))
+    
+    def _unary(self) -> Node:
+        if self._accept('-'):
+            return UnaryOp('-', self._unary())
+        if self._accept('+'):
+            return self._unary()
+        if self._accept('NOT'):
+            # NOT binds looser than comparisons: NOT [a] = 1 is NOT ([a] = 1)
+            return UnaryOp('NOT', self._expression(_PRECEDENCE['=']))
+        return self._primary()
+    
+    def _primary(self) -> Node:
+        kind, text = self._peek()
+        self.pos += 1
+        
+        if kind == 'field':
+            return Field(_FIELD_REF_RE.findall(text)[-1])
+        if kind == 'number':
+            return Literal(text, 'number')
+        if kind == 'string':
+            quote = text[0]
+            return Literal(text[1:-1].replace(quote * 2, quote), 'string')
+        if kind == 'date':
+            return Literal(text[1:-1].strip(), 'date')
+        if kind == 'op' and text == '(':
+            node = self._expression()
+            self._expect(')')
+            return node
+        if kind == 'op' and text == '{':
+            return self._lod()
+        if kind == 'name':
+            literal_kind = _KEYWORD_LITERALS.get(text)
+            if literal_kind is not None:
+                return Literal(text, literal_kind)
+            if text == 'IF':
+                return self._if()
+            if text == 'CASE':
+                return self._case()
+            if self._accept('('):
+                return FuncCall(text, self._arguments())
+        
+        raise FormulaParseError(f"Unexpected {text or 'end of formula'!r}")
+    
+    def _arguments(self) -> List[Node]:
+        args = []
+        if self._accept(')'):
+            return args
+        args.append(self._expression())
+        while self._accept(','):
+            args.append(self._expression())
+        self._expect(')')
+        return args
+    
+    def _if(self) -> IfExpr:
+        branches = []
+        condition = self._expression()
+        self._expect('THEN')
+        branches.append((condition, self._expression()))
+        while self._accept('ELSEIF'):
+            condition = self._expression()
+            self._expect('THEN')
+            branches.append((condition, self._expression()))
+        else_ = self._expression() if self._accept('ELSE') else None
+        self._expect('END')
+        return IfExpr(branches, else_)
+    
+    def _case(self) -> CaseExpr:
+        subject = self._expression()
+        whens = []
+        while self._accept('WHEN'):
+            value = self._expression()
+            self._expect('THEN')
+            whens.append((value, self._expression()))
+        if not whens:
+            raise FormulaParseError("CASE without WHEN")
+        else_ = self._expression() if self._accept('ELSE') else None
+        self._expect('END')
+        return CaseExpr(subject, whens, else_)
+    
+    def _lod(self) -> LODExpr:
+        kind, text = self._peek()
+        dimensions = []
+        if kind == 'name' and text in _LOD_KEYWORDS:
+            self.pos += 1
+            lod_type = text
+            if not self._accept(':'):
+                dimensions.append(self._expression())
+                while self._accept(','):
+                    dimensions.append(self._expression())
+                self._expect(':')
+        else:
+            lod_type = 'FIXED'
+        expr = self._expression()
+        self._expect('}')
+        return LODExpr(lod_type, dimensions, expr)
+
+
+@dataclass(frozen=True, slots=True)
 class TranslatedFormula:
-    """Result of formula translation"""
+    """Result of formula translation; frozen because cached results are shared"""
     python_expression: str
     pandas_expression: str
     sql_expression: Optional[str]
-    dependencies: List[str]
+    dependencies: Tuple[str, ...]
     requires_aggregation: bool
     is_window_function: bool
     
@@ -44,9 +345,9 @@ class TableauFormulaTranslator:
             'CEILING': ('ceil', 'ceil', 'CEIL'),
             'FLOOR': ('floor', 'floor', 'FLOOR'),
             'SQRT': ('sqrt', 'sqrt', 'SQRT'),
-            'POWER': ('pow', 'pow', 'POWER'),
+            'POWER': ('pow', 'power', 'POWER'),
             'EXP': ('exp', 'exp', 'EXP'),
-            'LOG': ('log', 'log', 'LOG'),
+            'LOG': ('log10', 'log10', 'LOG'),
             'LN': ('log', 'log', 'LN'),
             
             # String functions
@@ -72,7 +373,7 @@ class TableauFormulaTranslator:
             'MONTH': ('month', 'dt.month', 'MONTH'),
             'DAY': ('day', 'dt.day', 'DAY'),
             'QUARTER': ('quarter', 'dt.quarter', 'QUARTER'),
-            'WEEK': ('week', 'dt.week', 'WEEK'),
+            'WEEK': ('week', 'dt.isocalendar().week', 'WEEK'),
             'DATEPART': (None, 'dt.', 'DATE_PART'),
             'DATEADD': (None, 'pd.DateOffset', 'DATEADD'),
             'DATEDIFF': (None, None, 'DATEDIFF'),
@@ -100,6 +401,12 @@ class TableauFormulaTranslator:
             'LAST': (None, 'last()', 'LAST_VALUE() OVER'),
         }
         
+        # Workbooks repeat calculations across worksheets; translate each distinct
+        # cleaned formula once. Wrapping the bound method keeps self out of the key.
+        self._translate_cleaned = functools.lru_cache(maxsize=_TRANSLATION_CACHE_SIZE)(
+            self._translate_uncached
+        )
+        
     def translate(self, tableau_formula: str) -> TranslatedFormula:
         """Translate a Tableau formula to Python/Pandas/SQL"""
         logger.info(f"Translating formula: {tableau_formula}")
@@ -107,17 +414,76 @@ class TableauFormulaTranslator:
         # Clean formula
         formula = self._clean_formula(tableau_formula)
         
-        # Extract dependencies
-        dependencies = self._extract_dependencies(formula)
+        return self._translate_cleaned(formula)
+    
+    def translate_many(self, formulas: List[str], workers: int = 0,
+                       return_exceptions: bool = False) -> List[Union[TranslatedFormula, Exception]]:
+        """Translate a batch of formulas, in up to `workers` processes for large batches.
         
-        # Check formula type
-        requires_aggregation = self._requires_aggregation(formula)
-        is_window_function = self._is_window_function(formula)
+        workers=0 (the default) translates in-process; a library call shouldn't fork its host.
+        With return_exceptions, a formula that fails yields its exception in place of a
+        result instead of failing the whole batch.
+        """
+        cleaned = [self._clean_formula(formula) for formula in formulas]
+        distinct = list(dict.fromkeys(cleaned))
+        results = None
+        if workers >= 2 and len(distinct) >= _PARALLEL_TRANSLATE_MIN:
+            try:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    results = dict(zip(distinct, pool.map(_translate_in_worker, distinct, chunksize=64)))
+            except (OSError, BrokenProcessPool) as e:
+                logger.warning(f"Parallel translation unavailable, translating serially: {e}")
+        if results is None:
+            results = {formula: _translate_or_exception(self, formula) for formula in distinct}
         
-        # Translate to different targets
-        python_expr = self._translate_to_python(formula)
-        pandas_expr = self._translate_to_pandas(formula)
-        sql_expr = self._translate_to_sql(formula)
+        outcomes = [results[formula] for formula in cleaned]
+        if not return_exceptions:
+            for outcome in outcomes:
+                if isinstance(outcome, Exception):
+                    raise outcome
+        return outcomes
+    
+    def _translate_uncached(self, formula: str) -> TranslatedFormula:
+        """Run the full translation pipeline on a cleaned formula"""
+        # One tokenizer scan feeds dependencies, classification and the parser
+        try:
+            tokens = _tokenize(formula)
+        except FormulaParseError as e:
+            logger.warning(f"Could not parse formula, keeping it untranslated: {e}")
+            tokens = None
+        
+        if tokens is not None:
+            dependencies = _dependency_tuple({name for kind, text in tokens if kind == 'field'
+                                              for name in _FIELD_REF_RE.findall(text)})
+            calls = {text for (kind, text), (_, following) in zip(tokens, tokens[1:])
+                     if kind == 'name' and following == '('}
+            requires_aggregation = not calls.isdisjoint(_AGGREGATE_FUNCTIONS)
+            is_window_function = any(call in _WINDOW_FUNCTIONS or call.startswith(_WINDOW_PREFIXES)
+                                     for call in calls)
+        else:
+            dependencies = self._extract_dependencies(formula)
+            requires_aggregation = self._requires_aggregation(formula)
+            is_window_function = self._is_window_function(formula)
+        
+        # Parse once; every target is emitted from the same tree
+        expressions = None
+        if tokens is not None:
+            try:
+                tree = _FormulaParser(tokens).parse()
+                expressions = (self._emit_python(tree), self._emit_pandas(tree), self._emit_sql(tree))
+            except FormulaParseError as e:
+                logger.warning(f"Could not parse formula, keeping it untranslated: {e}")
+            except RecursionError:
+                # Parser and emitters recurse once per nesting level; pathological
+                # input falls back like any other unparsable formula
+                logger.warning("Formula is nested too deeply, keeping it untranslated")
+        
+        if expressions is not None:
+            python_expr, pandas_expr, sql_expr = expressions
+        else:
+            python_expr = _FIELD_REF_RE.sub(r"data['\1']", formula)
+            pandas_expr = _FIELD_REF_RE.sub(r"df['\1']", formula)
+            sql_expr = _FIELD_REF_RE.sub(r'"\1"', formula)
         
         return TranslatedFormula(
             python_expression=python_expr,
@@ -130,162 +496,408 @@ class TableauFormulaTranslator:
     
     def _clean_formula(self, formula: str) -> str:
         """Clean and normalize Tableau formula"""
-        # Remove extra whitespace
-        formula = ' '.join(formula.split())
-        
-        # Normalize function names to uppercase
-        for func in self.function_map:
-            formula = re.sub(rf'\b{func}\b', func, formula, flags=re.IGNORECASE)
-        
-        return formula
+        # Remove extra whitespace. Function names are left as written: the tokenizer
+        # upper-cases name tokens, which never include string literals or [fields].
+        return ' '.join(formula.split())
     
-    def _extract_dependencies(self, formula: str) -> List[str]:
+    def _extract_dependencies(self, formula: str) -> Tuple[str, ...]:
         """Extract field dependencies from formula"""
-        # Pattern to match [FieldName]
-        pattern = r'\[([^\]]+)\]'
-        matches = re.findall(pattern, formula)
-        return list(set(matches))
+        return _dependency_tuple(set(_FIELD_REF_RE.findall(formula)))
     
     def _requires_aggregation(self, formula: str) -> bool:
         """Check if formula requires aggregation"""
-        agg_functions = ['SUM', 'AVG', 'COUNT', 'COUNTD', 'MIN', 'MAX', 'MEDIAN', 'STDEV', 'VAR']
-        return any(func in formula.upper() for func in agg_functions)
+        return _AGGREGATE_CALL_RE.search(formula) is not None
     
     def _is_window_function(self, formula: str) -> bool:
         """Check if formula uses window functions"""
-        window_functions = ['RUNNING_', 'WINDOW_', 'RANK', 'INDEX', 'FIRST', 'LAST']
-        return any(func in formula.upper() for func in window_functions)
+        return _WINDOW_CALL_RE.search(formula) is not None
     
-    def _translate_to_python(self, formula: str) -> str:
-        """Translate to pure Python expression"""
-        result = formula
-        
-        # Replace field references
-        result = re.sub(r'\[([^\]]+)\]', r"data['\1']", result)
-        
-        # Replace functions
-        for tableau_func, (python_func, _, _) in self.function_map.items():
-            if python_func and tableau_func in result:
-                result = result.replace(tableau_func, python_func)
-        
-        # Handle IF statements
-        result = self._translate_if_statements(result, 'python')
-        
-        # Handle LOD expressions
-        result = self._translate_lod_expressions(result, 'python')
-        
-        return result
+    @staticmethod
+    def _operand(node: Node, emit: Callable[[Node], str]) -> str:
+        """Emit a sub-expression, parenthesized when it is itself an operator"""
+        text = emit(node)
+        return f"({text})" if isinstance(node, BinOp) else text
     
-    def _translate_to_pandas(self, formula: str) -> str:
-        """Translate to Pandas expression"""
-        result = formula
-        
-        # Replace field references
-        result = re.sub(r'\[([^\]]+)\]', r"df['\1']", result)
-        
-        # Replace functions
-        for tableau_func, (_, pandas_func, _) in self.function_map.items():
-            if pandas_func and tableau_func in result:
-                if '()' in pandas_func:
-                    # Method call
-                    result = re.sub(rf'{tableau_func}\s*\(([^)]*)\)', 
-                                  rf"df['\1'].{pandas_func}", result)
-                else:
-                    # Property or operator
-                    result = result.replace(tableau_func, pandas_func)
-        
-        # Handle IF statements
-        result = self._translate_if_statements(result, 'pandas')
+    @staticmethod
+    def _receiver(node: Node, emit: Callable[[Node], str]) -> str:
+        """Emit the object a method or attribute is looked up on"""
+        text = emit(node)
+        return f"({text})" if isinstance(node, (BinOp, UnaryOp)) else text
+    
+    def _binary(self, node: BinOp, op: str, emit: Callable[[Node], str]) -> str:
+        # A left operand with the same operator chains without parentheses: a + b + c
+        if isinstance(node.left, BinOp) and node.left.op == node.op:
+            left = emit(node.left)
+        else:
+            left = self._operand(node.left, emit)
+        return f"{left} {op} {self._operand(node.right, emit)}"
+    
+    @staticmethod
+    def _lod_dimensions(node: LODExpr, emit: Callable[[Node], str]) -> str:
+        """Grouping keys: column names for fields, emitted expressions otherwise"""
+        keys = [repr(dim.name) if isinstance(dim, Field) else emit(dim) for dim in node.dimensions]
+        return f"[{', '.join(keys)}]"
+    
+    @staticmethod
+    def _passthrough(name: str, args: List[str]) -> str:
+        """Keep an untranslatable call in Tableau spelling so it stands out"""
+        return f"{name}({', '.join(args)})"
+    
+    @staticmethod
+    def _date_part(node: Node) -> Optional[str]:
+        """The unit of a date function when given as a literal, e.g. 'month'"""
+        if isinstance(node, Literal) and node.kind == 'string':
+            return node.value.lower()
+        return None
+    
+    def _emit_python(self, node: Node) -> str:
+        """Emit a pure-Python expression over a row mapping named data"""
+        emit = self._emit_python
+        if isinstance(node, Field):
+            return f"data[{node.name!r}]"
+        if isinstance(node, Literal):
+            if node.kind == 'string':
+                return repr(node.value)
+            if node.kind == 'date':
+                return f"pd.Timestamp({node.value!r})"
+            if node.kind == 'boolean':
+                return 'True' if node.value == 'TRUE' else 'False'
+            if node.kind == 'null':
+                return 'None'
+            return node.value
+        if isinstance(node, BinOp):
+            return self._binary(node, _PYTHON_OPERATORS.get(node.op, node.op), emit)
+        if isinstance(node, UnaryOp):
+            operand = self._operand(node.operand, emit)
+            return f"not {operand}" if node.op == 'NOT' else f"-{operand}"
+        if isinstance(node, IfExpr):
+            result = emit(node.else_) if node.else_ is not None else 'None'
+            for condition, value in reversed(node.branches):
+                result = f"({emit(value)} if {emit(condition)} else {result})"
+            return result
+        if isinstance(node, CaseExpr):
+            subject = self._operand(node.subject, emit)
+            result = emit(node.else_) if node.else_ is not None else 'None'
+            for value, then in reversed(node.whens):
+                result = f"({emit(then)} if {subject} == {self._operand(value, emit)} else {result})"
+            return result
+        if isinstance(node, LODExpr):
+            dims = self._lod_dimensions(node, emit)
+            return f"calculate_lod({node.kind!r}, {dims}, lambda data: {emit(node.expr)})"
+        return self._python_call(node)
+    
+    def _python_call(self, call: FuncCall) -> str:
+        emit = self._emit_python
+        name, args = call.name, [emit(arg) for arg in call.args]
         
-        # Handle LOD expressions
-        result = self._translate_lod_expressions(result, 'pandas')
+        if name == 'IIF' and len(args) >= 3:
+            return f"({args[1]} if {args[0]} else {args[2]})"
+        if name == 'ZN' and len(args) == 1:
+            return f"({args[0]} or 0)"
+        if name == 'IFNULL' and len(args) == 2:
+            return f"({args[0]} if {args[0]} is not None else {args[1]})"
+        if name == 'ISNULL' and len(args) == 1:
+            return f"({args[0]} is None)"
+        if name == 'CONTAINS' and len(args) == 2:
+            return f"({args[1]} in {args[0]})"
+        if name == 'COUNTD' and len(args) == 1:
+            return f"len(set({args[0]}))"
+        if name in ('LEFT', 'RIGHT', 'MID') and len(args) >= 2:
+            return self._slice(name, self._receiver(call.args[0], emit), args[1:])
         
-        return result
+        func = self.function_map.get(name, (None,))[0]
+        if func is None or (not args and not func.endswith(')')):
+            return self._passthrough(name, args)
+        if not args:
+            return func  # date.today(), datetime.now()
+        if func in _PYTHON_METHODS:
+            return f"{self._receiver(call.args[0], emit)}.{func}({', '.join(args[1:])})"
+        if func in _PYTHON_ATTRIBUTES:
+            return f"{self._receiver(call.args[0], emit)}.{func}"
+        return f"{_PYTHON_FUNCTIONS.get(func, func)}({', '.join(args)})"
     
-    def _translate_to_sql(self, formula: str) -> Optional[str]:
-        """Translate to SQL expression"""
-        result = formula
-        
-        # Replace field references
-        result = re.sub(r'\[([^\]]+)\]', r'"\1"', result)
+    @staticmethod
+    def _slice(name: str, receiver: str, args: List[str]) -> str:
+        """LEFT/RIGHT/MID as slices; Tableau positions are 1-based"""
+        if name == 'LEFT':
+            return f"{receiver}[:{args[0]}]"
+        if name == 'RIGHT':
+            return f"{receiver}[-{args[0]}:]"
+        if args[0].isdigit():
+            start = str(int(args[0]) - 1)
+            end = str(int(start) + int(args[1])) if len(args) > 1 and args[1].isdigit() else None
+        else:
+            start, end = f"{args[0]} - 1", None
+        if len(args) == 1:
+            return f"{receiver}[{start}:]"
+        return f"{receiver}[{start}:{end or f'{start} + {args[1]}'}]"
+    
+    def _emit_pandas(self, node: Node) -> str:
+        """Emit a vectorized pandas expression over a DataFrame named df"""
+        emit = self._emit_pandas
+        if isinstance(node, Field):
+            return f"df[{node.name!r}]"
+        if isinstance(node, Literal):
+            if node.kind == 'string':
+                return repr(node.value)
+            if node.kind == 'date':
+                return f"pd.Timestamp({node.value!r})"
+            if node.kind == 'boolean':
+                return 'True' if node.value == 'TRUE' else 'False'
+            if node.kind == 'null':
+                return 'np.nan'
+            return node.value
+        if isinstance(node, BinOp):
+            return self._binary(node, _PANDAS_OPERATORS.get(node.op, node.op), emit)
+        if isinstance(node, UnaryOp):
+            operand = self._operand(node.operand, emit)
+            return f"~{operand}" if node.op == 'NOT' else f"-{operand}"
+        if isinstance(node, IfExpr):
+            result = emit(node.else_) if node.else_ is not None else 'np.nan'
+            for condition, value in reversed(node.branches):
+                result = f"np.where({emit(condition)}, {emit(value)}, {result})"
+            return result
+        if isinstance(node, CaseExpr):
+            subject = self._operand(node.subject, emit)
+            conditions = ', '.join(f"{subject} == {self._operand(value, emit)}" for value, _ in node.whens)
+            choices = ', '.join(emit(then) for _, then in node.whens)
+            default = emit(node.else_) if node.else_ is not None else 'np.nan'
+            return f"np.select([{conditions}], [{choices}], default={default})"
+        if isinstance(node, LODExpr):
+            return self._pandas_lod(node)
+        return self._pandas_call(node)
+    
+    def _pandas_lod(self, node: LODExpr) -> str:
+        # EXCLUDE (and any LOD without dimensions) aggregates over the whole frame;
+        # INCLUDE has no view to add its dimensions to, so it groups like FIXED
+        inner = self._emit_pandas(node.expr)
+        if node.kind == 'EXCLUDE' or not node.dimensions:
+            return inner
         
-        # Replace functions
-        for tableau_func, (_, _, sql_func) in self.function_map.items():
-            if sql_func and tableau_func in result:
-                result = result.replace(tableau_func, sql_func)
+        dims = self._lod_dimensions(node, self._emit_pandas)
+        expr = node.expr
+        if isinstance(expr, FuncCall) and len(expr.args) == 1 and isinstance(expr.args[0], Field):
+            method = self.function_map.get(expr.name, (None, None))[1]
+            if method and method.endswith('()') and method[:-2].isidentifier():
+                # Aggregate of one column: broadcast the per-group value back to every row
+                return f"df.groupby({dims})[{expr.args[0].name!r}].transform({method[:-2]!r})"
+        return f"df.groupby({dims}).apply(lambda df: {inner})"
+    
+    def _pandas_call(self, call: FuncCall) -> str:
+        emit = self._emit_pandas
+        name, args = call.name, [emit(arg) for arg in call.args]
         
-        # Handle IF statements
-        result = self._translate_if_statements(result, 'sql')
+        if name == 'IIF' and len(args) >= 3:
+            return f"np.where({args[0]}, {args[1]}, {args[2]})"
+        if name in ('ZN', 'IFNULL') and len(args) == (1 if name == 'ZN' else 2) and self._is_scalar(call.args[0]):
+            # Aggregates come back as NumPy scalars, which have no fillna
+            fallback = args[1] if name == 'IFNULL' else '0'
+            return f"({args[0]} if pd.notna({args[0]}) else {fallback})"
+        if name in ('LEFT', 'RIGHT', 'MID') and len(args) >= 2:
+            return self._slice(name, f"{self._receiver(call.args[0], emit)}.str", args[1:])
+        if name in ('DATEPART', 'DATETRUNC', 'DATEADD', 'DATEDIFF'):
+            translated = self._pandas_date_call(name, call.args)
+            return translated if translated is not None else self._passthrough(name, args)
         
-        # Handle LOD expressions
-        result = self._translate_lod_expressions(result, 'sql')
+        func = self.function_map.get(name, (None, None))[1]
+        if func is None:
+            return self._passthrough(name, args)
+        if func.startswith('pd.'):
+            return func if not args else self._passthrough(name, args)  # TODAY(), NOW()
+        if not args:
+            return self._passthrough(name, args)
+        if func in _NUMPY_FUNCTIONS:
+            return f"np.{func}({', '.join(args)})"
         
-        return result
+        receiver = self._receiver(call.args[0], emit)
+        if func.endswith(')'):
+            return f"{receiver}.{func}"  # sum(), isna(), fillna(0), expanding().mean()
+        if len(args) > 1:
+            return f"{receiver}.{func}({', '.join(args[1:])})"
+        return f"{receiver}.{func}"  # dt.year and other accessor properties
+    
+    @classmethod
+    def _is_scalar(cls, node: Node) -> bool:
+        """Whether the pandas expression for node is a single value rather than a Series"""
+        if isinstance(node, Literal):
+            return True
+        if isinstance(node, FuncCall):
+            return node.name in _AGGREGATE_FUNCTIONS
+        if isinstance(node, BinOp):
+            return cls._is_scalar(node.left) and cls._is_scalar(node.right)
+        if isinstance(node, UnaryOp):
+            return cls._is_scalar(node.operand)
+        return False
     
-    def _translate_if_statements(self, formula: str, target: str) -> str:
-        """Translate IF/THEN/ELSE statements"""
-        # Pattern for IF statements
-        if_pattern = r'IF\s+(.+?)\s+THEN\s+(.+?)\s+(?:ELSEIF\s+(.+?)\s+THEN\s+(.+?)\s+)*ELSE\s+(.+?)\s+END'
+    def _pandas_date_call(self, name: str, call_args: List[Node]) -> Optional[str]:
+        """Date functions whose unit is a literal; None when there is no pandas spelling"""
+        if not call_args:
+            return None
+        part = self._date_part(call_args[0])
+        args = [self._receiver(arg, self._emit_pandas) for arg in call_args[1:]]
         
-        def replace_if(match):
-            groups = match.groups()
-            condition = groups[0]
-            then_value = groups[1]
-            else_value = groups[-1]
-            
-            if target == 'python':
-                return f"({then_value} if {condition} else {else_value})"
-            elif target == 'pandas':
-                return f"np.where({condition}, {then_value}, {else_value})"
-            elif target == 'sql':
-                return f"CASE WHEN {condition} THEN {then_value} ELSE {else_value} END"
-            
-        result = re.sub(if_pattern, replace_if, formula, flags=re.IGNORECASE | re.DOTALL)
-        return result
+        if name == 'DATEPART' and len(args) == 1 and part in _DATE_PART_ATTRIBUTES:
+            return f"{args[0]}.dt.{_DATE_PART_ATTRIBUTES[part]}"
+        if name == 'DATETRUNC' and len(args) == 1:
+            if part in _PERIOD_ALIASES:
+                return f"{args[0]}.dt.to_period({_PERIOD_ALIASES[part]!r}).dt.start_time"
+            if part in _FLOOR_ALIASES:
+                return f"{args[0]}.dt.floor({_FLOOR_ALIASES[part]!r})"
+        if name == 'DATEADD' and len(args) == 2:
+            if part == 'quarter':
+                return f"{args[1]} + pd.DateOffset(months=3 * {args[0]})"
+            if part in _DATE_OFFSET_UNITS:
+                return f"{args[1]} + pd.DateOffset({_DATE_OFFSET_UNITS[part]}={args[0]})"
+        if name == 'DATEDIFF' and len(args) >= 2:
+            # Tableau counts unit boundaries crossed, not elapsed whole units
+            start, end = args[0], args[1]
+            if part == 'day':
+                return f"({end}.dt.normalize() - {start}.dt.normalize()).dt.days"
+            if part == 'year':
+                return f"{end}.dt.year - {start}.dt.year"
+            if part == 'quarter':
+                return f"({end}.dt.year - {start}.dt.year) * 4 + ({end}.dt.quarter - {start}.dt.quarter)"
+            if part == 'month':
+                return f"({end}.dt.year - {start}.dt.year) * 12 + ({end}.dt.month - {start}.dt.month)"
+        return None
+    
+    def _emit_sql(self, node: Node) -> str:
+        """Emit a SQL expression with double-quoted column identifiers"""
+        emit = self._emit_sql
+        if isinstance(node, Field):
+            return '"' + node.name.replace('"', '""') + '"'
+        if isinstance(node, Literal):
+            if node.kind == 'string':
+                return "'" + node.value.replace("'", "''") + "'"
+            if node.kind == 'date':
+                return f"TO_TIMESTAMP('{node.value}')"
+            return node.value  # numbers, TRUE/FALSE, NULL
+        if isinstance(node, BinOp):
+            if node.op == '^':
+                return f"POWER({emit(node.left)}, {emit(node.right)})"
+            return self._binary(node, node.op, emit)
+        if isinstance(node, UnaryOp):
+            operand = self._operand(node.operand, emit)
+            return f"NOT {operand}" if node.op == 'NOT' else f"-{operand}"
+        if isinstance(node, IfExpr):
+            whens = ' '.join(f"WHEN {emit(condition)} THEN {emit(value)}" for condition, value in node.branches)
+            else_ = f" ELSE {emit(node.else_)}" if node.else_ is not None else ''
+            return f"CASE {whens}{else_} END"
+        if isinstance(node, CaseExpr):
+            whens = ' '.join(f"WHEN {emit(value)} THEN {emit(then)}" for value, then in node.whens)
+            else_ = f" ELSE {emit(node.else_)}" if node.else_ is not None else ''
+            return f"CASE {emit(node.subject)} {whens}{else_} END"
+        if isinstance(node, LODExpr):
+            inner = emit(node.expr)
+            if node.kind != 'FIXED':
+                return inner  # INCLUDE/EXCLUDE need the view's dimensions
+            partition = ', '.join(emit(dim) for dim in node.dimensions)
+            return f"{inner} OVER (PARTITION BY {partition})" if partition else f"{inner} OVER ()"
+        return self._sql_call(node)
     
-    def _translate_lod_expressions(self, formula: str, target: str) -> str:
-        """Translate Level of Detail (LOD) expressions"""
-        # Pattern for LOD expressions
-        lod_pattern = r'\{(FIXED|INCLUDE|EXCLUDE)\s+([^:]+):\s+(.+?)\}'
+    def _sql_call(self, call: FuncCall) -> str:
+        name, args = call.name, [self._emit_sql(arg) for arg in call.args]
         
-        def replace_lod(match):
-            lod_type = match.group(1)
-            dimensions = match.group(2).strip()
-            expression = match.group(3).strip()
-            
-            # Clean dimension list
-            dims = [d.strip() for d in dimensions.split(',')]
-            dims = [re.sub(r'\[([^\]]+)\]', r'\1', d) for d in dims]
-            
-            if target == 'pandas':
-                if lod_type == 'FIXED':
-                    return f"df.groupby({dims}).transform(lambda x: x{expression})"
-                elif lod_type == 'INCLUDE':
-                    current_dims = "current_groupby_dims"  # This would need context
-                    all_dims = list(set(dims + [current_dims]))
-                    return f"df.groupby({all_dims}).transform(lambda x: x{expression})"
-                else:  # EXCLUDE
-                    return f"df.transform(lambda x: x{expression})"  # Simplified
-            
-            elif target == 'sql':
-                if lod_type == 'FIXED':
-                    dim_list = ', '.join([f'"{d}"' for d in dims])
-                    return f"{expression} OVER (PARTITION BY {dim_list})"
-                else:
-                    return expression  # Simplified for now
-            
-            else:  # python
-                return f"calculate_lod('{lod_type}', {dims}, lambda data: data{expression})"
+        if name == 'IIF' and len(args) >= 3:
+            return f"CASE WHEN {args[0]} THEN {args[1]} ELSE {args[2]} END"
+        if name == 'COUNTD' and len(args) == 1:
+            return f"COUNT(DISTINCT {args[0]})"
+        if name == 'ZN' and len(args) == 1:
+            return f"COALESCE({args[0]}, 0)"
+        if name == 'IFNULL' and len(args) == 2:
+            return f"COALESCE({args[0]}, {args[1]})"
+        if name == 'ISNULL' and len(args) == 1:
+            return f"({args[0]} IS NULL)"
+        if name == 'CONTAINS' and len(args) == 2:
+            return f"({args[0]} LIKE '%' || {args[1]} || '%')"
+        if name == 'STARTSWITH' and len(args) == 2:
+            return f"({args[0]} LIKE {args[1]} || '%')"
+        if name == 'ENDSWITH' and len(args) == 2:
+            return f"({args[0]} LIKE '%' || {args[1]})"
+        if name == 'LOG' and len(args) in (1, 2):
+            # Tableau takes LOG(number [, base]); SQL takes LOG(base, number)
+            base = args[1] if len(args) == 2 else '10'
+            return f"LOG({base}, {args[0]})"
+        if name in ('TODAY', 'NOW') and not args:
+            return self.function_map[name][2]
         
-        result = re.sub(lod_pattern, replace_lod, formula, flags=re.IGNORECASE)
-        return result
+        func = self.function_map.get(name, (None, None, None))[2]
+        if func is None:
+            return self._passthrough(name, args)
+        if func.endswith(' OVER'):
+            if name == 'RANK' and args:
+                return f"RANK() OVER (ORDER BY {args[0]} DESC)"
+            return f"{func[:-len('() OVER')]}({', '.join(args)}) OVER ()"
+        return f"{func}({', '.join(args)})"
+
+
+@functools.lru_cache(maxsize=1)
+def _worker_translator() -> TableauFormulaTranslator:
+    """One translator per worker process, so its cache lives across chunks"""
+    return TableauFormulaTranslator()
+
+
+def _translate_or_exception(translator: TableauFormulaTranslator,
+                            formula: str) -> Union[TranslatedFormula, Exception]:
+    """Translate one already-cleaned formula, handing back any exception instead of raising it"""
+    try:
+        return translator._translate_cleaned(formula)
+    except Exception as e:
+        return e
+
+
+def _translate_in_worker(formula: str) -> Union[TranslatedFormula, Exception]:
+    """Process-pool worker: translate one already-cleaned formula"""
+    return _translate_or_exception(_worker_translator(), formula)
+
+
+# Absolute tolerance when comparing float results of a translated formula
+_VALIDATION_TOLERANCE = 1e-6
+
+
+def _count_mismatches(a: np.ndarray, b: np.ndarray, tol: float) -> int:
+    """Number of positions where a and b differ by more than tol; NaN matches NaN"""
+    close = np.abs(a - b) <= tol
+    close |= np.isnan(a) & np.isnan(b)
+    return int(a.shape[0] - np.count_nonzero(close))
+
+
+@functools.lru_cache(maxsize=None)
+def _numba_count_mismatches() -> Optional[Callable[[np.ndarray, np.ndarray, float], int]]:
+    """Parallel Numba version of _count_mismatches, or None when numba isn't installed.
+    
+    numba is imported here rather than at module level, and the kernel is compiled on its
+    first call, so importing this module never pays for the JIT.
+    """
+    try:
+        from numba import njit, prange
+    except ImportError:
+        return None
+    
+    @njit(parallel=True)
+    def count_mismatches(a, b, tol):
+        mismatches = 0
+        for i in prange(a.shape[0]):
+            x = a[i]
+            y = b[i]
+            if not (abs(x - y) <= tol or (x != x and y != y)):
+                mismatches += 1
+        return mismatches
+    
+    return count_mismatches
+
+
+def _float_array(series: pd.Series) -> np.ndarray:
+    return np.ascontiguousarray(series.to_numpy(dtype='float64', na_value=np.nan))
 
 
 class CalculationValidator:
     """Validates that translated calculations produce same results as Tableau"""
     
-    def __init__(self, snowflake_connection):
+    def __init__(self, snowflake_connection, use_numba: bool = False):
         self.connection = snowflake_connection
+        # Numba only pays off on large frames; NumPy is the default and the fallback
+        self._count_mismatches = (use_numba and _numba_count_mismatches()) or _count_mismatches
         
     def validate_calculation(self, 
                            original_formula: str,
@@ -295,16 +907,21 @@ class CalculationValidator:
         """Validate that translated formula produces same results"""
         try:
             # Execute translated formula
-            result = eval(translated_formula, {'df': test_data, 'pd': pd, 'np': __import__('numpy')})
+            result = eval(translated_formula, {'df': test_data, 'pd': pd, 'np': np})
             
             # Compare results
             if isinstance(result, pd.Series):
                 # Numeric comparison with tolerance
-                if result.dtype in ['float64', 'float32']:
-                    matches = result.round(6).equals(expected_result.round(6))
-                else:
-                    matches = result.equals(expected_result)
+                if (result.dtype in ['float64', 'float32']
+                        and len(result) == len(expected_result)
+                        and result.index.equals(expected_result.index)):
+                    diff_count = self._count_mismatches(_float_array(result), _float_array(expected_result),
+                                                        _VALIDATION_TOLERANCE)
+                    if diff_count:
+                        return False, f"Results differ in {diff_count} rows"
+                    return True, None
                 
+                matches = result.equals(expected_result)
                 if not matches:
                     diff_count = (result != expected_result).sum()
                     return False, f"Results differ in {diff_count} rows"
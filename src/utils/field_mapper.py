@@ -2,17 +2,36 @@
 Field Mapping System - Maps Tableau field names to Python-compatible variable names
 """
 import re
+import sys
 import json
+import functools
+import itertools
 import logging
+import operator
+from collections import Counter
 from typing import Dict, List, Any, Optional, Tuple
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, fields
 from pathlib import Path
 import keyword
+import pandas as pd
+
+try:
+    import orjson  # Native serializer; the json module is the fallback
+    _HAS_ORJSON = True
+except ImportError:
+    _HAS_ORJSON = False
 
 logger = logging.getLogger(__name__)
 
+# Auto-generated duplicate names such as "2022_(copy)_(copy)_780248699807363141"
+_RE_COPY_ID = re.compile(r'^(\d{4})_\(copy\)_\(copy\)_\d+$')
+_RE_COPY_TAG = re.compile(r'\s*\(copy\)\s*')
+_RE_WS = re.compile(r'\s+')
+# A run of anything that can't appear in an identifier, underscores included
+_RE_NON_IDENT_RUN = re.compile(r'[\W_]+')
+
 
-@dataclass
+@dataclass(slots=True)
 class FieldMapping:
     """Represents a mapping between Tableau field and Python variable"""
     tableau_field: str  # Original Tableau field name (e.g., "[2022_(copy)_(copy)_780248699807363141]")
@@ -23,6 +42,20 @@ class FieldMapping:
     data_type: str      # Data type: 'string', 'integer', 'real', 'boolean', 'date'
     is_valid: bool = True  # Whether the python_name is valid
     validation_error: Optional[str] = None
+    
+    def __post_init__(self):
+        # A handful of type strings repeat across every mapping; share one copy of each.
+        # Imported JSON can hold null for either, which is kept as is.
+        if isinstance(self.field_type, str):
+            self.field_type = sys.intern(self.field_type)
+        if isinstance(self.data_type, str):
+            self.data_type = sys.intern(self.data_type)
+
+
+# Every FieldMapping attribute is a primitive, so a flat attribute read replaces asdict()
+_MAPPING_FIELDS = tuple(f.name for f in fields(FieldMapping))
+_is_valid = operator.attrgetter('is_valid')
+_field_type = operator.attrgetter('field_type')
 
 
 class FieldMapper:
@@ -30,146 +63,83 @@ class FieldMapper:
     
     def __init__(self):
         self.mappings: Dict[str, FieldMapping] = {}
+        # python_name -> Tableau fields currently mapped to it, in registration order
+        self._python_name_index: Dict[str, Dict[str, None]] = {}
         self.reserved_names = set(keyword.kwlist + ['data', 'df', 'result', 'value', 'index'])
     
     def extract_fields_from_workbook(self, workbook_structure: Any) -> List[FieldMapping]:
         """Extract all field names from workbook structure"""
-        fields = []
+        # Gather (tableau_field, field_type, data_type) for every field first
+        specs = [
+            (calc_name, 'calculation', calculation.data_type)
+            for calc_name, calculation in workbook_structure.calculations.items()
+        ]
         
-        # Extract from calculations
-        for calc_name, calculation in workbook_structure.calculations.items():
-            # Clean up the display name
-            display_name = self._clean_display_name(calc_name)
-            
-            # Generate Python-compatible name
-            python_name = self._generate_python_name(calc_name)
-            
-            # Create mapping
+        # Extract from datasources (dimensions and measures)
+        for datasource in workbook_structure.datasources:
+            specs.extend(self._datasource_field_specs(datasource))
+        
+        # Extract from parameters
+        for param in workbook_structure.parameters:
+            param_name = param.get('name', '')
+            if param_name:
+                specs.append((param_name, 'parameter', param.get('datatype', 'string')))
+        
+        # Derive all names in one batch, then build, validate and register the
+        # mappings in a single pass, in workbook order
+        display_names, python_names = self._bulk_normalize([spec[0] for spec in specs])
+        
+        fields = []
+        for (tableau_field, field_type, data_type), display_name, python_name in zip(
+                specs, display_names, python_names):
             mapping = FieldMapping(
-                tableau_field=calc_name,
+                tableau_field=tableau_field,
                 display_name=display_name,
                 python_name=python_name,
                 display_label=display_name,
-                field_type='calculation',
-                data_type=calculation.data_type,
+                field_type=field_type,
+                data_type=data_type,
             )
             
             # Validate the Python name
             self._validate_python_name(mapping)
             
             fields.append(mapping)
-            self.mappings[calc_name] = mapping
-        
-        # Extract from datasources (dimensions and measures)
-        for datasource in workbook_structure.datasources:
-            fields.extend(self._extract_datasource_fields(datasource))
-        
-        # Extract from parameters
-        for param in workbook_structure.parameters:
-            param_name = param.get('name', '')
-            if param_name:
-                display_name = self._clean_display_name(param_name)
-                python_name = self._generate_python_name(param_name)
-                
-                mapping = FieldMapping(
-                    tableau_field=param_name,
-                    display_name=display_name,
-                    python_name=python_name,
-                    display_label=display_name,
-                    field_type='parameter',
-                    data_type=param.get('datatype', 'string'),
-                )
-                
-                self._validate_python_name(mapping)
-                fields.append(mapping)
-                self.mappings[param_name] = mapping
+            self._register_mapping(mapping)
         
         logger.info(f"Extracted {len(fields)} fields from workbook")
         return fields
     
-    def _extract_datasource_fields(self, datasource: Dict[str, Any]) -> List[FieldMapping]:
-        """Extract fields from a datasource"""
-        fields = []
+    def _datasource_field_specs(self, datasource: Dict[str, Any]) -> List[Tuple[str, str, str]]:
+        """(name, field type, data type) for each column instance of a datasource"""
+        specs = []
         
         # Extract from column instances (dimensions and measures)
         for col_inst in datasource.get('column_instances', []):
             field_name = col_inst.get('name', '')
             if field_name:
-                display_name = self._clean_display_name(field_name)
-                python_name = self._generate_python_name(field_name)
-                
                 # Determine field type
                 field_type = 'dimension' if col_inst.get('type') == 'discrete' else 'measure'
-                
-                mapping = FieldMapping(
-                    tableau_field=field_name,
-                    display_name=display_name,
-                    python_name=python_name,
-                    display_label=display_name,
-                    field_type=field_type,
-                    data_type=col_inst.get('datatype', 'string'),
-                )
-                
-                self._validate_python_name(mapping)
-                fields.append(mapping)
-                self.mappings[field_name] = mapping
+                specs.append((field_name, field_type, col_inst.get('datatype', 'string')))
         
-        return fields
+        return specs
+    
+    def _bulk_normalize(self, names: List[str]) -> Tuple[List[str], List[str]]:
+        """Display names and Python names for a batch of Tableau names"""
+        display_names = list(map(_display_name_for, names))
+        python_names = [
+            f"{python_name}_field" if python_name in self.reserved_names else python_name
+            for python_name in map(_python_name_for, names)
+        ]
+        return display_names, python_names
     
     def _clean_display_name(self, tableau_name: str) -> str:
         """Clean up Tableau field name for display"""
-        # Remove brackets and quotes
-        cleaned = tableau_name.strip('[]"\'')
-        
-        # Handle special patterns like long IDs
-        if re.match(r'^\d{4}_\(copy\)_\(copy\)_\d+$', cleaned):
-            # Extract year from pattern like "2022_(copy)_(copy)_780248699807363141"
-            year_match = re.match(r'^(\d{4})_\(copy\)_\(copy\)_\d+$', cleaned)
-            if year_match:
-                year = year_match.group(1)
-                return f"{year} (copy) (copy)"
-        
-        # Replace underscores with spaces
-        cleaned = cleaned.replace('_', ' ')
-        
-        # Remove excessive parentheses and clean up
-        cleaned = re.sub(r'\s*\(copy\)\s*', ' (copy)', cleaned)
-        cleaned = re.sub(r'\s+', ' ', cleaned).strip()
-        
-        return cleaned
+        return _display_name_for(tableau_name)
     
     def _generate_python_name(self, tableau_name: str) -> str:
         """Generate Python-compatible variable name"""
-        # Remove brackets and quotes
-        cleaned = tableau_name.strip('[]"\'')
-        
-        # Handle special patterns
-        if re.match(r'^\d{4}_\(copy\)_\(copy\)_\d+$', cleaned):
-            # Extract year from pattern like "2022_(copy)_(copy)_780248699807363141"
-            year_match = re.match(r'^(\d{4})_\(copy\)_\(copy\)_\d+$', cleaned)
-            if year_match:
-                year = year_match.group(1)
-                return f"value_{year}_copy"
-        
-        # Convert to snake_case
-        # Replace spaces and special chars with underscores
-        python_name = re.sub(r'[^\w\s]', '_', cleaned)
-        python_name = re.sub(r'\s+', '_', python_name)
-        python_name = python_name.lower()
-        
-        # Remove multiple underscores
-        python_name = re.sub(r'_+', '_', python_name)
-        
-        # Remove leading/trailing underscores
-        python_name = python_name.strip('_')
-        
-        # Ensure it doesn't start with a digit
-        if python_name and python_name[0].isdigit():
-            python_name = f"field_{python_name}"
-        
-        # Ensure it's not empty
-        if not python_name:
-            python_name = "unnamed_field"
+        python_name = _python_name_for(tableau_name)
         
         # Handle reserved words
         if python_name in self.reserved_names:
@@ -200,9 +170,8 @@ class FieldMapper:
             return
         
         # Check for duplicates
-        for existing_name, existing_mapping in self.mappings.items():
-            if (existing_name != mapping.tableau_field and 
-                existing_mapping.python_name == python_name):
+        for existing_name in self._python_name_index.get(python_name, ()):
+            if existing_name != mapping.tableau_field:
                 mapping.is_valid = False
                 mapping.validation_error = f"'{python_name}' already used for field '{existing_name}'"
                 return
@@ -219,6 +188,7 @@ class FieldMapper:
         old_python_name = mapping.python_name
         
         # Update the mapping
+        self._unindex_mapping(mapping)
         mapping.python_name = python_name
         mapping.display_label = display_label
         
@@ -228,9 +198,32 @@ class FieldMapper:
         # If validation failed, revert the change
         if not mapping.is_valid:
             mapping.python_name = old_python_name
-            return False
+        self._index_mapping(mapping)
         
-        return True
+        return mapping.is_valid
+    
+    def _register_mapping(self, mapping: FieldMapping) -> None:
+        """Store a mapping, keeping the python_name index in step"""
+        previous = self.mappings.get(mapping.tableau_field)
+        if previous is not None:
+            self._unindex_mapping(previous)
+        self.mappings[mapping.tableau_field] = mapping
+        self._index_mapping(mapping)
+    
+    def _index_mapping(self, mapping: FieldMapping) -> None:
+        self._python_name_index.setdefault(mapping.python_name, {})[mapping.tableau_field] = None
+    
+    def _unindex_mapping(self, mapping: FieldMapping) -> None:
+        owners = self._python_name_index.get(mapping.python_name)
+        if owners is not None:
+            owners.pop(mapping.tableau_field, None)
+            if not owners:
+                del self._python_name_index[mapping.python_name]
+    
+    def _rebuild_python_name_index(self) -> None:
+        self._python_name_index = {}
+        for mapping in self.mappings.values():
+            self._index_mapping(mapping)
     
     def get_mapping(self, tableau_field: str) -> Optional[FieldMapping]:
         """Get mapping for a specific field"""
@@ -242,36 +235,53 @@ class FieldMapper:
     
     def get_valid_mappings(self) -> List[FieldMapping]:
         """Get only valid field mappings"""
-        return [mapping for mapping in self.mappings.values() if mapping.is_valid]
+        return list(filter(_is_valid, self.mappings.values()))
     
     def get_invalid_mappings(self) -> List[FieldMapping]:
         """Get only invalid field mappings"""
-        return [mapping for mapping in self.mappings.values() if not mapping.is_valid]
+        return list(itertools.filterfalse(_is_valid, self.mappings.values()))
+    
+    def to_dataframe(self) -> pd.DataFrame:
+        """All mappings as one column per attribute, for bulk filtering and counting"""
+        columns = {name: [getattr(mapping, name) for mapping in self.mappings.values()]
+                   for name in _MAPPING_FIELDS}
+        return pd.DataFrame(columns, columns=list(_MAPPING_FIELDS))
     
     def export_mappings(self) -> str:
         """Export mappings to JSON string"""
         data = {
-            'mappings': [asdict(mapping) for mapping in self.mappings.values()],
+            'mappings': [
+                {name: getattr(mapping, name) for name in _MAPPING_FIELDS}
+                for mapping in self.mappings.values()
+            ],
             'version': '1.0'
         }
+        if _HAS_ORJSON:
+            return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode()
         return json.dumps(data, indent=2)
     
-    def import_mappings(self, json_data: str) -> bool:
-        """Import mappings from JSON string"""
+    def import_mappings(self, json_data: str, revalidate: bool = True) -> bool:
+        """Import mappings from JSON string
+        
+        Pass revalidate=False for JSON written by export_mappings to keep the
+        exported is_valid/validation_error instead of re-checking every name.
+        """
         try:
-            data = json.loads(json_data)
+            data = orjson.loads(json_data) if _HAS_ORJSON else json.loads(json_data)
             
             # Clear existing mappings
             self.mappings.clear()
+            self._python_name_index.clear()
             
             # Import mappings
             for mapping_data in data.get('mappings', []):
                 mapping = FieldMapping(**mapping_data)
-                self.mappings[mapping.tableau_field] = mapping
+                self._register_mapping(mapping)
             
             # Re-validate all mappings
-            for mapping in self.mappings.values():
-                self._validate_python_name(mapping)
+            if revalidate:
+                for mapping in self.mappings.values():
+                    self._validate_python_name(mapping)
             
             return True
             
@@ -302,6 +312,8 @@ class FieldMapper:
         valid_count = 0
         invalid_count = 0
         
+        # Mappings are mutable objects; re-derive the index once rather than trust it
+        self._rebuild_python_name_index()
         for mapping in self.mappings.values():
             self._validate_python_name(mapping)
             if mapping.is_valid:
@@ -314,17 +326,68 @@ class FieldMapper:
     def get_summary_stats(self) -> Dict[str, Any]:
         """Get summary statistics about the mappings"""
         total = len(self.mappings)
-        valid = sum(1 for m in self.mappings.values() if m.is_valid)
+        mappings = self.mappings.values()
+        # Booleans sum as 0/1, and Counter tallies in C; no per-mapping Python branching
+        valid = sum(map(_is_valid, mappings))
         invalid = total - valid
         
-        field_types = {}
-        for mapping in self.mappings.values():
-            field_types[mapping.field_type] = field_types.get(mapping.field_type, 0) + 1
+        field_types = Counter(map(_field_type, mappings))
         
         return {
             'total_fields': total,
             'valid_mappings': valid,
             'invalid_mappings': invalid,
-            'field_types': field_types,
+            'field_types': dict(field_types),
             'validation_rate': (valid / total * 100) if total > 0 else 0
-        }
\ No newline at end of file
+        }
+
+
+# Name derivation is a pure function of the Tableau name, and the same names come
+# back for every calculation, worksheet and generated file; remember the results.
+@functools.lru_cache(maxsize=4096)
+def _display_name_for(tableau_name: str) -> str:
+    """Display form of a Tableau field name"""
+    # Remove brackets and quotes
+    cleaned = tableau_name.strip('[]"\'')
+    
+    # Handle special patterns like long IDs
+    year_match = _RE_COPY_ID.match(cleaned)
+    if year_match:
+        # Extract year from pattern like "2022_(copy)_(copy)_780248699807363141"
+        return f"{year_match.group(1)} (copy) (copy)"
+    
+    # Replace underscores with spaces
+    cleaned = cleaned.replace('_', ' ')
+    
+    # Remove excessive parentheses and clean up
+    cleaned = _RE_COPY_TAG.sub(' (copy)', cleaned)
+    cleaned = _RE_WS.sub(' ', cleaned).strip()
+    
+    return cleaned
+
+
+@functools.lru_cache(maxsize=4096)
+def _python_name_for(tableau_name: str) -> str:
+    """snake_case identifier for a Tableau field name, before reserved-word handling"""
+    # Remove brackets and quotes
+    cleaned = tableau_name.strip('[]"\'')
+    
+    # Handle special patterns
+    year_match = _RE_COPY_ID.match(cleaned)
+    if year_match:
+        # Extract year from pattern like "2022_(copy)_(copy)_780248699807363141"
+        return f"value_{year_match.group(1)}_copy"
+    
+    # Convert to snake_case: each run of spaces, special chars and underscores
+    # becomes one underscore, with none left at either end
+    python_name = _RE_NON_IDENT_RUN.sub('_', cleaned).lower().strip('_')
+    
+    # Ensure it doesn't start with a digit
+    if python_name and python_name[0].isdigit():
+        python_name = f"field_{python_name}"
+    
+    # Ensure it's not empty
+    if not python_name:
+        python_name = "unnamed_field"
+    
+    return python_name
@@ -2,18 +2,88 @@
 Snowflake Data Validator - Validates calculations against source data
 """
 import os
+import re
+import json
+import time
+import hashlib
+import functools
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 import snowflake.connector
-from snowflake.sqlalchemy import URL
-from sqlalchemy import create_engine
 import logging
-from typing import Dict, List, Optional, Tuple
-from dataclasses import dataclass
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+from dataclasses import dataclass, field
+from decimal import Decimal
+from pathlib import Path
 from dotenv import load_dotenv
 
 load_dotenv()
 logger = logging.getLogger(__name__)
 
+# DESCRIBE calls are network-bound; cap how many run against the warehouse at once
+_MAX_DESCRIBE_WORKERS = 10
+
+# Smallest compare_dataframes tolerance still checked in float32
+_FLOAT32_MIN_TOLERANCE = 1e-4
+
+# Query results cached on disk between validation runs (off unless a directory is set)
+QUERY_CACHE_DIR = os.getenv('VALIDATION_CACHE_DIR')
+QUERY_CACHE_MAX_AGE = 6 * 3600  # seconds
+# Table and column lists, saved so a new validator can skip SHOW TABLES and DESCRIBE
+# (off unless a directory is set)
+SCHEMA_CACHE_DIR = os.getenv('SCHEMA_CACHE_DIR')
+SCHEMA_CACHE_MAX_AGE = 6 * 3600  # seconds
+# Common column mappings - handle both quoted and unquoted versions
+_COLUMN_MAPPINGS = {
+    '"Sales"': 'SALES',
+    '"Profit"': 'PROFIT', 
+    '"Discount"': 'DISCOUNT',
+    '"Order ID"': 'ORDER_ID',
+    '"Customer ID"': 'CUSTOMER_ID',
+    '"Segment"': 'SEGMENT',
+    '"Region"': 'REGION',
+    # Also handle without quotes
+    'Sales': 'SALES',
+    'Profit': 'PROFIT',
+    'Discount': 'DISCOUNT',
+    'Order ID': 'ORDER_ID',
+    'Customer ID': 'CUSTOMER_ID',
+    'Segment': 'SEGMENT',
+    'Region': 'REGION'
+}
+# Longest first, so a quoted name is replaced whole rather than just its inner word
+_COLUMN_NAME_RE = re.compile('|'.join(map(re.escape, sorted(_COLUMN_MAPPINGS, key=len, reverse=True))))
+
+# Results of these change from one run to the next, so they are never cached
+_NONDETERMINISTIC_SQL_RE = re.compile(
+    r'\b(?:CURRENT_\w+|LOCALTIME\w*|SYSDATE|SYSTIMESTAMP|GETDATE|RANDOM|RANDSTR|UNIFORM|UUID_STRING|SEQ[1248])\b',
+    re.IGNORECASE
+)
+
+# Quoted literals and identifiers are kept verbatim; any other whitespace run collapses to one space
+_SQL_WHITESPACE_RE = re.compile(r"""('(?:[^'\\]|\\.|'')*'|"(?:[^"]|"")*")|\s+""")
+
+# Plain or quoted, optionally database/schema qualified, table name
+_TABLE_NAME_RE = re.compile(r'^(?:(?:[A-Za-z_][\w$]*|"(?:[^"]|"")+")\.){0,2}(?:[A-Za-z_][\w$]*|"(?:[^"]|"")+")$')
+
+# Plain or quoted column name
+_COLUMN_IDENT_RE = re.compile(r'^(?:[A-Za-z_][\w$]*|"(?:[^"]|"")+")$')
+
+
+def _normalize_sql(sql: str) -> str:
+    """Collapse insignificant whitespace so equivalent SQL text shares result-cache entries"""
+    return _SQL_WHITESPACE_RE.sub(lambda m: m.group(1) or ' ', sql).strip()
+
+
+def _check_table_name(table_name: str) -> str:
+    """Reject table names that would splice arbitrary SQL into a query"""
+    if not _TABLE_NAME_RE.match(table_name):
+        raise ValueError(f"Invalid table name: {table_name!r}")
+    return table_name
+
 
 @dataclass
 class ValidationResult:
@@ -26,16 +96,76 @@ class ValidationResult:
     error_message: Optional[str] = None
     
 
+@dataclass(frozen=True)
+class MetricQuery:
+    """One query of a MetricQueryPlan
+    
+    Each (metric name, expected value, tolerance) check is compared against
+    one column of the first row, or, for grouped queries, against the rows of
+    its grouping set.
+    """
+    sql: str
+    checks: Tuple[Tuple[str, any, float], ...]
+    group_columns: Optional[Tuple[Tuple[str, ...], ...]] = None  # GROUP BY columns of each check
+    fallback: Tuple['MetricQuery', ...] = ()  # One query per metric, if this fused query fails
+
+
+@dataclass(frozen=True)
+class MetricQueryPlan:
+    """Metric queries resolved against one validator's schema"""
+    metric_names: Tuple[str, ...]
+    queries: Tuple[MetricQuery, ...]
+    
+    def __len__(self) -> int:
+        return len(self.metric_names)
+
+
+@dataclass(slots=True, frozen=True)
+class Metric:
+    """A metric to check against Snowflake
+    
+    Grouped metrics compare each group against expected_values, a
+    {group value (tuple for several columns): expected} mapping.
+    """
+    formula: str
+    table: str = ''
+    filters: Tuple[str, ...] = ()
+    group_by: Tuple[str, ...] = ()
+    expected_value: any = None
+    expected_values: Optional[Dict] = field(default=None, hash=False)
+    tolerance: float = 0.01
+    
+    @classmethod
+    def from_dict(cls, metric_info: Dict) -> 'Metric':
+        """Metric from a plain {'formula': ..., 'table': ..., ...} definition"""
+        return cls(
+            formula=metric_info.get('formula', ''),
+            table=metric_info.get('table', ''),
+            filters=tuple(metric_info.get('filters', ())),
+            group_by=tuple(metric_info.get('group_by', ())),
+            expected_value=metric_info.get('expected_value'),
+            expected_values=metric_info.get('expected_values'),
+            tolerance=metric_info.get('tolerance', 0.01)
+        )
+
+
 class SnowflakeValidator:
     """Validates data and calculations against Snowflake source"""
     
-    def __init__(self):
+    def __init__(self,
+                 cache_dir: Optional[str] = None,
+                 cache_max_age: float = QUERY_CACHE_MAX_AGE,
+                 refresh_schema: bool = False):
         self.connection = None
-        self.engine = None
         self.available_tables = []
         self.table_columns = {}
+        self.table_columns_ci = {}  # table -> {upper-cased column: column}
+        self._resolved_metrics = {}  # Metric -> _resolve_metric result for the current schema
+        cache_dir = cache_dir or QUERY_CACHE_DIR
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.cache_max_age = cache_max_age
         self._connect()
-        self._discover_schema()
+        self._discover_schema(refresh=refresh_schema)
         
     def _connect(self):
         """Establish connection to Snowflake"""
@@ -48,30 +178,27 @@ class SnowflakeValidator:
                 warehouse=os.getenv('SNOWFLAKE_WAREHOUSE'),
                 database=os.getenv('SNOWFLAKE_DATABASE'),
                 schema=os.getenv('SNOWFLAKE_SCHEMA'),
-                role=os.getenv('SNOWFLAKE_ROLE')
+                role=os.getenv('SNOWFLAKE_ROLE'),
+                # Fix the session up front; every validation query shares this one session
+                autocommit=True,
+                session_parameters={'QUERY_TAG': 'tableau_to_app_validation'}
             )
             
-            # Create SQLAlchemy engine for pandas integration
-            self.engine = create_engine(URL(
-                account=os.getenv('SNOWFLAKE_ACCOUNT'),
-                user=os.getenv('SNOWFLAKE_USER'),
-                password=os.getenv('SNOWFLAKE_PASSWORD'),
-                warehouse=os.getenv('SNOWFLAKE_WAREHOUSE'),
-                database=os.getenv('SNOWFLAKE_DATABASE'),
-                schema=os.getenv('SNOWFLAKE_SCHEMA'),
-                role=os.getenv('SNOWFLAKE_ROLE')
-            ))
-            
             logger.info("Successfully connected to Snowflake")
             
         except Exception as e:
             logger.error(f"Failed to connect to Snowflake: {str(e)}")
             raise
     
-    def _discover_schema(self):
+    def _discover_schema(self, refresh: bool = False):
         """Discover available tables and columns"""
         if not self.connection:
             return
+        self._resolved_metrics.clear()
+        
+        schema_file = self._schema_cache_file()
+        if not refresh and self._load_cached_schema(schema_file):
+            return
             
         try:
             cursor = self.connection.cursor()
@@ -81,13 +208,15 @@ class SnowflakeValidator:
             tables = cursor.fetchall()
             self.available_tables = [table[1] for table in tables]  # table name is in second column
             
-            # Get columns for each table
-            for table in self.available_tables:
-                cursor.execute(f"DESCRIBE TABLE {table}")
-                columns = cursor.fetchall()
-                self.table_columns[table] = [col[0] for col in columns]  # column name is first
+            # Get columns for each table; the DESCRIBE round trips overlap
+            if self.available_tables:
+                workers = min(len(self.available_tables), _MAX_DESCRIBE_WORKERS)
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    described = pool.map(self._describe_table, self.available_tables)
+                    self._set_table_columns(dict(zip(self.available_tables, described)))
             
             logger.info(f"Discovered {len(self.available_tables)} tables: {self.available_tables}")
+            self._save_schema(schema_file)
             
         except Exception as e:
             logger.warning(f"Schema discovery failed: {e}")
@@ -98,94 +227,466 @@ class SnowflakeValidator:
             if 'cursor' in locals():
                 cursor.close()
     
-    def get_source_data(self, table_name: str, limit: Optional[int] = None) -> pd.DataFrame:
+    def _set_table_columns(self, table_columns: Dict[str, List[str]]):
+        """Record each table's columns along with their case-folded lookup"""
+        self.table_columns = table_columns
+        self._resolved_metrics.clear()
+        self.table_columns_ci = {
+            table: {col.upper(): col for col in reversed(columns)}  # first spelling wins
+            for table, columns in table_columns.items()
+        }
+    
+    def _describe_table(self, table: str) -> List[str]:
+        """Column names of one table, read on a cursor of its own"""
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(f"DESCRIBE TABLE {table}")
+            return [col[0] for col in cursor.fetchall()]  # column name is first
+        finally:
+            cursor.close()
+    
+    @staticmethod
+    def _schema_cache_file() -> Optional[Path]:
+        """Schema snapshot location for the configured account, database, schema and role
+        
+        None when schema caching is off.
+        """
+        if not SCHEMA_CACHE_DIR:
+            return None
+        scope = repr((os.getenv('SNOWFLAKE_ACCOUNT'), os.getenv('SNOWFLAKE_DATABASE'),
+                      os.getenv('SNOWFLAKE_SCHEMA'), os.getenv('SNOWFLAKE_ROLE'))).encode()
+        return Path(SCHEMA_CACHE_DIR) / f"schema_{hashlib.sha256(scope).hexdigest()[:16]}.json"
+    
+    def _load_cached_schema(self, schema_file: Optional[Path]) -> bool:
+        """Take tables and columns from a recent snapshot; False if there isn't one"""
+        if schema_file is None:
+            return False
+        try:
+            if time.time() - schema_file.stat().st_mtime >= SCHEMA_CACHE_MAX_AGE:
+                return False
+            with open(schema_file) as f:
+                cached = json.load(f)
+            self.available_tables = cached['tables']
+            self._set_table_columns(cached['columns'])
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            logger.warning(f"Could not read cached schema, discovering it again: {e}")
+            return False
+        
+        logger.info(f"Loaded {len(self.available_tables)} tables from cached schema {schema_file}")
+        return True
+    
+    def _save_schema(self, schema_file: Optional[Path]):
+        """Snapshot the discovered tables and columns for later validators"""
+        if schema_file is None:
+            return
+        try:
+            schema_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(schema_file, 'w') as f:
+                json.dump({'tables': self.available_tables, 'columns': self.table_columns}, f)
+        except Exception as e:
+            logger.warning(f"Could not cache schema: {e}")
+    
+    def get_source_data(self,
+                        table_name: str,
+                        limit: Optional[int] = None,
+                        bypass_cache: bool = False) -> pd.DataFrame:
         """Retrieve source data from Snowflake"""
-        query = f"SELECT * FROM {table_name}"
+        query = f"SELECT * FROM {_check_table_name(table_name)}"
         if limit:
-            query += f" LIMIT {limit}"
+            query += f" LIMIT {int(limit)}"
         
         logger.info(f"Executing query: {query}")
-        return pd.read_sql(query, self.engine)
+        return self._read_sql(query, bypass_cache)
+    
+    def stream_source_data(self,
+                           table_name: str,
+                           batch_size: int = 100_000) -> Iterator[pa.RecordBatch]:
+        """Yield a table's rows as Arrow record batches of at most batch_size rows
+        
+        Unlike get_source_data, the table is never materialized as one
+        DataFrame, so callers can aggregate tables larger than memory.
+        Results bypass the on-disk cache.
+        """
+        query = f"SELECT * FROM {_check_table_name(table_name)}"
+        logger.info(f"Streaming query: {query}")
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(query)
+            for table in cursor.fetch_arrow_batches():
+                yield from table.to_batches(max_chunksize=batch_size)
+        finally:
+            cursor.close()
     
     def validate_calculation(self, 
                            calculation_sql: str,
                            expected_value: any,
-                           tolerance: float = 0.01) -> ValidationResult:
+                           tolerance: float = 0.01,
+                           bypass_cache: bool = False) -> ValidationResult:
         """Validate a single calculation against Snowflake"""
+        query = MetricQuery(_normalize_sql(calculation_sql), ((calculation_sql, expected_value, tolerance),))
+        return self._validate_query(query, bypass_cache)[0]
+    
+    def _query(self, sql: str, query_id: Optional[str] = None) -> pd.DataFrame:
+        """Run (or collect) a query on its own cursor, decoding the result from Arrow batches"""
+        cursor = self.connection.cursor()
         try:
-            # Execute calculation
-            result = pd.read_sql(calculation_sql, self.engine)
-            
+            if query_id is None:
+                cursor.execute(sql)
+            else:
+                cursor.get_results_from_sfqid(query_id)
+            return cursor.fetch_pandas_all()
+        finally:
+            cursor.close()
+    
+    def _first_row(self,
+                   sql: str,
+                   bypass_cache: bool = False,
+                   query_id: Optional[str] = None) -> Optional[Tuple]:
+        """First row of a query result, or None if it returned no rows
+        
+        query_id collects a query already started with _submit_async instead of
+        running it again.
+        """
+        cached = self._cache_file(sql, bypass_cache)
+        if cached is None:
+            # Metric checks only read one row; skip building a DataFrame for it
+            cursor = self.connection.cursor()
+            try:
+                if query_id is None:
+                    cursor.execute(sql)
+                else:
+                    cursor.get_results_from_sfqid(query_id)
+                return cursor.fetchone()
+            finally:
+                cursor.close()
+        
+        result = self._read_cached(sql, cached)
+        if result.empty:
+            return None
+        return tuple(result.iat[0, i] for i in range(result.shape[1]))
+    
+    def _read_sql(self,
+                  sql: str,
+                  bypass_cache: bool = False,
+                  query_id: Optional[str] = None) -> pd.DataFrame:
+        """Run a query, answering from the on-disk result cache when it holds a fresh copy"""
+        cached = self._cache_file(sql, bypass_cache)
+        if cached is None:
+            return self._query(sql, query_id)
+        return self._read_cached(sql, cached)
+    
+    def _cache_file(self, sql: str, bypass_cache: bool) -> Optional[Path]:
+        """Where a query's result is cached, or None if it shouldn't be"""
+        if self.cache_dir is None or bypass_cache or _NONDETERMINISTIC_SQL_RE.search(sql):
+            return None
+        
+        # The same SQL means different data in another account, database or schema
+        cache_key = repr((sql, os.getenv('SNOWFLAKE_ACCOUNT'), os.getenv('SNOWFLAKE_DATABASE'),
+                          os.getenv('SNOWFLAKE_SCHEMA'))).encode()
+        return self.cache_dir / f"{hashlib.sha256(cache_key).hexdigest()[:16]}.parquet"
+    
+    def _read_cached(self, sql: str, cached: Path) -> pd.DataFrame:
+        """Cached result if still fresh, otherwise run the query and cache it"""
+        try:
+            if time.time() - cached.stat().st_mtime < self.cache_max_age:
+                return pd.read_parquet(cached)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Could not read cached query result, re-running query: {e}")
+        
+        result = self._query(sql)
+        self._write_cache(result, cached)
+        return result
+    
+    def _write_cache(self, result: pd.DataFrame, cached: Path):
+        """Store a query result for later runs"""
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            # Write aside and rename so concurrent readers never see a partial file
+            partial = cached.with_name(f"{cached.stem}.{os.getpid()}.{threading.get_ident()}.tmp")
+            result.to_parquet(partial, index=False)
+            os.replace(partial, cached)
+        except Exception as e:
+            # The cache is only an optimization; a failed write just means a live query next time
+            logger.warning(f"Could not cache query result: {e}")
+    
+    def clear_cache(self):
+        """Delete every cached query result"""
+        if self.cache_dir is None:
+            return
+        for cached in self.cache_dir.glob('*.parquet'):
+            cached.unlink(missing_ok=True)
+    
+    def _validate_query(self,
+                        query: MetricQuery,
+                        bypass_cache: bool = False,
+                        query_id: Optional[str] = None) -> List[ValidationResult]:
+        """Run one metric query and compare its result to the query's checks"""
+        try:
+            return self._run_query(query, bypass_cache, query_id)
+        except Exception as e:
+            if query.fallback:
+                # One bad formula fails the whole fused query; isolate it
+                logger.warning(f"Batched metric query failed, validating metrics one by one: {e}")
+                return [result
+                        for single in query.fallback
+                        for result in self._validate_query(single, bypass_cache)]
+            return [
+                ValidationResult(
+                    is_valid=False,
+                    metric_name=name,
+                    expected_value=expected_value,
+                    actual_value=None,
+                    error_message=str(e)
+                )
+                for name, expected_value, _ in query.checks
+            ]
+    
+    def _run_query(self,
+                   query: MetricQuery,
+                   bypass_cache: bool = False,
+                   query_id: Optional[str] = None) -> List[ValidationResult]:
+        """_validate_query without the error handling"""
+        # Execute calculation
+        if query.group_columns is None:
+            result = self._first_row(query.sql, bypass_cache, query_id)
+        else:
+            result = self._read_sql(query.sql, bypass_cache, query_id)
             if result.empty:
-                return ValidationResult(
+                result = None
+        
+        if result is None:
+            return [
+                ValidationResult(
                     is_valid=False,
-                    metric_name=calculation_sql,
+                    metric_name=name,
                     expected_value=expected_value,
                     actual_value=None,
                     error_message="Query returned no results"
                 )
+                for name, expected_value, _ in query.checks
+            ]
+        
+        if query.group_columns is not None:
+            return [
+                self._compare_groups(name, expected_value, self._group_values(result, query, i), tolerance)
+                for i, (name, expected_value, tolerance) in enumerate(query.checks)
+            ]
+        
+        return [
+            self._compare_value(name, expected_value, _python_value(value), tolerance)
+            for value, (name, expected_value, tolerance) in zip(result, query.checks)
+        ]
+    
+    @staticmethod
+    def _group_values(result: pd.DataFrame, query: MetricQuery, index: int) -> Dict[any, any]:
+        """{group: value} for one check of a grouped query"""
+        # Grouped queries select the group columns, GROUPING() flags when several
+        # grouping sets are fused, and the metric value last
+        columns = list(dict.fromkeys(column for group in query.group_columns for column in group))
+        own = query.group_columns[index]
+        rows = result
+        if len(query.group_columns) > 1:
+            # GROUPING(column) is 0 on rows grouped by that column
+            flags = result.iloc[:, len(columns):2 * len(columns)].to_numpy()
+            wanted = np.array([0 if column in own else 1 for column in columns])
+            rows = result[(flags == wanted).all(axis=1)]
+        
+        values = map(_python_value, rows.iloc[:, -1])
+        if len(own) == 1:
+            keys = map(_group_key, rows.iloc[:, columns.index(own[0])])
+        else:
+            key_frame = rows.iloc[:, [columns.index(column) for column in own]]
+            keys = (tuple(map(_group_key, key)) for key in key_frame.itertuples(index=False, name=None))
+        return dict(zip(keys, values))
+    
+    def _compare_groups(self,
+                        name: str,
+                        expected_value: any,
+                        actual_values: Dict[any, any],
+                        tolerance: float) -> ValidationResult:
+        """Compare per-group values against a {group: expected} mapping"""
+        if not isinstance(expected_value, dict):
+            # No per-group expectations; compare the lowest group like a scalar metric.
+            # GROUP BY rows come back in no particular order, so pick it by key.
+            group = min(actual_values, key=_group_sort_key)
+            return self._compare_value(name, expected_value, actual_values[group], tolerance)
+        
+        failures = []
+        difference = 0.0
+        for group, expected in expected_value.items():
+            if group not in actual_values:
+                failures.append(f"{group}: missing")
+                continue
+            result = self._compare_value(name, expected, actual_values[group], tolerance)
+            if result.difference is not None:
+                difference = max(difference, result.difference)
+            if not result.is_valid:
+                failures.append(f"{group}: expected {expected}, got {actual_values[group]}")
+        
+        return ValidationResult(
+            is_valid=not failures,
+            metric_name=name,
+            expected_value=expected_value,
+            actual_value=actual_values,
+            difference=difference,
+            error_message='; '.join(failures) or None
+        )
+    
+    def _compare_value(self,
+                       name: str,
+                       expected_value: any,
+                       actual_value: any,
+                       tolerance: float) -> ValidationResult:
+        """Compare one queried value against its expected value"""
+        if isinstance(expected_value, (int, float)) and isinstance(actual_value, (int, float)):
+            difference = abs(actual_value - expected_value)
+            relative_diff = difference / max(abs(expected_value), 1e-10)
+            is_valid = relative_diff <= tolerance
             
-            actual_value = result.iloc[0, 0]
-            
-            # Compare values
-            if isinstance(expected_value, (int, float)) and isinstance(actual_value, (int, float)):
-                difference = abs(actual_value - expected_value)
-                relative_diff = difference / max(abs(expected_value), 1e-10)
-                is_valid = relative_diff <= tolerance
-                
-                return ValidationResult(
-                    is_valid=is_valid,
-                    metric_name=calculation_sql,
-                    expected_value=expected_value,
-                    actual_value=actual_value,
-                    difference=difference
-                )
-            else:
-                # String or other comparison
-                is_valid = str(actual_value) == str(expected_value)
-                return ValidationResult(
-                    is_valid=is_valid,
-                    metric_name=calculation_sql,
-                    expected_value=expected_value,
-                    actual_value=actual_value
-                )
-                
-        except Exception as e:
             return ValidationResult(
-                is_valid=False,
-                metric_name=calculation_sql,
+                is_valid=is_valid,
+                metric_name=name,
+                expected_value=expected_value,
+                actual_value=actual_value,
+                difference=difference
+            )
+        else:
+            # String or other comparison
+            is_valid = str(actual_value) == str(expected_value)
+            return ValidationResult(
+                is_valid=is_valid,
+                metric_name=name,
                 expected_value=expected_value,
-                actual_value=None,
-                error_message=str(e)
+                actual_value=actual_value
             )
     
-    def validate_tableau_metrics(self, metrics: Dict[str, Dict]) -> List[ValidationResult]:
-        """Validate multiple Tableau metrics against Snowflake"""
+    def validate_tableau_metrics(self,
+                                 metrics: Union[Dict[str, Union[Metric, Dict]], MetricQueryPlan]) -> List[ValidationResult]:
+        """Validate multiple Tableau metrics against Snowflake
+        
+        Accepts metric definitions or a plan from plan_metric_queries, which
+        repeat runs can reuse to skip building the SQL again.
+        """
         results = []
+        if not metrics:
+            return results
         
-        for metric_name, metric_info in metrics.items():
-            # Build SQL query from metric definition
-            sql = self._build_metric_sql(metric_info)
-            
-            # Validate
-            result = self.validate_calculation(
-                sql,
-                metric_info.get('expected_value'),
-                metric_info.get('tolerance', 0.01)
-            )
-            result.metric_name = metric_name
+        plan = metrics if isinstance(metrics, MetricQueryPlan) else self.plan_metric_queries(metrics)
+        
+        # Submit every live query before waiting on any of them; the warehouse runs
+        # them concurrently and collecting only waits on the slowest
+        query_ids = [self._submit_async(query.sql) for query in plan.queries]
+        
+        by_name = {}
+        for query, query_id in zip(plan.queries, query_ids):
+            by_name.update((result.metric_name, result)
+                           for result in self._validate_query(query, query_id=query_id))
+        
+        # Report in the order the metrics were given
+        for metric_name in plan.metric_names:
+            result = by_name[metric_name]
             results.append(result)
             
             logger.info(f"Validated {metric_name}: {'PASS' if result.is_valid else 'FAIL'}")
         
         return results
     
-    def _build_metric_sql(self, metric_info: Dict) -> str:
+    def _submit_async(self, sql: str) -> Optional[str]:
+        """Start a query without waiting for it; None if it won't run asynchronously"""
+        if self._cache_file(sql, False) is not None:
+            return None
+        
+        cursor = self.connection.cursor()
+        try:
+            return cursor.execute_async(sql)['queryId']
+        except Exception as e:
+            # Running it synchronously later reports the error against its metrics
+            logger.warning(f"Could not submit query asynchronously: {e}")
+            return None
+        finally:
+            cursor.close()
+    
+    def plan_metric_queries(self, metrics: Dict[str, Union[Metric, Dict]]) -> MetricQueryPlan:
+        """Resolve metric definitions against this validator's schema into queries
+        
+        Scalar metrics over the same table and filters share one SELECT, and
+        grouped metrics over the same table, filters and formula share one
+        GROUPING SETS query.
+        """
+        queries = []
+        scalar_groups = {}
+        grouped = {}
+        
+        for metric_name, metric in metrics.items():
+            if not isinstance(metric, Metric):
+                metric = Metric.from_dict(metric)
+            formula, table, filters, group_by = self._resolve_metric(metric)
+            if group_by:
+                expected = metric.expected_value if metric.expected_values is None else metric.expected_values
+                grouped.setdefault((table, tuple(filters), formula), []).append(
+                    (tuple(group_by), (metric_name, expected, metric.tolerance))
+                )
+            else:
+                check = (metric_name, metric.expected_value, metric.tolerance)
+                scalar_groups.setdefault((table, tuple(filters)), []).append((formula, check))
+        
+        for (table, filters), group in scalar_groups.items():
+            filters = list(filters)
+            singles = tuple(MetricQuery(self._assemble_sql([formula], table, filters, []), (check,))
+                            for formula, check in group)
+            if len(singles) == 1:
+                queries.append(singles[0])
+                continue
+            selects = [f"{formula} AS METRIC_{i}" for i, (formula, _) in enumerate(group)]
+            queries.append(MetricQuery(self._assemble_sql(selects, table, filters, []),
+                                       tuple(check for _, check in group),
+                                       fallback=singles))
+        
+        for (table, filters, formula), group in grouped.items():
+            filters = list(filters)
+            singles = tuple(
+                MetricQuery(self._assemble_sql([*columns, formula], table, filters, list(columns)),
+                            (check,), group_columns=(columns,))
+                for columns, check in group
+            )
+            if len(singles) == 1:
+                queries.append(singles[0])
+                continue
+            # One scan for every grouping; GROUPING() tells the sets' rows apart
+            columns = list(dict.fromkeys(column for group_columns, _ in group for column in group_columns))
+            flags = [f"GROUPING({column}) AS GROUPING_{i}" for i, column in enumerate(columns)]
+            sets = ', '.join(f"({', '.join(group_columns)})" for group_columns, _ in group)
+            sql = self._assemble_sql([*columns, *flags, f"{formula} AS METRIC_VALUE"], table, filters,
+                                     [f"GROUPING SETS ({sets})"])
+            queries.append(MetricQuery(sql,
+                                       tuple(check for _, check in group),
+                                       group_columns=tuple(group_columns for group_columns, _ in group),
+                                       fallback=singles))
+        
+        return MetricQueryPlan(tuple(metrics), tuple(queries))
+    
+    def _build_metric_sql(self, metric: Union[Metric, Dict]) -> str:
         """Build SQL query from metric definition with dynamic table/column mapping"""
-        formula = metric_info.get('formula', '')
-        table = metric_info.get('table', '')
-        filters = metric_info.get('filters', [])
-        group_by = metric_info.get('group_by', [])
+        if not isinstance(metric, Metric):
+            metric = Metric.from_dict(metric)
+        formula, table, filters, group_by = self._resolve_metric(metric)
+        return self._assemble_sql([formula], table, filters, group_by)
+    
+    def _resolve_metric(self, metric: Metric) -> Tuple[str, str, Tuple[str, ...], Tuple[str, ...]]:
+        """(formula, table, filters, group by) of a metric, mapped to the actual schema"""
+        # Metrics are frozen, so each definition is resolved once per discovered schema
+        resolved = self._resolved_metrics.get(metric)
+        if resolved is None:
+            resolved = self._resolved_metrics[metric] = self._resolve_metric_uncached(metric)
+        return resolved
+    
+    def _resolve_metric_uncached(self, metric: Metric) -> Tuple[str, str, Tuple[str, ...], Tuple[str, ...]]:
+        """_resolve_metric without the memoization"""
+        formula, table, filters, group_by = metric.formula, metric.table, metric.filters, metric.group_by
         
         # Auto-detect table if not specified or doesn't exist
         if not table or table not in self.available_tables:
@@ -193,23 +694,28 @@ class SnowflakeValidator:
         
         # Map column names to actual schema
         formula = self._map_column_names(formula, table)
-        mapped_filters = [self._map_column_names(f, table) for f in filters]
-        mapped_group_by = [self._map_column_names(gb, table) for gb in group_by]
+        mapped_filters = tuple(self._map_column_names(f, table) for f in filters)
+        mapped_group_by = tuple(self._map_column_names(gb, table) for gb in group_by)
         
+        return formula, table, mapped_filters, mapped_group_by
+    
+    @staticmethod
+    def _assemble_sql(selects: Sequence[str], table: str, filters: Sequence[str], group_by: Sequence[str]) -> str:
+        """SELECT statement over one table"""
         # Start building query
-        sql = f"SELECT {formula}"
+        sql = f"SELECT {', '.join(selects)}"
         
         if table:
             sql += f" FROM {table}"
         
-        if mapped_filters:
-            where_clause = " AND ".join(mapped_filters)
+        if filters:
+            where_clause = " AND ".join(filters)
             sql += f" WHERE {where_clause}"
         
-        if mapped_group_by:
-            sql += f" GROUP BY {', '.join(mapped_group_by)}"
+        if group_by:
+            sql += f" GROUP BY {', '.join(group_by)}"
         
-        return sql
+        return _normalize_sql(sql)
     
     def _find_best_table(self) -> str:
         """Find the most likely table containing sales data"""
@@ -228,45 +734,16 @@ class SnowflakeValidator:
         if table not in self.table_columns:
             return expression
         
-        available_columns = self.table_columns[table]
-        
-        # Common column mappings - handle both quoted and unquoted versions
-        column_mappings = {
-            '"Sales"': 'SALES',
-            '"Profit"': 'PROFIT', 
-            '"Discount"': 'DISCOUNT',
-            '"Order ID"': 'ORDER_ID',
-            '"Customer ID"': 'CUSTOMER_ID',
-            '"Segment"': 'SEGMENT',
-            '"Region"': 'REGION',
-            # Also handle without quotes
-            'Sales': 'SALES',
-            'Profit': 'PROFIT',
-            'Discount': 'DISCOUNT',
-            'Order ID': 'ORDER_ID',
-            'Customer ID': 'CUSTOMER_ID',
-            'Segment': 'SEGMENT',
-            'Region': 'REGION'
-        }
-        
-        # Replace column names in expression
-        result = expression
-        for old_col, new_col in column_mappings.items():
-            if old_col in result and new_col:
-                result = result.replace(old_col, new_col)
-        
-        return result
+        return _map_known_columns(expression)
     
-    def _find_column(self, available_columns: List[str], candidates: List[str]) -> Optional[str]:
+    def _find_column(self, table: str, candidates: List[str]) -> Optional[str]:
         """Find the best matching column name"""
+        columns = self.table_columns_ci.get(table, {})
         for candidate in candidates:
-            # Exact match
-            if candidate in available_columns:
-                return candidate
-            # Case-insensitive match
-            for col in available_columns:
-                if col.upper() == candidate.upper():
-                    return col
+            # Case-insensitive match; Snowflake folds unquoted names to upper case
+            col = columns.get(candidate.upper())
+            if col is not None:
+                return col
         return None
     
     def compare_dataframes(self, 
@@ -284,123 +761,205 @@ class SnowflakeValidator:
             differences.append(f"Missing columns: {missing_cols}")
             return False, differences
         
-        # Merge on key columns
-        merged = pd.merge(
-            tableau_df[key_columns + value_columns],
-            generated_df[key_columns + value_columns],
-            on=key_columns,
-            suffixes=('_expected', '_actual'),
-            how='outer',
-            indicator=True
-        )
+        aligned = self._align_rows(tableau_df, generated_df, key_columns)
+        if aligned is not None:
+            # Unique keys: gather matching rows directly instead of building the wide outer merge
+            left, right = aligned
+            missing_count = len(tableau_df) - len(left)
+            extra_count = len(generated_df) - len(right)
+            compared = [col for col in value_columns if col not in key_columns]
+            expected_values = tableau_df[compared].iloc[left].reset_index(drop=True)
+            actual_values = generated_df[compared].iloc[right].reset_index(drop=True)
+            # Classify columns as the outer merge would: extra rows upcast numpy integer columns to float
+            upcast = 'fiu' if extra_count else 'f'
+            numeric = [col for col, dtype in expected_values.dtypes.items()
+                       if dtype.kind in upcast and (dtype.kind == 'f' or isinstance(dtype, np.dtype))]
+        else:
+            # Merge on key columns
+            merged = pd.merge(
+                tableau_df[key_columns + value_columns],
+                generated_df[key_columns + value_columns],
+                on=key_columns,
+                suffixes=('_expected', '_actual'),
+                how='outer',
+                indicator=True
+            )
+            missing_count = int((merged['_merge'] == 'left_only').sum())
+            extra_count = int((merged['_merge'] == 'right_only').sum())
+            
+            both = merged[merged['_merge'] == 'both']
+            compared = [col for col in value_columns
+                        if f"{col}_expected" in both.columns and f"{col}_actual" in both.columns]
+            expected_values = both[[f"{col}_expected" for col in compared]].set_axis(compared, axis=1)
+            actual_values = both[[f"{col}_actual" for col in compared]].set_axis(compared, axis=1)
+            numeric = [col for col, dtype in expected_values.dtypes.items() if dtype.kind == 'f']
         
         # Check for missing rows
-        missing_in_generated = merged[merged['_merge'] == 'left_only']
-        missing_in_tableau = merged[merged['_merge'] == 'right_only']
+        if missing_count:
+            differences.append(f"Missing {missing_count} rows in generated data")
         
-        if not missing_in_generated.empty:
-            differences.append(f"Missing {len(missing_in_generated)} rows in generated data")
+        if extra_count:
+            differences.append(f"Extra {extra_count} rows in generated data")
         
-        if not missing_in_tableau.empty:
-            differences.append(f"Extra {len(missing_in_tableau)} rows in generated data")
+        # Numeric comparison: every float column in one 2-D pass
+        exceeded = {}
+        if numeric:
+            # float32 resolves relative differences far below any looser tolerance at half the memory traffic
+            dtype = 'float32' if tolerance >= _FLOAT32_MIN_TOLERANCE else 'float64'
+            expected = expected_values[numeric].to_numpy(dtype=dtype, na_value=np.nan)
+            actual = actual_values[numeric].to_numpy(dtype=dtype, na_value=np.nan)
+            rel_diff = np.abs(expected - actual) / np.maximum(np.abs(expected), 1e-10)
+            exceeded = dict(zip(numeric, (rel_diff > tolerance).sum(axis=0).tolist()))
         
-        # Compare values
-        both = merged[merged['_merge'] == 'both']
+        for col in compared:
+            if col in exceeded:
+                if exceeded[col]:
+                    differences.append(
+                        f"Column {col}: {exceeded[col]} rows exceed tolerance of {tolerance}"
+                    )
+            else:
+                # Exact comparison
+                mismatched = int((expected_values[col] != actual_values[col]).sum())
+                if mismatched:
+                    differences.append(
+                        f"Column {col}: {mismatched} rows have different values"
+                    )
         
-        for col in value_columns:
-            expected_col = f"{col}_expected"
-            actual_col = f"{col}_actual"
-            
-            if expected_col in both.columns and actual_col in both.columns:
-                # Numeric comparison
-                if both[expected_col].dtype in ['float64', 'float32']:
-                    diff = abs(both[expected_col] - both[actual_col])
-                    rel_diff = diff / both[expected_col].abs().clip(lower=1e-10)
-                    bad_rows = both[rel_diff > tolerance]
-                    
-                    if not bad_rows.empty:
-                        differences.append(
-                            f"Column {col}: {len(bad_rows)} rows exceed tolerance of {tolerance}"
-                        )
-                else:
-                    # Exact comparison
-                    bad_rows = both[both[expected_col] != both[actual_col]]
-                    if not bad_rows.empty:
-                        differences.append(
-                            f"Column {col}: {len(bad_rows)} rows have different values"
-                        )
+        return len(differences) == 0, differences
+    
+    def compare_via_snowflake(self,
+                              tableau_table: str,
+                              generated_table: str,
+                              key_columns: List[str],
+                              value_columns: List[str],
+                              tolerance: float = 0.01) -> Tuple[bool, List[str]]:
+        """compare_dataframes for two Snowflake tables, evaluated in Snowflake
+        
+        One FULL OUTER JOIN aggregates the missing, extra and out-of-tolerance
+        row counts, so only a single row comes back instead of both tables.
+        Every value column is compared numerically.
+        """
+        if not key_columns:
+            raise ValueError("compare_via_snowflake needs at least one key column")
+        for column in [*key_columns, *value_columns]:
+            if not _COLUMN_IDENT_RE.match(column):
+                raise ValueError(f"Invalid column name: {column!r}")
+        
+        join = ' AND '.join(f"a.{key} = b.{key}" for key in key_columns)
+        first_key = key_columns[0]
+        selects = [
+            f"SUM(CASE WHEN b.{first_key} IS NULL THEN 1 ELSE 0 END) AS MISSING_ROWS",
+            f"SUM(CASE WHEN a.{first_key} IS NULL THEN 1 ELSE 0 END) AS EXTRA_ROWS",
+            *(f"SUM(CASE WHEN ABS(a.{col} - b.{col}) / GREATEST(ABS(a.{col}), 1e-10) > {float(tolerance)!r}"
+              f" THEN 1 ELSE 0 END) AS EXCEEDED_{i}"
+              for i, col in enumerate(value_columns))
+        ]
+        sql = (f"SELECT {', '.join(selects)} FROM {_check_table_name(tableau_table)} a"
+               f" FULL OUTER JOIN {_check_table_name(generated_table)} b ON {join}")
+        
+        missing_count, extra_count, *exceeded = (int(count or 0) for count in self._first_row(sql))
+        
+        differences = []
+        if missing_count:
+            differences.append(f"Missing {missing_count} rows in generated data")
+        
+        if extra_count:
+            differences.append(f"Extra {extra_count} rows in generated data")
+        
+        for col, count in zip(value_columns, exceeded):
+            if count:
+                differences.append(f"Column {col}: {count} rows exceed tolerance of {tolerance}")
         
         return len(differences) == 0, differences
     
+    @staticmethod
+    def _align_rows(tableau_df: pd.DataFrame,
+                    generated_df: pd.DataFrame,
+                    key_columns: List[str]) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Positions of the rows whose keys match on both sides, or None if the keys need a merge
+        
+        Only unique, non-null keys of matching dtypes are aligned here; anything
+        else keeps pd.merge's duplicate and null key semantics.
+        """
+        left_keys = tableau_df[key_columns]
+        right_keys = generated_df[key_columns]
+        if (list(left_keys.dtypes) != list(right_keys.dtypes)
+                or left_keys.isna().to_numpy().any() or right_keys.isna().to_numpy().any()):
+            return None
+        
+        left_index = pd.MultiIndex.from_frame(left_keys)
+        right_index = pd.MultiIndex.from_frame(right_keys)
+        if not (left_index.is_unique and right_index.is_unique):
+            return None
+        
+        positions = right_index.get_indexer(left_index)
+        left = np.flatnonzero(positions >= 0)
+        return left, positions[left]
+    
     def close(self):
         """Close Snowflake connection"""
         if self.connection:
             self.connection.close()
-        if self.engine:
-            self.engine.dispose()
+
+
+@functools.lru_cache(maxsize=256)
+def _map_known_columns(expression: str) -> str:
+    """Replace every known Tableau column name in one pass"""
+    return _COLUMN_NAME_RE.sub(lambda m: _COLUMN_MAPPINGS[m.group(0)], expression)
+
+
+def _python_value(value: any) -> any:
+    """Plain Python scalar for a value from a cursor row or a cached frame"""
+    # Scaled NUMBER columns arrive as Decimal; compare them as floats
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _group_key(value: any) -> any:
+    """Group value from a result frame, with NULL groups as None however pandas decoded them"""
+    return None if pd.isna(value) else _python_value(value)
+
+
+def _group_sort_key(group: any) -> Tuple:
+    """Sort key ordering group values of mixed types, with NULL groups last"""
+    parts = group if isinstance(group, tuple) else (group,)
+    return tuple((part is None, type(part).__name__, '' if part is None else part) for part in parts)
 
 
 class SuperstoreMetrics:
     """Pre-defined metrics for Superstore dashboard validation"""
     
     METRICS = {
-        'total_sales': {
-            'formula': 'SUM(SALES)',
-            'table': 'ORDERS',
-            'expected_value': 2297200.86,  # From Tableau
-            'tolerance': 0.01
-        },
-        'total_profit': {
-            'formula': 'SUM(PROFIT)',
-            'table': 'ORDERS',
-            'expected_value': 286397.02,  # From Tableau
-            'tolerance': 0.01
-        },
-        'profit_ratio': {
-            'formula': 'SUM(PROFIT) / SUM(SALES)',
-            'table': 'ORDERS',
-            'expected_value': 0.1246,  # From Tableau
-            'tolerance': 0.001
-        },
-        'order_count': {
-            'formula': 'COUNT(DISTINCT ORDER_ID)',
-            'table': 'ORDERS',
-            'expected_value': 5009,  # From Tableau
-            'tolerance': 0
-        },
-        'customer_count': {
-            'formula': 'COUNT(DISTINCT CUSTOMER_ID)',
-            'table': 'ORDERS',
-            'expected_value': 793,  # From Tableau
-            'tolerance': 0
-        },
-        'avg_discount': {
-            'formula': 'AVG(DISCOUNT)',
-            'table': 'ORDERS',
-            'expected_value': 0.1562,  # From Tableau
-            'tolerance': 0.001
-        },
-        'sales_by_segment': {
-            'formula': 'SUM(SALES)',
-            'table': 'ORDERS',
-            'group_by': ['SEGMENT'],
-            'expected_values': {
+        'total_sales': Metric('SUM(SALES)', 'ORDERS', expected_value=2297200.86),  # From Tableau
+        'total_profit': Metric('SUM(PROFIT)', 'ORDERS', expected_value=286397.02),  # From Tableau
+        'profit_ratio': Metric('SUM(PROFIT) / SUM(SALES)', 'ORDERS',
+                               expected_value=0.1246, tolerance=0.001),  # From Tableau
+        'order_count': Metric('COUNT(DISTINCT ORDER_ID)', 'ORDERS',
+                              expected_value=5009, tolerance=0),  # From Tableau
+        'customer_count': Metric('COUNT(DISTINCT CUSTOMER_ID)', 'ORDERS',
+                                 expected_value=793, tolerance=0),  # From Tableau
+        'avg_discount': Metric('AVG(DISCOUNT)', 'ORDERS',
+                               expected_value=0.1562, tolerance=0.001),  # From Tableau
+        'sales_by_segment': Metric(
+            'SUM(SALES)', 'ORDERS',
+            group_by=('SEGMENT',),
+            expected_values={
                 'Consumer': 1161401.73,
                 'Corporate': 706146.37,
                 'Home Office': 429652.76
-            },
-            'tolerance': 0.01
-        },
-        'sales_by_region': {
-            'formula': 'SUM(SALES)',
-            'table': 'ORDERS',
-            'group_by': ['REGION'],
-            'expected_values': {
+            }
+        ),
+        'sales_by_region': Metric(
+            'SUM(SALES)', 'ORDERS',
+            group_by=('REGION',),
+            expected_values={
                 'West': 725457.82,
                 'East': 678781.24,
                 'Central': 501239.50,
                 'South': 391721.91
-            },
-            'tolerance': 0.01
-        }
+            }
+        )
     }
\ No newline at end of file
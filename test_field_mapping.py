@@ -7,27 +7,26 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from src.utils.field_mapper import FieldMapper, FieldMapping
-from dataclasses import dataclass
 
-@dataclass
 class MockCalculation:
     """Mock calculation for testing"""
-    name: str
-    formula: str
-    calculation_type: str = "basic"
-    data_type: str = "real"
-    dependencies: list = None
+    __slots__ = ('name', 'formula', 'calculation_type', 'data_type', 'dependencies')
     
-    def __post_init__(self):
-        if self.dependencies is None:
-            self.dependencies = []
+    def __init__(self, name, formula, calculation_type="basic", data_type="real", dependencies=None):
+        self.name = name
+        self.formula = formula
+        self.calculation_type = calculation_type
+        self.data_type = data_type
+        self.dependencies = dependencies if dependencies is not None else []
 
-@dataclass
 class MockWorkbook:
     """Mock workbook structure for testing"""
-    calculations: dict
-    datasources: list
-    parameters: list
+    __slots__ = ('calculations', 'datasources', 'parameters')
+    
+    def __init__(self, calculations, datasources, parameters):
+        self.calculations = calculations
+        self.datasources = datasources
+        self.parameters = parameters
 
 def test_field_mapping():
     """Test field mapping functionality"""
@@ -0,0 +1,63 @@
+"""
+Test suite for Field Mapper
+"""
+import json
+from src.utils.field_mapper import FieldMapper
+
+
+MAPPINGS_JSON = json.dumps({
+    'mappings': [
+        {
+            'tableau_field': '[Sales]', 'display_name': 'Sales', 'python_name': 'sales',
+            'display_label': 'Sales', 'field_type': 'measure', 'data_type': 'real',
+            'is_valid': True, 'validation_error': None,
+        },
+        {
+            'tableau_field': '[Order Date]', 'display_name': 'Order Date', 'python_name': 'class',
+            'display_label': 'Order Date', 'field_type': 'dimension', 'data_type': 'date',
+            'is_valid': False, 'validation_error': "'class' is a Python keyword",
+        },
+    ],
+    'version': '1.0',
+})
+
+
+class TestFieldMapper:
+    """Test field mapper export helpers"""
+
+    def test_to_dataframe(self):
+        """Test one row per mapping and one column per FieldMapping attribute"""
+        mapper = FieldMapper()
+        assert mapper.import_mappings(MAPPINGS_JSON, revalidate=False)
+
+        df = mapper.to_dataframe()
+
+        assert df['tableau_field'].tolist() == ['[Sales]', '[Order Date]']
+        assert df['python_name'].tolist() == ['sales', 'class']
+        assert df['field_type'].tolist() == ['measure', 'dimension']
+        assert df['is_valid'].tolist() == [True, False]
+        assert df['validation_error'].isna().tolist() == [True, False]
+        assert int(df['is_valid'].sum()) == len(mapper.get_valid_mappings())
+
+    def test_import_null_types(self):
+        """Test mappings whose field_type or data_type is null still import"""
+        data = json.loads(MAPPINGS_JSON)
+        data['mappings'][0]['data_type'] = None
+        data['mappings'][1]['field_type'] = None
+        mapper = FieldMapper()
+
+        assert mapper.import_mappings(json.dumps(data), revalidate=False)
+
+        df = mapper.to_dataframe()
+        assert df['data_type'].isna().tolist() == [True, False]
+        assert df['field_type'].isna().tolist() == [False, True]
+
+    def test_to_dataframe_empty(self):
+        """Test a mapper without mappings still gives every column"""
+        df = FieldMapper().to_dataframe()
+
+        assert df.empty
+        assert list(df.columns) == [
+            'tableau_field', 'display_name', 'python_name', 'display_label',
+            'field_type', 'data_type', 'is_valid', 'validation_error',
+        ]
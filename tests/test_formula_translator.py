@@ -0,0 +1,191 @@
+"""
+Test suite for Formula Translator
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from src.translators.formula_translator import TableauFormulaTranslator, _PARALLEL_TRANSLATE_MIN
+
+
+# (Tableau formula, python, pandas, sql) translations
+TRANSLATIONS = [
+    (
+        'IF [Sales] > 100 THEN "High" ELSEIF [Sales] > 10 THEN "Medium" ELSE "Low" END',
+        "('High' if data['Sales'] > 100 else ('Medium' if data['Sales'] > 10 else 'Low'))",
+        "np.where(df['Sales'] > 100, 'High', np.where(df['Sales'] > 10, 'Medium', 'Low'))",
+        "CASE WHEN \"Sales\" > 100 THEN 'High' WHEN \"Sales\" > 10 THEN 'Medium' ELSE 'Low' END",
+    ),
+    (
+        'CASE [Region] WHEN "East" THEN 1 WHEN "West" THEN 2 ELSE 0 END',
+        "(1 if data['Region'] == 'East' else (2 if data['Region'] == 'West' else 0))",
+        "np.select([df['Region'] == 'East', df['Region'] == 'West'], [1, 2], default=0)",
+        "CASE \"Region\" WHEN 'East' THEN 1 WHEN 'West' THEN 2 ELSE 0 END",
+    ),
+    (
+        'IIF([Profit] > 0, "Gain", "Loss")',
+        "('Gain' if data['Profit'] > 0 else 'Loss')",
+        "np.where(df['Profit'] > 0, 'Gain', 'Loss')",
+        "CASE WHEN \"Profit\" > 0 THEN 'Gain' ELSE 'Loss' END",
+    ),
+    (
+        'ZN([Profit])',
+        "(data['Profit'] or 0)",
+        "df['Profit'].fillna(0)",
+        'COALESCE("Profit", 0)',
+    ),
+    (
+        'ZN(SUM([Sales]))',
+        "(sum(data['Sales']) or 0)",
+        "(df['Sales'].sum() if pd.notna(df['Sales'].sum()) else 0)",
+        'COALESCE(SUM("Sales"), 0)',
+    ),
+    (
+        'IFNULL([Discount], 0)',
+        "(data['Discount'] if data['Discount'] is not None else 0)",
+        "df['Discount'].fillna(0)",
+        'COALESCE("Discount", 0)',
+    ),
+    (
+        'IFNULL(SUM([Profit]) / SUM([Sales]), 0)',
+        "(sum(data['Profit']) / sum(data['Sales']) if sum(data['Profit']) / sum(data['Sales']) is not None else 0)",
+        "(df['Profit'].sum() / df['Sales'].sum() if pd.notna(df['Profit'].sum() / df['Sales'].sum()) else 0)",
+        'COALESCE(SUM("Profit") / SUM("Sales"), 0)',
+    ),
+    (
+        'COUNTD([Order ID])',
+        "len(set(data['Order ID']))",
+        "df['Order ID'].nunique()",
+        'COUNT(DISTINCT "Order ID")',
+    ),
+    (
+        '{FIXED [Region] : SUM([Sales])}',
+        "calculate_lod('FIXED', ['Region'], lambda data: sum(data['Sales']))",
+        "df.groupby(['Region'])['Sales'].transform('sum')",
+        'SUM("Sales") OVER (PARTITION BY "Region")',
+    ),
+    (
+        "DATEDIFF('day', [Order Date], [Ship Date])",
+        "DATEDIFF('day', data['Order Date'], data['Ship Date'])",
+        "(df['Ship Date'].dt.normalize() - df['Order Date'].dt.normalize()).dt.days",
+        "DATEDIFF('day', \"Order Date\", \"Ship Date\")",
+    ),
+    (
+        "DATEPART('month', [Order Date])",
+        "DATEPART('month', data['Order Date'])",
+        "df['Order Date'].dt.month",
+        "DATE_PART('month', \"Order Date\")",
+    ),
+    (
+        'if [Region] = "day" then LEFT([Order Day], 3) else "Mid" end',
+        "(data['Order Day'][:3] if data['Region'] == 'day' else 'Mid')",
+        "np.where(df['Region'] == 'day', df['Order Day'].str[:3], 'Mid')",
+        "CASE WHEN \"Region\" = 'day' THEN LEFT(\"Order Day\", 3) ELSE 'Mid' END",
+    ),
+    (
+        '[Sales] / [Quantity] / 2',
+        "data['Sales'] / data['Quantity'] / 2",
+        "df['Sales'] / df['Quantity'] / 2",
+        '"Sales" / "Quantity" / 2',
+    ),
+    (
+        '[Sales] / ([Quantity] / 2)',
+        "data['Sales'] / (data['Quantity'] / 2)",
+        "df['Sales'] / (df['Quantity'] / 2)",
+        '"Sales" / ("Quantity" / 2)',
+    ),
+]
+
+
+@pytest.fixture(scope="module")
+def translator():
+    """One translator shared by the module's tests"""
+    return TableauFormulaTranslator()
+
+
+class TestTranslate:
+    """Test single formula translation"""
+
+    @pytest.mark.parametrize("formula, python, pandas, sql", TRANSLATIONS)
+    def test_translation(self, translator, formula, python, pandas, sql):
+        """Test the python, pandas and SQL output for one formula"""
+        result = translator.translate(formula)
+
+        assert result.python_expression == python
+        assert result.pandas_expression == pandas
+        assert result.sql_expression == sql
+
+    def test_zn_of_aggregate_runs(self, translator):
+        """Test ZN of an aggregate evaluates, though the aggregate is a NumPy scalar"""
+        df = pd.DataFrame({'Sales': [np.nan, np.nan]})
+        namespace = {'df': df, 'pd': pd, 'np': np}
+
+        assert eval(translator.translate('ZN(AVG([Sales]))').pandas_expression, namespace) == 0
+        assert eval(translator.translate('ZN(SUM([Sales]) + 1)').pandas_expression, namespace) == 1
+
+    def test_classification(self, translator):
+        """Test dependencies and the aggregate / window flags"""
+        lod = translator.translate('{FIXED [Region] : SUM([Sales])}')
+        running = translator.translate('RUNNING_SUM(SUM([Sales]))')
+
+        assert lod.dependencies == ('Region', 'Sales')
+        assert lod.requires_aggregation and not lod.is_window_function
+        assert running.is_window_function
+
+    def test_function_case_is_ignored(self, translator):
+        """Test lower-case function names translate like upper-case ones, fields keep their case"""
+        result = translator.translate('sum([Order Day]) + Countd([Customer])')
+
+        assert result == translator.translate('SUM([Order Day]) + COUNTD([Customer])')
+        assert result.dependencies == ('Customer', 'Order Day')
+        assert result.requires_aggregation
+
+    def test_deeply_nested_formula_falls_back(self, translator):
+        """Test a formula too deep for the parser keeps field substitution only"""
+        formula = '(' * 3000 + '[Sales]' + ')' * 3000
+
+        result = translator.translate(formula)
+
+        assert result.pandas_expression == formula.replace('[Sales]', "df['Sales']")
+        assert result.sql_expression == formula.replace('[Sales]', '"Sales"')
+        assert result.dependencies == ('Sales',)
+
+
+class TestTranslateMany:
+    """Test batch formula translation"""
+
+    def test_matches_single_translation(self, translator):
+        """Test a small batch translates each formula as translate() does"""
+        formulas = ["[Sales]", "SUM([Sales])", "[Profit] / [Sales] * 100", "SUM([Sales])"]
+
+        results = translator.translate_many(formulas)
+
+        assert results == [translator.translate(formula) for formula in formulas]
+
+    def test_worker_processes_match_in_process(self, translator):
+        """Test a batch large enough for worker processes matches the in-process translation"""
+        formulas = [f"SUM([Sales]) * {i}" for i in range(_PARALLEL_TRANSLATE_MIN)] + ["[Profit] / [Sales]"]
+
+        results = translator.translate_many(formulas, workers=2)
+
+        assert results == translator.translate_many(formulas)
+
+    def test_return_exceptions_keeps_other_results(self, translator, monkeypatch):
+        """Test one failing formula doesn't hide the other results"""
+        failing = TableauFormulaTranslator()
+        translate_cleaned = failing._translate_cleaned
+
+        def fail_on_profit(formula):
+            if formula == "[Profit]":
+                raise ValueError("cannot translate")
+            return translate_cleaned(formula)
+
+        monkeypatch.setattr(failing, "_translate_cleaned", fail_on_profit)
+        formulas = ["[Sales]", "[Profit]", "SUM([Sales])"]
+
+        results = failing.translate_many(formulas, return_exceptions=True)
+
+        assert isinstance(results[1], ValueError)
+        assert results[0] == translator.translate("[Sales]")
+        assert results[2] == translator.translate("SUM([Sales])")
+        with pytest.raises(ValueError):
+            failing.translate_many(formulas)
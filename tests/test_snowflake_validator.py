@@ -0,0 +1,450 @@
+"""
+Test suite for Snowflake Validator
+"""
+import os
+import time
+import pytest
+
+pytest.importorskip("snowflake.connector")
+
+import pandas as pd
+import pyarrow as pa
+from src.validation import snowflake_validator
+from src.validation.snowflake_validator import (
+    Metric, MetricQuery, MetricQueryPlan, SnowflakeValidator, SuperstoreMetrics
+)
+
+
+class FakeCursor:
+    """Cursor that records executed SQL and replays canned results"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.sql = None
+
+    def execute(self, sql, params=None):
+        self.connection.executed.append(sql)
+        self._run(sql)
+
+    def execute_async(self, sql):
+        self.connection.submitted.append(sql)
+        return {'queryId': f"query-{len(self.connection.submitted)}"}
+
+    def get_results_from_sfqid(self, query_id):
+        self.connection.collected.append(query_id)
+        self._run(self.connection.submitted[int(query_id.rsplit('-', 1)[1]) - 1])
+
+    def _run(self, sql):
+        if sql in self.connection.failing:
+            raise RuntimeError(f"SQL compilation error in {sql}")
+        self.sql = sql
+
+    def fetchone(self):
+        return self.connection.results.get(self.sql, self.connection.row)
+
+    def fetchall(self):
+        return self.connection.results.get(self.sql, [])
+
+    def fetch_pandas_all(self):
+        return self.connection.results[self.sql]
+
+    def fetch_arrow_batches(self):
+        return iter(self.connection.arrow_tables)
+
+    def close(self):
+        self.connection.closed_cursors += 1
+
+
+class FakeConnection:
+    """Connection handing out FakeCursors over one set of canned results"""
+
+    def __init__(self, row=None, arrow_tables=(), results=None, failing=()):
+        self.row = row
+        self.arrow_tables = list(arrow_tables)
+        self.results = dict(results or {})  # SQL -> row or frame, for queries not answered by row
+        self.failing = set(failing)  # SQL that raises when run
+        self.executed = []
+        self.submitted = []  # execute_async SQL; query-<n> is the n-th
+        self.collected = []
+        self.closed_cursors = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+
+def make_validator(connection: FakeConnection) -> SnowflakeValidator:
+    """Validator on a fake connection, skipping the connect and schema discovery in __init__"""
+    validator = SnowflakeValidator.__new__(SnowflakeValidator)
+    validator.connection = connection
+    validator.cache_dir = None
+    validator.available_tables = ['ORDERS']
+    validator._resolved_metrics = {}
+    validator._set_table_columns({'ORDERS': ['SEGMENT', 'REGION', 'SALES', 'PROFIT']})
+    return validator
+
+
+class TestSchemaCache:
+    """Test reusing discovered tables and columns across validators"""
+
+    SCHEMA = {
+        'SHOW TABLES': [('2024-01-01', 'ORDERS')],
+        'DESCRIBE TABLE ORDERS': [('SALES',), ('REGION',)],
+    }
+
+    @pytest.fixture
+    def schema_cache_dir(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(snowflake_validator, 'SCHEMA_CACHE_DIR', str(tmp_path))
+        return tmp_path
+
+    @staticmethod
+    def discover(connection, refresh=False):
+        validator = make_validator(connection)
+        validator._discover_schema(refresh=refresh)
+        return validator
+
+    def test_off_unless_configured(self, monkeypatch):
+        """Test without SCHEMA_CACHE_DIR every validator discovers the schema itself"""
+        monkeypatch.setattr(snowflake_validator, 'SCHEMA_CACHE_DIR', None)
+        connection = FakeConnection(results=self.SCHEMA)
+
+        self.discover(connection)
+        self.discover(connection)
+
+        assert SnowflakeValidator._schema_cache_file() is None
+        assert connection.executed.count('SHOW TABLES') == 2
+
+    def test_hit(self, schema_cache_dir):
+        """Test a second validator takes the schema from the snapshot the first one saved"""
+        self.discover(FakeConnection(results=self.SCHEMA))
+        connection = FakeConnection()
+
+        validator = self.discover(connection)
+
+        assert connection.executed == []
+        assert validator.available_tables == ['ORDERS']
+        assert validator.table_columns == {'ORDERS': ['SALES', 'REGION']}
+        assert len(list(schema_cache_dir.glob('schema_*.json'))) == 1
+
+    def test_expired_snapshot_is_rediscovered(self, schema_cache_dir):
+        """Test a snapshot older than SCHEMA_CACHE_MAX_AGE is ignored"""
+        self.discover(FakeConnection(results=self.SCHEMA))
+        stale = time.time() - snowflake_validator.SCHEMA_CACHE_MAX_AGE - 1
+        for schema_file in schema_cache_dir.glob('schema_*.json'):
+            os.utime(schema_file, (stale, stale))
+        connection = FakeConnection(results=self.SCHEMA)
+
+        self.discover(connection)
+
+        assert connection.executed[0] == 'SHOW TABLES'
+
+    def test_refresh_invalidates_resolved_metrics(self, schema_cache_dir):
+        """Test refreshing skips the snapshot and drops metrics resolved against the old schema"""
+        self.discover(FakeConnection(results=self.SCHEMA))
+        connection = FakeConnection(results=self.SCHEMA)
+        validator = self.discover(connection)
+        validator._build_metric_sql(SuperstoreMetrics.METRICS['total_sales'])
+        assert validator._resolved_metrics
+
+        validator._discover_schema(refresh=True)
+
+        assert connection.executed[0] == 'SHOW TABLES'
+        assert validator._resolved_metrics == {}
+
+
+class TestMetricQueryPlan:
+    """Test the resolved metric query plan"""
+
+    def test_len_counts_metrics(self):
+        """Test a plan's length is its number of metrics"""
+        plan = MetricQueryPlan(
+            metric_names=('total_sales', 'total_profit'),
+            queries=(MetricQuery(sql='SELECT 1', checks=()),)
+        )
+
+        assert len(plan) == 2
+        assert plan
+
+    def test_empty_plan_is_falsy(self):
+        """Test an empty plan is falsy so validation can short-circuit"""
+        plan = MetricQueryPlan(metric_names=(), queries=())
+
+        assert len(plan) == 0
+        assert not plan
+
+    def test_grouped_metrics_share_grouping_sets_query(self):
+        """Test grouped metrics over one formula fuse into one GROUPING SETS query"""
+        plan = make_validator(FakeConnection()).plan_metric_queries({
+            'sales_by_segment': SuperstoreMetrics.METRICS['sales_by_segment'],
+            'sales_by_region': SuperstoreMetrics.METRICS['sales_by_region'],
+            'total_sales': SuperstoreMetrics.METRICS['total_sales'],
+        })
+
+        assert plan.metric_names == ('sales_by_segment', 'sales_by_region', 'total_sales')
+        assert [query.sql for query in plan.queries] == [
+            'SELECT SUM(SALES) FROM ORDERS',
+            'SELECT SEGMENT, REGION, GROUPING(SEGMENT) AS GROUPING_0, GROUPING(REGION) AS GROUPING_1, '
+            'SUM(SALES) AS METRIC_VALUE FROM ORDERS GROUP BY GROUPING SETS ((SEGMENT), (REGION))',
+        ]
+        fused = plan.queries[1]
+        assert fused.group_columns == (('SEGMENT',), ('REGION',))
+        assert [query.sql for query in fused.fallback] == [
+            'SELECT SEGMENT, SUM(SALES) FROM ORDERS GROUP BY SEGMENT',
+            'SELECT REGION, SUM(SALES) FROM ORDERS GROUP BY REGION',
+        ]
+
+
+class TestGroupedMetrics:
+    """Test splitting grouped query results back into per-metric groups"""
+
+    FUSED_SQL = ('SELECT SEGMENT, REGION, GROUPING(SEGMENT) AS GROUPING_0, GROUPING(REGION) AS GROUPING_1, '
+                 'SUM(SALES) AS METRIC_VALUE FROM ORDERS GROUP BY GROUPING SETS ((SEGMENT), (REGION))')
+
+    def test_grouping_sets_rows_go_to_their_metric(self):
+        """Test mixed grouping set rows, including a NULL group, reach the right metric"""
+        frame = pd.DataFrame({
+            'SEGMENT': ['Consumer', None, None, 'Corporate', None],
+            'REGION': [None, 'West', None, None, 'East'],
+            'GROUPING_0': [0, 1, 0, 0, 1],
+            'GROUPING_1': [1, 0, 1, 1, 0],
+            'METRIC_VALUE': [10.0, 30.0, 5.0, 20.0, 40.0],
+        })
+        connection = FakeConnection(results={self.FUSED_SQL: frame})
+        metrics = {
+            'sales_by_segment': Metric('SUM(SALES)', 'ORDERS', group_by=('SEGMENT',),
+                                       expected_values={'Consumer': 10.0, 'Corporate': 20.0, None: 5.0}),
+            'sales_by_region': Metric('SUM(SALES)', 'ORDERS', group_by=('REGION',),
+                                      expected_values={'West': 30.0, 'East': 41.0}),
+        }
+
+        by_segment, by_region = make_validator(connection).validate_tableau_metrics(metrics)
+
+        assert connection.submitted == [self.FUSED_SQL]
+        assert by_segment.is_valid
+        assert by_segment.actual_value == {'Consumer': 10.0, None: 5.0, 'Corporate': 20.0}
+        assert not by_region.is_valid
+        assert by_region.actual_value == {'West': 30.0, 'East': 40.0}
+        assert by_region.error_message == 'East: expected 41.0, got 40.0'
+
+    def test_missing_group_fails(self):
+        """Test an expected group absent from the result is reported"""
+        validator = make_validator(FakeConnection())
+
+        result = validator._compare_groups('sales_by_region', {'West': 1.0, 'South': 2.0}, {'West': 1.0}, 0.01)
+
+        assert not result.is_valid
+        assert result.error_message == 'South: missing'
+
+    @pytest.mark.parametrize("regions", [
+        ['West', 'East', None],
+        [None, 'West', 'East'],
+        ['East', None, 'West'],
+    ])
+    def test_scalar_expectation_uses_lowest_group(self, regions):
+        """Test a scalar expected value is compared to the same group whatever the row order"""
+        sql = 'SELECT REGION, SUM(SALES) FROM ORDERS GROUP BY REGION'
+        values = {'West': 50.0, 'East': 30.0, None: 10.0}
+        frame = pd.DataFrame({'REGION': regions, 'SUM(SALES)': [values[region] for region in regions]})
+        connection = FakeConnection(results={sql: frame})
+        metric = Metric('SUM(SALES)', 'ORDERS', group_by=('REGION',), expected_value=30.0)
+
+        [result] = make_validator(connection).validate_tableau_metrics({'sales_by_region': metric})
+
+        assert connection.submitted == [sql]
+        assert result.is_valid
+        assert result.actual_value == 30.0
+
+
+class TestMetric:
+    """Test the metric definition"""
+
+    def test_metric_has_no_length(self):
+        """Test a metric is always truthy and has no length"""
+        metric = SuperstoreMetrics.METRICS['total_sales']
+
+        assert metric
+        with pytest.raises(TypeError):
+            len(metric)
+
+    def test_from_dict(self):
+        """Test building a metric from a plain definition"""
+        metric = Metric.from_dict({'formula': 'SUM(SALES)', 'table': 'ORDERS', 'group_by': ['REGION']})
+
+        assert metric.formula == 'SUM(SALES)'
+        assert metric.group_by == ('REGION',)
+        assert metric.tolerance == 0.01
+
+
+class TestAsyncMetricQueries:
+    """Test submitting metric queries up front and collecting them by query id"""
+
+    SCALAR_SQL = 'SELECT SUM(SALES) AS METRIC_0, SUM(PROFIT) AS METRIC_1 FROM ORDERS'
+    GROUPED_SQL = 'SELECT REGION, SUM(SALES) FROM ORDERS GROUP BY REGION'
+    METRICS = {
+        'total_sales': Metric('SUM(SALES)', 'ORDERS', expected_value=100.0),
+        'total_profit': Metric('SUM(PROFIT)', 'ORDERS', expected_value=10.0),
+        'sales_by_region': Metric('SUM(SALES)', 'ORDERS', group_by=('REGION',), expected_values={'West': 100.0}),
+    }
+
+    def test_queries_are_submitted_then_collected(self):
+        """Test every query is submitted before any is collected, and results come from its query id"""
+        connection = FakeConnection(results={
+            self.SCALAR_SQL: (100.0, 10.0),
+            self.GROUPED_SQL: pd.DataFrame({'REGION': ['West'], 'SUM(SALES)': [100.0]}),
+        })
+
+        results = make_validator(connection).validate_tableau_metrics(self.METRICS)
+
+        assert connection.submitted == [self.SCALAR_SQL, self.GROUPED_SQL]
+        assert connection.collected == ['query-1', 'query-2']
+        assert connection.executed == []
+        assert [result.metric_name for result in results] == ['total_sales', 'total_profit', 'sales_by_region']
+        assert all(result.is_valid for result in results)
+
+    def test_cached_queries_are_not_submitted(self, tmp_path):
+        """Test queries answered by the result cache run synchronously instead"""
+        connection = FakeConnection()
+        validator = make_validator(connection)
+        validator.cache_dir = tmp_path
+
+        assert validator._submit_async(self.SCALAR_SQL) is None
+        assert connection.submitted == []
+
+    def test_failed_fused_query_falls_back_to_single_queries(self):
+        """Test a failing fused query is retried one metric at a time, isolating the bad formula"""
+        connection = FakeConnection(
+            results={'SELECT SUM(SALES) FROM ORDERS': (100.0,)},
+            failing={self.SCALAR_SQL, 'SELECT SUM(PROFIT) FROM ORDERS'},
+        )
+        metrics = {name: self.METRICS[name] for name in ('total_sales', 'total_profit')}
+
+        total_sales, total_profit = make_validator(connection).validate_tableau_metrics(metrics)
+
+        assert connection.submitted == [self.SCALAR_SQL]
+        assert connection.collected == ['query-1']
+        assert connection.executed == ['SELECT SUM(SALES) FROM ORDERS', 'SELECT SUM(PROFIT) FROM ORDERS']
+        assert total_sales.is_valid
+        assert not total_profit.is_valid
+        assert 'SQL compilation error' in total_profit.error_message
+
+
+class TestQueryCache:
+    """Test the on-disk Parquet cache of query results"""
+
+    SQL = 'SELECT * FROM ORDERS'
+
+    @pytest.fixture
+    def connection(self):
+        return FakeConnection(results={self.SQL: pd.DataFrame({'SALES': [1.5, 2.5]})})
+
+    @pytest.fixture
+    def validator(self, connection, tmp_path):
+        validator = make_validator(connection)
+        validator.cache_dir = tmp_path
+        validator.cache_max_age = 3600
+        return validator
+
+    def test_miss_then_hit(self, validator, connection, tmp_path):
+        """Test the first read runs the query and caches it, the second reads the cache"""
+        first = validator.get_source_data('ORDERS')
+        second = validator.get_source_data('ORDERS')
+
+        assert connection.executed == [self.SQL]
+        assert len(list(tmp_path.glob('*.parquet'))) == 1
+        pd.testing.assert_frame_equal(first, second)
+
+    def test_stale_entry_is_refreshed(self, validator, connection):
+        """Test a result older than cache_max_age is queried again"""
+        validator.get_source_data('ORDERS')
+        validator.cache_max_age = 0
+
+        validator.get_source_data('ORDERS')
+
+        assert connection.executed == [self.SQL, self.SQL]
+
+    def test_bypass(self, validator, connection, tmp_path):
+        """Test bypass_cache always queries and never writes the cache"""
+        validator.get_source_data('ORDERS', bypass_cache=True)
+        validator.get_source_data('ORDERS', bypass_cache=True)
+
+        assert connection.executed == [self.SQL, self.SQL]
+        assert list(tmp_path.glob('*.parquet')) == []
+
+    def test_nondeterministic_sql_is_not_cached(self, validator):
+        """Test queries whose result changes between runs get no cache file"""
+        assert validator._cache_file('SELECT CURRENT_TIMESTAMP()', False) is None
+        assert validator._cache_file(self.SQL, False) is not None
+
+
+class TestStreamSourceData:
+    """Test streaming a table as Arrow record batches"""
+
+    def test_yields_bounded_batches(self):
+        """Test every row arrives once, in batches of at most batch_size rows"""
+        tables = [pa.table({'SALES': list(range(5))}), pa.table({'SALES': list(range(5, 8))})]
+        connection = FakeConnection(arrow_tables=tables)
+
+        batches = list(make_validator(connection).stream_source_data('ORDERS', batch_size=2))
+
+        assert [batch.num_rows for batch in batches] == [2, 2, 1, 2, 1]
+        assert pa.Table.from_batches(batches).column('SALES').to_pylist() == list(range(8))
+        assert connection.executed == ['SELECT * FROM ORDERS']
+        assert connection.closed_cursors == 1
+
+    def test_rejects_invalid_table_name(self):
+        """Test a table name that isn't an identifier never reaches the connection"""
+        connection = FakeConnection()
+
+        with pytest.raises(ValueError):
+            next(make_validator(connection).stream_source_data('ORDERS; DROP TABLE ORDERS'))
+        assert connection.executed == []
+
+
+class TestCompareViaSnowflake:
+    """Test comparing two tables with one query in Snowflake"""
+
+    def test_generated_sql(self):
+        """Test the FULL OUTER JOIN query built for the key and value columns"""
+        connection = FakeConnection(row=(0, 0, 0, 0))
+
+        is_valid, differences = make_validator(connection).compare_via_snowflake(
+            'TABLEAU_ORDERS', 'APP.PUBLIC.ORDERS', ['ORDER_ID', '"Line"'], ['SALES', 'PROFIT'], tolerance=0.05
+        )
+
+        assert (is_valid, differences) == (True, [])
+        assert connection.executed == [
+            'SELECT SUM(CASE WHEN b.ORDER_ID IS NULL THEN 1 ELSE 0 END) AS MISSING_ROWS, '
+            'SUM(CASE WHEN a.ORDER_ID IS NULL THEN 1 ELSE 0 END) AS EXTRA_ROWS, '
+            'SUM(CASE WHEN ABS(a.SALES - b.SALES) / GREATEST(ABS(a.SALES), 1e-10) > 0.05 THEN 1 ELSE 0 END) AS EXCEEDED_0, '
+            'SUM(CASE WHEN ABS(a.PROFIT - b.PROFIT) / GREATEST(ABS(a.PROFIT), 1e-10) > 0.05 THEN 1 ELSE 0 END) AS EXCEEDED_1 '
+            'FROM TABLEAU_ORDERS a FULL OUTER JOIN APP.PUBLIC.ORDERS b '
+            'ON a.ORDER_ID = b.ORDER_ID AND a."Line" = b."Line"'
+        ]
+
+    def test_reports_differences(self):
+        """Test the counts in the result row become difference messages"""
+        connection = FakeConnection(row=(2, 1, None, 3))
+
+        is_valid, differences = make_validator(connection).compare_via_snowflake(
+            'A', 'B', ['ORDER_ID'], ['SALES', 'PROFIT']
+        )
+
+        assert not is_valid
+        assert differences == [
+            "Missing 2 rows in generated data",
+            "Extra 1 rows in generated data",
+            "Column PROFIT: 3 rows exceed tolerance of 0.01",
+        ]
+
+    @pytest.mark.parametrize("tableau_table, key_columns, value_columns", [
+        ('A', ['ORDER_ID'], ['SALES) FROM A; DROP TABLE A; --']),
+        ('A', ['ORDER_ID = 1 OR 1'], ['SALES']),
+        ('A', [], ['SALES']),
+        ('A b JOIN C', ['ORDER_ID'], ['SALES']),
+    ])
+    def test_rejects_unsafe_identifiers(self, tableau_table, key_columns, value_columns):
+        """Test names that would splice SQL into the query are rejected before it runs"""
+        connection = FakeConnection(row=(0, 0, 0))
+
+        with pytest.raises(ValueError):
+            make_validator(connection).compare_via_snowflake(tableau_table, 'B', key_columns, value_columns)
+        assert connection.executed == []
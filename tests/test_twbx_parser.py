@@ -1,31 +1,72 @@
 """
 Test suite for TWBX Parser
 """
+import io
 import pytest
-import tempfile
 import zipfile
 import xml.etree.ElementTree as ET
-from pathlib import Path
-from src.parsers.twbx_parser import TWBXParser, TableauCalculation, WorkbookStructure
+from src.parsers.twbx_parser import (
+    TWBXParser, TableauCalculation, WorkbookStructure, locate_embedded, _PARALLEL_WORKSHEET_MIN
+)
+
+
+# Workbook inspected by the full-parse tests
+FULL_WORKBOOK_XML = """<?xml version='1.0' encoding='utf-8'?>
+<workbook version="18.1">
+    <datasources>
+        <datasource name="SuperStore">
+            <column name="Sales" datatype="real" role="measure" type="quantitative"/>
+            <column name="Profit" datatype="real" role="measure" type="quantitative"/>
+            <column name="Profit Ratio" datatype="real" role="measure" type="quantitative">
+                <calculation formula="[Profit] / [Sales]"/>
+            </column>
+        </datasource>
+    </datasources>
+    <worksheets>
+        <worksheet name="Sales Analysis">
+            <datasource-dependencies datasource="SuperStore"/>
+        </worksheet>
+    </worksheets>
+    <dashboards>
+        <dashboard name="Sales Dashboard">
+            <size maxheight="800" maxwidth="1200"/>
+            <zones>
+                <zone name="Sales Analysis" type="worksheet" x="0" y="0" w="600" h="400"/>
+            </zones>
+        </dashboard>
+    </dashboards>
+</workbook>"""
+
+
+def create_mock_twbx(xml_content: str, embedded_files=()) -> io.BytesIO:
+    """Create an in-memory mock .twbx with given XML content and empty embedded files"""
+    buffer = io.BytesIO()
+    
+    with zipfile.ZipFile(buffer, 'w') as zf:
+        zf.writestr('workbook.twb', xml_content)
+        for name in embedded_files:
+            zf.writestr(name, b'')
+    
+    buffer.seek(0)
+    return buffer
+
+
+@pytest.fixture(scope="module")
+def parser():
+    """One parser shared by the module's tests; it holds no per-parse state"""
+    return TWBXParser()
+
+
+@pytest.fixture(scope="module")
+def parsed_full_workbook(parser):
+    """FULL_WORKBOOK_XML parsed once for every test that inspects it"""
+    return parser.parse(create_mock_twbx(FULL_WORKBOOK_XML))
 
 
 class TestTWBXParser:
     """Test the TWBX parser functionality"""
     
-    def setup_method(self):
-        """Setup test fixtures"""
-        self.parser = TWBXParser()
-        
-    def create_mock_twbx(self, xml_content: str) -> str:
-        """Create a mock .twbx file with given XML content"""
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.twbx')
-        
-        with zipfile.ZipFile(temp_file.name, 'w') as zf:
-            zf.writestr('workbook.twb', xml_content)
-        
-        return temp_file.name
-    
-    def test_extract_twb_xml(self):
+    def test_extract_twb_xml(self, parser):
         """Test XML extraction from TWBX file"""
         xml_content = """<?xml version='1.0' encoding='utf-8'?>
 <workbook version="18.1" xmlns:user="http://www.tableausoftware.com/xml/user">
@@ -36,15 +77,12 @@ class TestTWBXParser:
     </datasources>
 </workbook>"""
         
-        twbx_path = self.create_mock_twbx(xml_content)
+        twbx_file = create_mock_twbx(xml_content)
         
-        try:
-            extracted_xml = self.parser._extract_twb_xml(twbx_path)
-            assert xml_content.strip() == extracted_xml.strip()
-        finally:
-            Path(twbx_path).unlink()
+        extracted_xml = parser._extract_twb_xml(twbx_file)
+        assert xml_content.strip() == extracted_xml.strip()
     
-    def test_extract_metadata(self):
+    def test_extract_metadata(self, parser):
         """Test metadata extraction"""
         xml_content = """<?xml version='1.0' encoding='utf-8'?>
 <workbook version="18.1" xmlns:user="http://www.tableausoftware.com/xml/user">
@@ -52,12 +90,12 @@ class TestTWBXParser:
 </workbook>"""
         
         root = ET.fromstring(xml_content)
-        metadata = self.parser._extract_metadata(root)
+        metadata = parser._extract_metadata(root)
         
         assert metadata['version'] == '18.1'
         assert metadata['xmlns:user'] == 'http://www.tableausoftware.com/xml/user'
     
-    def test_extract_calculations(self):
+    def test_extract_calculations(self, parser):
         """Test calculation extraction"""
         xml_content = """<?xml version='1.0' encoding='utf-8'?>
 <workbook version="18.1">
@@ -74,7 +112,7 @@ class TestTWBXParser:
 </workbook>"""
         
         root = ET.fromstring(xml_content)
-        calculations = self.parser._extract_all_calculations(root)
+        calculations = parser._extract_all_calculations(root)
         
         assert len(calculations) == 2
         assert 'Profit Ratio' in calculations
@@ -85,15 +123,135 @@ class TestTWBXParser:
         assert profit_ratio.calculation_type == 'measure'
         assert profit_ratio.data_type == 'real'
     
-    def test_extract_formula_dependencies(self):
+    def test_extract_calculations_streaming(self, parser):
+        """Test streaming calculation extraction matches the full parse"""
+        xml_content = """<?xml version='1.0' encoding='utf-8'?>
+<workbook version="18.1">
+    <datasources>
+        <datasource name="Parameters">
+            <column name="[Parameter 1]" caption="Top N" datatype="integer" role="measure">
+                <calculation formula="10"/>
+            </column>
+        </datasource>
+        <datasource name="Sample">
+            <connection class="snowflake"/>
+            <column name="[Calculation_1]" caption="Profit Ratio" datatype="real" role="measure">
+                <calculation formula="SUM([Profit]) / SUM([Sales])"/>
+            </column>
+            <column name="[Sales]" datatype="real" role="measure"/>
+        </datasource>
+    </datasources>
+</workbook>"""
+
+        twbx_file = create_mock_twbx(xml_content)
+
+        calculations = parser.extract_calculations(twbx_file)
+
+        assert list(calculations) == ['[Calculation_1]']
+        assert calculations['[Calculation_1]'].dependencies == ('Profit', 'Sales')
+        assert calculations == parser.parse(twbx_file).calculations
+
+    @pytest.mark.parametrize("datasources_xml", [
+        # Uncaptioned columns and plain fields are skipped, LOD calcs keep their type
+        """<datasource name="Sample">
+            <column name="[Calculation_1]" caption="Regional Sales" datatype="real" role="measure">
+                <calculation formula="{ FIXED [Region] : SUM([Sales]) }"/>
+            </column>
+            <column name="[Calculation_2]" datatype="real" role="measure">
+                <calculation formula="[Sales] * 2"/>
+            </column>
+            <column name="[Region]" caption="Region" datatype="string" role="dimension"/>
+        </datasource>""",
+        # Several datasources, one name redefined by a later one
+        """<datasource name="Orders">
+            <column name="[Calculation_1]" caption="Margin" datatype="real" role="measure">
+                <calculation formula="[Profit] / [Sales]"/>
+            </column>
+        </datasource>
+        <datasource name="Returns">
+            <column name="[Calculation_1]" caption="Return Rate" datatype="real" role="measure">
+                <calculation formula="COUNTD([Returned]) / COUNTD([Order ID])"/>
+            </column>
+            <column name="[Calculation_2]" caption="Returned?" datatype="boolean">
+                <calculation formula="NOT ISNULL([Returned])"/>
+            </column>
+        </datasource>""",
+        # Enough sibling columns that discarded ones must not be revisited
+        '<datasource name="Wide">' + ''.join(
+            f'<column name="[Calculation_{i}]" caption="Calc {i}" datatype="integer" role="measure">'
+            f'<calculation formula="[Field {i}] + [Field {i + 1}]"/></column>'
+            f'<column name="[Field {i}]" datatype="integer" role="measure"/>'
+            for i in range(200)
+        ) + '</datasource>',
+    ])
+    def test_streaming_matches_parse_tree(self, parser, datasources_xml):
+        """Test streamed calculations equal the parse-tree ones, in the same order"""
+        xml_content = f"""<?xml version='1.0' encoding='utf-8'?>
+<workbook version="18.1"><datasources>{datasources_xml}</datasources></workbook>"""
+        root = ET.fromstring(xml_content)
+
+        calculations = parser.extract_calculations(create_mock_twbx(xml_content))
+
+        assert calculations
+        assert list(calculations.items()) == list(parser._extract_all_calculations(root).items())
+
+    def test_extract_calculations_without_twb(self, parser):
+        """Test an archive without a .twb is rejected when streaming too"""
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as zf:
+            zf.writestr('Data/orders.csv', 'Sales\n1\n')
+        buffer.seek(0)
+
+        with pytest.raises(ValueError):
+            parser.extract_calculations(buffer)
+
+    def test_parallel_worksheet_scan(self, parser):
+        """Test the opt-in worker-process scan matches the in-process scan"""
+        worksheets_xml = ''.join(
+            f'<worksheet name="Sheet {i}"><datasource-dependencies datasource="Sample"/>'
+            f'<pane><mark class="Bar"/><encoding attr="color" field="[Sales]"/></pane></worksheet>'
+            for i in range(_PARALLEL_WORKSHEET_MIN)
+        )
+        workbook_xml = f'<workbook><worksheets>{worksheets_xml}</worksheets></workbook>'
+        _, index = parser._parse_and_index(io.BytesIO(workbook_xml.encode('utf-8')))
+        worksheet_elems = index['worksheet']
+
+        assert TWBXParser(max_workers=2)._scan_worksheets(worksheet_elems) == parser._scan_worksheets(worksheet_elems)
+
+    def test_encodings_stay_in_their_pane(self, parser):
+        """Test an encoding in a pane without a mark isn't credited to an earlier pane's mark"""
+        xml_content = """<?xml version='1.0' encoding='utf-8'?>
+<workbook version="18.1">
+    <worksheets>
+        <worksheet name="Sheet 1">
+            <table>
+                <panes>
+                    <pane>
+                        <mark class="Bar"/>
+                        <encoding attr="color" field="[Region]"/>
+                    </pane>
+                    <pane>
+                        <encoding attr="size" field="[Sales]"/>
+                    </pane>
+                </panes>
+            </table>
+        </worksheet>
+    </worksheets>
+</workbook>"""
+
+        workbook = parser.parse(create_mock_twbx(xml_content))
+
+        assert workbook.worksheets['Sheet 1'].marks == [{'class': 'Bar', 'encodings': {'color': '[Region]'}}]
+
+    def test_extract_formula_dependencies(self, parser):
         """Test formula dependency extraction"""
         formula = "[Sales] / [Profit] + [Quantity] * [Discount]"
-        dependencies = self.parser._extract_formula_dependencies(formula)
+        dependencies = parser._extract_formula_dependencies(formula)
         
         expected_deps = ['Sales', 'Profit', 'Quantity', 'Discount']
         assert set(dependencies) == set(expected_deps)
     
-    def test_lod_expression_detection(self):
+    def test_lod_expression_detection(self, parser):
         """Test LOD expression detection"""
         xml_content = """<?xml version='1.0' encoding='utf-8'?>
 <workbook version="18.1">
@@ -107,66 +265,70 @@ class TestTWBXParser:
 </workbook>"""
         
         root = ET.fromstring(xml_content)
-        calculations = self.parser._extract_all_calculations(root)
+        calculations = parser._extract_all_calculations(root)
         
         regional_sales = calculations['Regional Sales']
         assert regional_sales.is_lod == True
         assert regional_sales.lod_type == 'FIXED'
     
-    def test_full_parse_workflow(self):
+    def test_full_parse_workflow(self, parsed_full_workbook):
         """Test complete parsing workflow"""
-        xml_content = """<?xml version='1.0' encoding='utf-8'?>
-<workbook version="18.1">
-    <datasources>
-        <datasource name="SuperStore">
-            <column name="Sales" datatype="real" role="measure" type="quantitative"/>
-            <column name="Profit" datatype="real" role="measure" type="quantitative"/>
-            <column name="Profit Ratio" datatype="real" role="measure" type="quantitative">
-                <calculation formula="[Profit] / [Sales]"/>
-            </column>
-        </datasource>
-    </datasources>
-    <worksheets>
-        <worksheet name="Sales Analysis">
-            <datasource-dependencies datasource="SuperStore"/>
-        </worksheet>
-    </worksheets>
-    <dashboards>
-        <dashboard name="Sales Dashboard">
-            <size maxheight="800" maxwidth="1200"/>
-            <zones>
-                <zone name="Sales Analysis" type="worksheet" x="0" y="0" w="600" h="400"/>
-            </zones>
-        </dashboard>
-    </dashboards>
-</workbook>"""
+        workbook = parsed_full_workbook
+        
+        # Check structure
+        assert isinstance(workbook, WorkbookStructure)
+        assert len(workbook.calculations) == 1
+        assert len(workbook.worksheets) == 1
+        assert len(workbook.dashboards) == 1
         
-        twbx_path = self.create_mock_twbx(xml_content)
-        
-        try:
-            workbook = self.parser.parse(twbx_path)
-            
-            # Check structure
-            assert isinstance(workbook, WorkbookStructure)
-            assert len(workbook.calculations) == 1
-            assert len(workbook.worksheets) == 1
-            assert len(workbook.dashboards) == 1
-            
-            # Check calculation
-            assert 'Profit Ratio' in workbook.calculations
-            calc = workbook.calculations['Profit Ratio']
-            assert calc.formula == '[Profit] / [Sales]'
-            assert 'Profit' in calc.dependencies
-            assert 'Sales' in calc.dependencies
-            
-            # Check dashboard
-            assert 'Sales Dashboard' in workbook.dashboards
-            dashboard = workbook.dashboards['Sales Dashboard']
-            assert dashboard.size['width'] == 1200
-            assert dashboard.size['height'] == 800
-            
-        finally:
-            Path(twbx_path).unlink()
+        # Check calculation
+        assert 'Profit Ratio' in workbook.calculations
+        calc = workbook.calculations['Profit Ratio']
+        assert calc.formula == '[Profit] / [Sales]'
+        assert 'Profit' in calc.dependencies
+        assert 'Sales' in calc.dependencies
+        
+        # Check dashboard
+        assert 'Sales Dashboard' in workbook.dashboards
+        dashboard = workbook.dashboards['Sales Dashboard']
+        assert dashboard.size['width'] == 1200
+        assert dashboard.size['height'] == 800
+        
+
+
+class TestLocateEmbedded:
+    """Test finding embedded files inside a .twbx"""
+
+    EMBEDDED_FILES = ('Data/Extracts/orders.hyper', 'Data/Extracts/backorders.hyper', 'Image/logo.png')
+
+    @pytest.fixture
+    def archive(self):
+        with zipfile.ZipFile(create_mock_twbx('<workbook/>', self.EMBEDDED_FILES)) as zf:
+            yield zf
+
+    @pytest.mark.parametrize("name, expected", [
+        ('Data/Extracts/orders.hyper', 'Data/Extracts/orders.hyper'),
+        # Paths recorded on the author's machine resolve by base name
+        ('C:\\Users\\me\\Documents\\orders.hyper', 'Data/Extracts/orders.hyper'),
+        ('/home/me/Extracts/backorders.hyper', 'Data/Extracts/backorders.hyper'),
+        ('logo.png', 'Image/logo.png'),
+        ('workbook.twb', 'workbook.twb'),
+    ])
+    def test_found(self, archive, name, expected):
+        """Test members are found by exact path, then by base name"""
+        assert locate_embedded(archive, name).filename == expected
+
+    @pytest.mark.parametrize("name", ['ders.hyper', 'Data/Extracts/returns.hyper', 'Data/Extracts'])
+    def test_missing(self, archive, name):
+        """Test names matching no whole file name give None"""
+        assert locate_embedded(archive, name) is None
+
+    def test_find_embedded(self, parser):
+        """Test the parser method opens the .twbx itself"""
+        twbx_file = create_mock_twbx('<workbook/>', self.EMBEDDED_FILES)
+
+        assert parser.find_embedded(twbx_file, 'D:\\orders.hyper').filename == 'Data/Extracts/orders.hyper'
+        assert parser.find_embedded(twbx_file, 'sales.hyper') is None
 
 
 class TestTableauCalculation:
@@ -184,7 +346,7 @@ class TestTableauCalculation:
         assert calc.name == "Test Calc"
         assert calc.formula == "[Sales] * 2"
         assert calc.is_lod == False
-        assert calc.dependencies == []
+        assert calc.dependencies == ()
     
     def test_lod_calculation(self):
         """Test LOD calculation properties"""
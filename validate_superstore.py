@@ -2,65 +2,154 @@
 """
 SuperStore Dashboard Validation - Comprehensive accuracy testing
 """
+import re
 import sys
 import json
+import types
+import functools
 sys.path.append('.')
 
 from src.parsers.twbx_parser import TWBXParser
 from src.translators.formula_translator import TableauFormulaTranslator
 # Visual validation agent requires additional dependencies
 
-def analyze_superstore_dashboard():
+# Formula keywords marking calculations behind the headline metrics
+METRIC_KEYWORDS = ('sales', 'profit', 'count', 'sum')
+# Formula keywords marking year-over-year calculations
+YOY_KEYWORDS = ('year', 'yoy', '2022', '2023', '2024')
+# Both keyword sets as one alternation, so each formula is scanned once in C; the
+# group a match lands in is its tag. No keyword of one set overlaps one of the other,
+# so non-overlapping matches miss neither.
+_KEYWORD_RE = re.compile(
+    f"(?P<metric>{'|'.join(map(re.escape, METRIC_KEYWORDS))})|(?P<yoy>{'|'.join(map(re.escape, YOY_KEYWORDS))})",
+    re.IGNORECASE
+)
+
+# From your screenshot, I can see these key metrics:
+REFERENCE_METRICS = types.MappingProxyType({
+    "total_sales": {"value": 470.5, "unit": "K", "description": "Total Sales"},
+    "total_profit": {"value": 61.6, "unit": "K", "description": "Total Profit"}, 
+    "total_orders": {"value": 2102, "unit": "", "description": "Total Orders"},
+    "profit_margin": {"value": 24.4, "unit": "%", "description": "Profit Margin"}
+})
+
+# Based on your reference image, I can identify these components:
+VISUAL_COMPONENTS = types.MappingProxyType({
+    "top_metrics": ["Sales", "Profit", "Orders"],
+    "regional_performance": "Top States by Sales (left panel)",
+    "product_performance": "Top Products by Sales (left panel)", 
+    "time_series": "Sales trend chart (center)",
+    "profit_analysis": "Profit trend chart (center)",
+    "orders_analysis": "Orders trend chart (center)",
+    "geographical": "States map (bottom left)",
+    "category_breakdown": "By Category charts (right panels)",
+    "segment_breakdown": "By Segment charts (right panels)",
+    "manager_filters": "Top Manager selection (top right)"
+})
+
+# Based on visual inspection of your reference image:
+EXPECTED_LAYOUT = types.MappingProxyType({
+    "header": {
+        "title": "Regional Performance Overview 2022 vs 2021",
+        "filters": ["Select Metric", "Select Top Manager", "Select Year"],
+        "position": "top"
+    },
+    "left_panel": {
+        "components": ["Top States by Sales", "Top Products by Sales"],
+        "width": "approximately 25%"
+    },
+    "center_panel": {
+        "components": ["Sales trend chart", "Profit trend chart", "Orders trend chart"],
+        "metrics": ["Sales: $470.5K", "Profit: $61.6K", "Orders: 2,102"],
+        "width": "approximately 50%"
+    },
+    "right_panel": {
+        "components": ["By Category breakdown", "By Segment breakdown"],
+        "width": "approximately 25%"
+    },
+    "bottom_section": {
+        "components": ["States Map by Sales (YoY)"],
+        "width": "full width"
+    }
+})
+
+
+def keyword_tags(formula):
+    """Set of keyword tags ('metric', 'yoy') whose keywords appear in a formula"""
+    tags = set()
+    for match in _KEYWORD_RE.finditer(formula):
+        tags.add(match.lastgroup)
+        if len(tags) == 2:
+            break
+    return tags
+
+def reference_metric_lines(reference_metrics):
+    """Report lines listing the reference metrics"""
+    return tuple(f"  📈 {info['description']}: {info['value']}{info['unit']}"
+                 for info in reference_metrics.values())
+
+@functools.lru_cache(maxsize=8)
+def component_matcher(keywords):
+    """Search function finding any of a frozenset of keywords, compiled once per keyword set"""
+    # Every keyword in one alternation, so a worksheet name is scanned once
+    return re.compile('|'.join(map(re.escape, sorted(keywords)))).search
+
+def write_lines(lines):
+    """Write a report section to stdout in one call instead of a print per line"""
+    sys.stdout.write('\n'.join(lines) + '\n')
+
+def analyze_superstore_dashboard(reference_metrics=REFERENCE_METRICS, visual_components=VISUAL_COMPONENTS):
     """Comprehensive analysis of SuperStore dashboard accuracy"""
     
-    print("🔍 SuperStore Dashboard Validation")
-    print("=" * 50)
+    write_lines([
+        "🔍 SuperStore Dashboard Validation",
+        "=" * 50,
+    ])
     
     # Parse the dashboard
     parser = TWBXParser()
     workbook = parser.parse('SuperStore Business Dashboard 2025 _ VOTD _ VizOfTheDay.twbx')
     
-    print(f"📊 Dashboard: {list(workbook.dashboards.keys())}")
-    print(f"📈 Worksheets: {len(workbook.worksheets)}")
-    print(f"🧮 Calculations: {len(workbook.calculations)}")
+    lines = []
+    n_worksheets = len(workbook.worksheets)
+    
+    lines.append(f"📊 Dashboard: {list(workbook.dashboards)}")
+    lines.append(f"📈 Worksheets: {n_worksheets}")
+    lines.append(f"🧮 Calculations: {len(workbook.calculations)}")
     
     # Analyze key metrics from the reference image
-    print("\n🎯 Key Metrics Analysis (from reference image):")
-    
-    # From your screenshot, I can see these key metrics:
-    reference_metrics = {
-        "total_sales": {"value": 470.5, "unit": "K", "description": "Total Sales"},
-        "total_profit": {"value": 61.6, "unit": "K", "description": "Total Profit"}, 
-        "total_orders": {"value": 2102, "unit": "", "description": "Total Orders"},
-        "profit_margin": {"value": 24.4, "unit": "%", "description": "Profit Margin"}
-    }
+    lines.append("\n🎯 Key Metrics Analysis (from reference image):")
     
-    for metric, info in reference_metrics.items():
-        print(f"  📈 {info['description']}: {info['value']}{info['unit']}")
+    lines.extend(reference_metric_lines(reference_metrics))
     
     # Analyze extracted calculations
-    print(f"\n🧮 Extracted Calculations Analysis:")
+    lines.append(f"\n🧮 Extracted Calculations Analysis:")
     
+    # One pass sorts calculations into key metric and year-over-year candidates
     key_calculations = []
+    yoy_calcs = []
     for name, calc in workbook.calculations.items():
+        tags = keyword_tags(calc.formula)
         # Look for calculations that might compute key metrics
-        if any(keyword in calc.formula.lower() for keyword in ['sales', 'profit', 'count', 'sum']):
+        if 'metric' in tags:
             key_calculations.append((name, calc))
+        if 'yoy' in tags:
+            yoy_calcs.append((name, calc))
     
-    print(f"  🔢 Found {len(key_calculations)} potentially relevant calculations")
+    lines.append(f"  🔢 Found {len(key_calculations)} potentially relevant calculations")
     
     # Show sample calculations
-    print(f"\n📋 Sample Key Calculations:")
+    lines.append(f"\n📋 Sample Key Calculations:")
     for i, (name, calc) in enumerate(key_calculations[:5]):
-        print(f"  {i+1}. {name}")
-        print(f"     Formula: {calc.formula}")
-        print(f"     Type: {calc.calculation_type}")
+        lines.append(f"  {i+1}. {name}")
+        lines.append(f"     Formula: {calc.formula}")
+        lines.append(f"     Type: {calc.calculation_type}")
         if calc.dependencies:
-            print(f"     Dependencies: {', '.join(calc.dependencies)}")
-        print()
+            lines.append(f"     Dependencies: {', '.join(calc.dependencies)}")
+        lines.append("")
     
     # Test formula translation
-    print(f"🔄 Formula Translation Test:")
+    lines.append(f"🔄 Formula Translation Test:")
     translator = TableauFormulaTranslator()
     
     test_formulas = [
@@ -71,155 +160,118 @@ def analyze_superstore_dashboard():
         "COUNT([Order ID])"
     ]
     
-    for formula in test_formulas:
-        try:
-            result = translator.translate(formula)
-            print(f"  ✅ {formula} → {result.pandas_expression}")
-        except Exception as e:
-            print(f"  ❌ {formula} → Error: {e}")
+    # One batch call; the translator cleans and dedupes the formulas together,
+    # and a failing formula comes back as its exception
+    results = translator.translate_many(test_formulas, return_exceptions=True)
+    for formula, result in zip(test_formulas, results):
+        if isinstance(result, Exception):
+            lines.append(f"  ❌ {formula} → Error: {result}")
+        else:
+            lines.append(f"  ✅ {formula} → {result.pandas_expression}")
     
     # Analyze dashboard components from reference image
-    print(f"\n🖼️ Visual Component Analysis:")
-    
-    # Based on your reference image, I can identify these components:
-    visual_components = {
-        "top_metrics": ["Sales", "Profit", "Orders"],
-        "regional_performance": "Top States by Sales (left panel)",
-        "product_performance": "Top Products by Sales (left panel)", 
-        "time_series": "Sales trend chart (center)",
-        "profit_analysis": "Profit trend chart (center)",
-        "orders_analysis": "Orders trend chart (center)",
-        "geographical": "States map (bottom left)",
-        "category_breakdown": "By Category charts (right panels)",
-        "segment_breakdown": "By Segment charts (right panels)",
-        "manager_filters": "Top Manager selection (top right)"
-    }
+    lines.append(f"\n🖼️ Visual Component Analysis:")
     
     for component, description in visual_components.items():
-        print(f"  📊 {component}: {description}")
+        lines.append(f"  📊 {component}: {description}")
     
     # Check for matching worksheets
-    print(f"\n🔍 Worksheet Mapping Analysis:")
+    lines.append(f"\n🔍 Worksheet Mapping Analysis:")
     worksheet_matches = 0
+    matches_component = component_matcher(frozenset(
+        keyword for component in visual_components for keyword in component.split('_')
+    ))
     
-    for ws_name, worksheet in workbook.worksheets.items():
+    for ws_name in workbook.worksheets:
         # Check if worksheet might correspond to visual components
-        matches_component = False
-        for component in visual_components.keys():
-            if any(keyword in ws_name.lower() for keyword in component.split('_')):
-                matches_component = True
-                break
-        
-        if matches_component:
+        if matches_component(ws_name.casefold()):
             worksheet_matches += 1
-            print(f"  ✅ {ws_name} - matches visual component")
+            lines.append(f"  ✅ {ws_name} - matches visual component")
     
-    print(f"  📊 {worksheet_matches}/{len(workbook.worksheets)} worksheets potentially match visual components")
+    lines.append(f"  📊 {worksheet_matches}/{n_worksheets} worksheets potentially match visual components")
     
     # Parameter analysis
-    print(f"\n⚙️ Parameter Analysis:")
+    lines.append(f"\n⚙️ Parameter Analysis:")
     parameters = workbook.parameters
     if parameters:
         for param in parameters:
-            print(f"  🎛️ {param.get('name', 'Unknown')}: {param.get('data_type', 'Unknown')} = {param.get('current_value', 'None')}")
+            lines.append(f"  🎛️ {param.get('name', 'Unknown')}: {param.get('data_type', 'Unknown')} = {param.get('current_value', 'None')}")
     else:
-        print("  📝 No explicit parameters found (may be embedded in calculations)")
+        lines.append("  📝 No explicit parameters found (may be embedded in calculations)")
     
     # Year-over-year calculations
-    print(f"\n📅 Year-over-Year Analysis:")
-    yoy_calcs = []
-    for name, calc in workbook.calculations.items():
-        if any(keyword in calc.formula.lower() for keyword in ['year', 'yoy', '2022', '2023', '2024']):
-            yoy_calcs.append((name, calc))
+    lines.append(f"\n📅 Year-over-Year Analysis:")
     
-    print(f"  📈 Found {len(yoy_calcs)} year-over-year related calculations")
+    lines.append(f"  📈 Found {len(yoy_calcs)} year-over-year related calculations")
     
     # Show YoY patterns
     for name, calc in yoy_calcs[:3]:
-        print(f"    • {name}: {calc.formula[:80]}...")
+        lines.append(f"    • {name}: {calc.formula[:80]}...")
     
+    write_lines(lines)
     return workbook, reference_metrics, visual_components
 
 def validate_against_reference_image():
     """Validate dashboard structure against reference image"""
     
-    print(f"\n🖼️ Reference Image Validation:")
-    print("=" * 50)
+    lines = []
+    lines.append(f"\n🖼️ Reference Image Validation:")
+    lines.append("=" * 50)
     
     # Load reference image
     try:
         reference_path = "Screenshot 2025-07-08 at 10.24.35 AM.png"
         
         # Analyze reference image structure
-        print(f"📸 Analyzing reference image: {reference_path}")
+        lines.append(f"📸 Analyzing reference image: {reference_path}")
         
-        # Based on visual inspection of your reference image:
-        expected_layout = {
-            "header": {
-                "title": "Regional Performance Overview 2022 vs 2021",
-                "filters": ["Select Metric", "Select Top Manager", "Select Year"],
-                "position": "top"
-            },
-            "left_panel": {
-                "components": ["Top States by Sales", "Top Products by Sales"],
-                "width": "approximately 25%"
-            },
-            "center_panel": {
-                "components": ["Sales trend chart", "Profit trend chart", "Orders trend chart"],
-                "metrics": ["Sales: $470.5K", "Profit: $61.6K", "Orders: 2,102"],
-                "width": "approximately 50%"
-            },
-            "right_panel": {
-                "components": ["By Category breakdown", "By Segment breakdown"],
-                "width": "approximately 25%"
-            },
-            "bottom_section": {
-                "components": ["States Map by Sales (YoY)"],
-                "width": "full width"
-            }
-        }
+        lines.append(f"✅ Expected layout structure identified:")
+        for section, details in EXPECTED_LAYOUT.items():
+            lines.append(f"  📍 {section}: {details.get('components', details)}")
         
-        print(f"✅ Expected layout structure identified:")
-        for section, details in expected_layout.items():
-            print(f"  📍 {section}: {details.get('components', details)}")
-        
-        return expected_layout
+        write_lines(lines)
+        return EXPECTED_LAYOUT
         
     except Exception as e:
-        print(f"❌ Reference image analysis failed: {e}")
+        lines.append(f"❌ Reference image analysis failed: {e}")
+        write_lines(lines)
         return None
 
 def generate_accuracy_report(workbook, reference_metrics, visual_components):
     """Generate comprehensive accuracy report"""
     
-    print(f"\n📊 Accuracy Assessment Report:")
-    print("=" * 50)
+    lines = []
+    lines.append(f"\n📊 Accuracy Assessment Report:")
+    lines.append("=" * 50)
     
     scores = {}
     
+    n_calculations = len(workbook.calculations)
+    n_worksheets = len(workbook.worksheets)
+    
     # Formula extraction score
-    formula_score = min(100, len(workbook.calculations) * 2)  # 2 points per calculation, max 100
+    formula_score = min(100, n_calculations * 2)  # 2 points per calculation, max 100
     scores['formula_extraction'] = formula_score
-    print(f"🧮 Formula Extraction: {formula_score}/100 ({len(workbook.calculations)} calculations found)")
+    lines.append(f"🧮 Formula Extraction: {formula_score}/100 ({n_calculations} calculations found)")
     
     # Worksheet coverage score
-    worksheet_score = min(100, len(workbook.worksheets) * 3)  # 3 points per worksheet, max 100
+    worksheet_score = min(100, n_worksheets * 3)  # 3 points per worksheet, max 100
     scores['worksheet_coverage'] = worksheet_score
-    print(f"📈 Worksheet Coverage: {worksheet_score}/100 ({len(workbook.worksheets)} worksheets)")
+    lines.append(f"📈 Worksheet Coverage: {worksheet_score}/100 ({n_worksheets} worksheets)")
     
     # Component mapping score (estimated)
     component_score = 85  # Based on visual analysis
     scores['component_mapping'] = component_score
-    print(f"📊 Component Mapping: {component_score}/100 (visual components identified)")
+    lines.append(f"📊 Component Mapping: {component_score}/100 (visual components identified)")
     
     # Data structure score
     data_score = 90 if workbook.datasources else 50
     scores['data_structure'] = data_score
-    print(f"💾 Data Structure: {data_score}/100 ({len(workbook.datasources)} data sources)")
+    lines.append(f"💾 Data Structure: {data_score}/100 ({len(workbook.datasources)} data sources)")
     
     # Overall accuracy
     overall_score = sum(scores.values()) / len(scores)
-    print(f"\n🎯 Overall Accuracy Score: {overall_score:.1f}/100")
+    lines.append(f"\n🎯 Overall Accuracy Score: {overall_score:.1f}/100")
     
     # Confidence assessment
     if overall_score >= 80:
@@ -232,16 +284,19 @@ def generate_accuracy_report(workbook, reference_metrics, visual_components):
         confidence = "LOW ❌"
         readiness = "Needs additional development"
     
-    print(f"📈 Confidence Level: {confidence}")
-    print(f"🚀 Deployment Readiness: {readiness}")
+    lines.append(f"📈 Confidence Level: {confidence}")
+    lines.append(f"🚀 Deployment Readiness: {readiness}")
     
+    write_lines(lines)
     return scores, overall_score
 
 def main():
     """Run comprehensive validation"""
     
-    print("🎯 SuperStore Dashboard Comprehensive Validation")
-    print("=" * 60)
+    write_lines([
+        "🎯 SuperStore Dashboard Comprehensive Validation",
+        "=" * 60,
+    ])
     
     # Analyze dashboard
     workbook, reference_metrics, visual_components = analyze_superstore_dashboard()
@@ -253,28 +308,29 @@ def main():
     scores, overall_score = generate_accuracy_report(workbook, reference_metrics, visual_components)
     
     # Final assessment
-    print(f"\n" + "=" * 60)
-    print(f"🏆 FINAL ASSESSMENT")
-    print(f"=" * 60)
+    lines = []
+    lines.append(f"\n" + "=" * 60)
+    lines.append(f"🏆 FINAL ASSESSMENT")
+    lines.append(f"=" * 60)
     
-    print(f"✅ Successfully parsed complex SuperStore dashboard")
-    print(f"✅ Extracted {len(workbook.calculations)} calculations including YoY comparisons")
-    print(f"✅ Identified all major visual components from reference image")
-    print(f"✅ Formula translation system operational")
-    print(f"✅ Security measures in place")
-    print(f"✅ Deployment configuration ready")
+    lines.append(f"✅ Successfully parsed complex SuperStore dashboard")
+    lines.append(f"✅ Extracted {len(workbook.calculations)} calculations including YoY comparisons")
+    lines.append(f"✅ Identified all major visual components from reference image")
+    lines.append(f"✅ Formula translation system operational")
+    lines.append(f"✅ Security measures in place")
+    lines.append(f"✅ Deployment configuration ready")
     
-    print(f"\n🎯 Accuracy Score: {overall_score:.1f}/100")
+    lines.append(f"\n🎯 Accuracy Score: {overall_score:.1f}/100")
     
     if overall_score >= 80:
-        print(f"🚀 READY FOR GITHUB DEPLOYMENT!")
-        print(f"   This system demonstrates high accuracy in:")
-        print(f"   • Formula extraction and translation")
-        print(f"   • Visual component mapping") 
-        print(f"   • Data structure preservation")
-        print(f"   • Dashboard layout understanding")
-    
-    print(f"\n📋 GitHub Deployment Checklist:")
+        lines.append(f"🚀 READY FOR GITHUB DEPLOYMENT!")
+        lines.append(f"   This system demonstrates high accuracy in:")
+        lines.append(f"   • Formula extraction and translation")
+        lines.append(f"   • Visual component mapping") 
+        lines.append(f"   • Data structure preservation")
+        lines.append(f"   • Dashboard layout understanding")
+    
+    lines.append(f"\n📋 GitHub Deployment Checklist:")
     checklist = [
         "✅ No credentials in code",
         "✅ .gitignore configured properly", 
@@ -284,8 +340,8 @@ def main():
         "✅ SuperStore validation successful"
     ]
     
-    for item in checklist:
-        print(f"   {item}")
+    lines.extend(f"   {item}" for item in checklist)
+    write_lines(lines)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file